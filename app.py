@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from flask import Flask, render_template, request, send_from_directory
+from flask import Flask, render_template, request, send_from_directory, redirect, url_for
 from flask_cors import CORS
 from pathlib import Path
 from route import (
@@ -15,7 +15,8 @@ from route import (
     check_api_bp,
     fiction_api_bp
 )
-from database import init_database
+from database import init_database, init_app as init_db_app
+from components.media.uploads import UPLOAD_ROOT, upload_static_path
 from config.maintenance.maintenance import MAINTENANCE_PAGES
 
 app = Flask(__name__)
@@ -24,6 +25,8 @@ CORS(app)  # 允许跨域请求
 
 # 初始化数据库（如果不存在则创建）
 init_database()
+# 请求结束时归还 get_db() 取出的连接
+init_db_app(app)
 
 # ============================================================================
 # 定时任务初始化
@@ -61,6 +64,41 @@ def init_scheduled_tasks():
             'function': 'start_fiction_schedule',
             'schedule': '每天 6:00',
             'description': '自动生成一篇新故事'
+        },
+        {
+            'name': '语音缓存淘汰',
+            'module': 'components.tts语音合成.cache',
+            'function': 'start_cache_eviction_schedule',
+            'schedule': '每小时',
+            'description': '按最近使用时间清理超出容量上限的语音缓存'
+        },
+        {
+            'name': '上传文件迁移',
+            'module': 'components.media.uploads',
+            'function': 'migrate_legacy_uploads',
+            'schedule': '启动时',
+            'description': '把旧版平铺目录中的聊天上传文件移动到用户目录'
+        },
+        {
+            'name': '后台生成任务',
+            'module': 'components.jobs',
+            'function': 'start_job_workers',
+            'schedule': '常驻',
+            'description': '执行视频生成等耗时任务，并恢复上次未完成的任务'
+        },
+        {
+            'name': '通知投递',
+            'module': 'components.notify',
+            'function': 'start_notification_workers',
+            'schedule': '常驻',
+            'description': '发送打卡提醒、验证码和反馈邮件等通知，失败的通知按退避时间重试'
+        },
+        {
+            'name': '相册索引',
+            'module': 'route.album_route.index',
+            'function': 'build_album_indexes',
+            'schedule': '启动时',
+            'description': '建立各分类按修改时间排序的图片索引，目录改动后自动重建'
         }
     ]
     
@@ -176,6 +214,17 @@ def serve_avatar(filename):
             return send_from_directory(str(avatar_dir), avatar_file)
     return 'File not found', 404
 
+
+@app.route('/static/users/chat_upload/<filename>')
+def legacy_chat_upload(filename):
+    """旧版平铺上传目录的文件地址：文件已迁移到用户目录时重定向到新地址"""
+    if (UPLOAD_ROOT / filename).is_file():
+        return send_from_directory(str(UPLOAD_ROOT), filename)
+    static_path = upload_static_path(filename)
+    if static_path and (Path('static') / static_path).is_file():
+        return redirect(url_for('static', filename=static_path), 301)
+    return 'File not found', 404
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
 
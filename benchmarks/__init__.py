@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+性能基准测试套件
+覆盖聊天历史、表情包匹配、相册扫描、小说列表等热点路径
+
+用法（在项目根目录执行）：
+    python -m benchmarks.run                    # 运行全部并与基线对比
+    python -m benchmarks.run -k history         # 只运行名称包含 history 的用例
+    python -m benchmarks.run --update-baseline  # 以本次结果覆盖基线
+"""
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+数据库管理页面基准
+check_record 表中有 30 万行，对比：
+    - 第一页 / 靠后的页（下一页游标）/ 按页码直接跳到靠后的页（OFFSET）
+    - 导出整张表（CSV、NDJSON，流式输出）
+"""
+from datetime import date, timedelta
+
+from flask import Flask
+
+from benchmarks.harness import Case, patch_attr
+
+ROWS = 300000
+PER_PAGE = 20
+ITEMS = 50
+
+
+def _seed(get_db_connection):
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            INSERT INTO user_profile (id, username, password, email, role) VALUES (1, 'admin', 'x', 'admin@example.com', 2)
+        ''')
+        conn.executemany('''
+            INSERT INTO check_list (id, user_id, app_name) VALUES (?, 1, ?)
+        ''', [(item, f'应用{item}') for item in range(1, ITEMS + 1)])
+        # 每个清单项每天一条记录
+        start = date(2000, 1, 1)
+        conn.executemany('''
+            INSERT INTO check_record (user_id, check_list_id, check_date, check_status, app_name, created_at)
+            VALUES (1, ?, ?, 'completed', ?, '2025-01-01 08:00:00')
+        ''', [(i % ITEMS + 1, (start + timedelta(days=i // ITEMS)).isoformat(), f'应用{i % ITEMS + 1}')
+              for i in range(ROWS)])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def collect(workdir, stack):
+    import database.db_init as db_init
+    from database import get_db_connection
+    from components.user_cache import invalidate_user_profile
+    from route.admin_route import admin_bp
+
+    stack.enter_context(patch_attr(db_init, 'DB_FILE', workdir / 'admin.db'))
+    db_init.init_database()
+    _seed(get_db_connection)
+    # 角色从用户资料缓存读取，切换数据库后清空缓存
+    invalidate_user_profile()
+
+    app = Flask('bench_admin_db')
+    app.secret_key = 'benchmark'
+    app.register_blueprint(admin_bp)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+        sess['role'] = 2
+
+    url = '/admin/api/database/table/check_record/data'
+    deep_page = ROWS // PER_PAGE - 10
+    deep_cursor = (deep_page - 1) * PER_PAGE
+
+    def get_page(query):
+        response = client.get(f'{url}?per_page={PER_PAGE}&{query}')
+        data = response.get_json()
+        assert response.status_code == 200 and len(data['data']) == PER_PAGE, data
+        return data
+
+    def export(fmt):
+        response = client.get(f'/admin/api/database/table/check_record/export?format={fmt}')
+        assert response.status_code == 200
+        lines = sum(chunk.count(b'\n') for chunk in response.response)
+        assert lines >= ROWS, lines
+
+    return [
+        Case(f'admin_db.page[rows={ROWS},first]', lambda: get_page('page=1'), rounds=20, inner=5),
+        Case(f'admin_db.page[rows={ROWS},deep,cursor]',
+             lambda: get_page(f'page={deep_page}&after={deep_cursor}'), rounds=20, inner=5),
+        Case(f'admin_db.page[rows={ROWS},deep,offset]', lambda: get_page(f'page={deep_page}'), rounds=20, inner=5),
+        Case(f'admin_db.export[rows={ROWS},csv]', lambda: export('csv'), rounds=3, inner=1),
+        Case(f'admin_db.export[rows={ROWS},ndjson]', lambda: export('ndjson'), rounds=3, inner=1),
+    ]
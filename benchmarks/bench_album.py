@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+相册图片列表基准：/album/api/images/<category>
+在临时目录生成 normal/abnormal/其他 子目录的合成图片树
+    - 第一页（默认12张）
+    - 深分页（偏移到列表后部）
+"""
+import os
+import time
+
+from flask import Flask
+
+from benchmarks.harness import Case, patch_attr
+
+# 每个分类下的图片总数
+TREE_SIZES = [200, 2000]
+
+
+def _build_tree(base, total):
+    """按 normal:abnormal:其他 = 6:3:1 生成文件，并打散修改时间"""
+    now = time.time()
+    layout = [('normal', 0.6), ('abnormal', 0.3), ('misc', 0.1)]
+    index = 0
+    for folder, share in layout:
+        folder_dir = base / folder
+        folder_dir.mkdir(parents=True, exist_ok=True)
+        for _ in range(int(total * share)):
+            path = folder_dir / f'{index}_0.jpg'
+            path.write_bytes(b'\xff\xd8\xff')
+            mtime = now - (index * 7919 % total) * 60
+            os.utime(path, (mtime, mtime))
+            index += 1
+    # 夹杂少量非图片文件
+    (base / 'normal' / 'readme.txt').write_text('not an image', encoding='utf-8')
+
+
+def collect(workdir, stack):
+    import database.db_init as db_init
+    import route.album_route.api as album_api
+    from database import get_db_connection
+    from components.user_cache import invalidate_user_profile
+    from route.album_route.api import album_api_bp
+
+    # 使用临时数据库，避免读写项目数据库
+    stack.enter_context(patch_attr(db_init, 'DB_FILE', workdir / 'bench.db'))
+    db_init.init_database()
+    # 管理员用户（角色从用户资料缓存读取，切换数据库后清空缓存）
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            INSERT INTO user_profile (id, username, password, email, role) VALUES (1, 'admin', 'x', 'admin@example.com', 2)
+        ''')
+        conn.commit()
+    finally:
+        conn.close()
+    invalidate_user_profile()
+
+    cases = []
+    for total in TREE_SIZES:
+        tree_root = workdir / f'album_{total}'
+        _build_tree(tree_root / 'anime', total)
+
+        app = Flask('bench_album')
+        app.secret_key = 'benchmark'
+        app.register_blueprint(album_api_bp, url_prefix='/album/api')
+
+        guest = app.test_client()
+        admin = app.test_client()
+        with admin.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 2
+
+        def fetch(client, r=tree_root, query=''):
+            with patch_attr(album_api, 'get_base_dir', lambda category: r / category):
+                response = client.get('/album/api/images/anime' + query)
+            assert response.status_code == 200
+
+        cases.append(Case(f'album.get_images[files={total},guest]', lambda c=guest, f=fetch: f(c), rounds=15, inner=2))
+        cases.append(Case(f'album.get_images[files={total},admin]', lambda c=admin, f=fetch: f(c), rounds=15, inner=2))
+        deep = f'?offset={total // 2}&limit=12'
+        cases.append(Case(f'album.get_images[files={total},admin,offset={total // 2}]',
+                          lambda c=admin, f=fetch, q=deep: f(c, query=q), rounds=15, inner=2))
+    return cases
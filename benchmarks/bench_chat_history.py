@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+/api/history 接口后处理基准
+在临时目录中构造上传图片、TTS 音频和历史记录，通过 Flask 测试客户端请求
+"""
+import hashlib
+import json
+import re
+
+from flask import Flask
+
+from benchmarks.harness import Case, patch_attr, working_directory
+
+# (当前用户上传图片数, 当前用户音频数, 其他用户上传文件数)
+SCENARIOS = [
+    (50, 50, 0),
+    (500, 500, 5000),
+]
+
+EMAIL = 'bench_user@example.com'
+SAFE_EMAIL = EMAIL.replace('@', '_at_').replace('.', '_')
+
+
+def _tts_hash(text):
+    """与 TTS 接口一致的文本过滤与哈希"""
+    filtered = re.sub(r'[（(【\[].*?[）)\]\】]', '', text)
+    filtered = re.sub(r'\*+', '', filtered).strip()
+    return hashlib.md5(filtered.encode('utf-8')).hexdigest()[:16]
+
+
+def _build_history(upload_count):
+    """构造 50 条消息的会话：含图片消息、普通对话、收藏图片工具调用和生成指令"""
+    history = []
+    for i in range(10):
+        history.append({
+            'role': 'user',
+            'content': f'看看这张图[图片内容：一只猫在窗台上晒太阳 {i}]',
+            'image_filename': f'{SAFE_EMAIL}_{upload_count - i}.jpg',
+            'timestamp': '2025-12-27T20:01:04'
+        })
+        history.append({
+            'role': 'assistant',
+            'content': f'（眨眼）好可爱的猫猫呀～第{i}张图片里它看起来超舒服的！',
+            'timestamp': '2025-12-27T20:01:05'
+        })
+        history.append({
+            'role': 'tool',
+            'name': 'send_favorite_image',
+            'tool_call_id': f'call_{i}',
+            'content': json.dumps({'sent': True, 'image_url': f'/static/imgs/fav_album/{i}.jpg', 'description': '收藏'}),
+            'timestamp': '2025-12-27T20:01:06'
+        })
+        history.append({
+            'role': 'user',
+            'content': f'/image 画一只猫 {i}',
+            'command_info': {'type': 'image', 'prompt': '画一只猫', 'success': True,
+                             'result': {'image_url': f'/static/imgs/user_chat/{SAFE_EMAIL}_x_{i}.png'}},
+            'timestamp': '2025-12-27T20:01:07'
+        })
+        history.append({
+            'role': 'assistant',
+            'content': f'**画好啦**，这是第{i}只猫猫～',
+            'timestamp': '2025-12-27T20:01:08'
+        })
+    return history
+
+
+def _populate(root, upload_count, audio_count, other_count, history_dir):
+    # 每个用户一个上传目录
+    upload_root = root / 'static' / 'users' / 'chat_upload'
+    upload_dir = upload_root / SAFE_EMAIL
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    for n in range(1, upload_count + 1):
+        (upload_dir / f'{SAFE_EMAIL}_{n}.jpg').write_bytes(b'\xff\xd8\xff')
+    for n in range(other_count):
+        other_key = f'other_{n % 200}_at_example_com'
+        (upload_root / other_key).mkdir(exist_ok=True)
+        (upload_root / other_key / f'{other_key}_{n}.jpg').write_bytes(b'\xff\xd8\xff')
+
+    history = _build_history(upload_count)
+
+    audio_dir = root / 'static' / 'audio' / 'response_audio' / SAFE_EMAIL
+    audio_dir.mkdir(parents=True, exist_ok=True)
+    # 历史中的回复都有对应音频，其余为历史遗留音频
+    assistant_texts = [m['content'] for m in history if m['role'] == 'assistant']
+    for i, text in enumerate(assistant_texts):
+        (audio_dir / f'tts_msg{i}_{_tts_hash(text)}.mp3').write_bytes(b'ID3')
+    for i in range(max(0, audio_count - len(assistant_texts))):
+        (audio_dir / f'tts_{hashlib.md5(str(i).encode()).hexdigest()[:16]}.mp3').write_bytes(b'ID3')
+
+    user_history_dir = history_dir / SAFE_EMAIL
+    user_history_dir.mkdir(parents=True, exist_ok=True)
+    with open(user_history_dir / '20251227_200104.json', 'w', encoding='utf-8') as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+
+
+def collect(workdir, stack):
+    from config.llm.base import history as history_module
+    from components.tts语音合成 import cache as tts_cache_module
+    from route.chat_route.api import chat_api_bp
+
+    cases = []
+    for upload_count, audio_count, other_count in SCENARIOS:
+        root = workdir / f'u{upload_count}_a{audio_count}_o{other_count}'
+        history_dir = root / 'chat_history'
+        _populate(root, upload_count, audio_count, other_count, history_dir)
+
+        app = Flask('bench_chat_history', static_folder=str(root / 'static'))
+        app.secret_key = 'benchmark'
+        app.register_blueprint(chat_api_bp, url_prefix='/api')
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['email'] = EMAIL
+            sess['current_history_file'] = '20251227_200104.json'
+
+        # 音频索引在首次使用时扫描建立，这里提前建好，只测量查询开销
+        tts_cache = tts_cache_module.TTSAudioCache(
+            static_dir=root / 'static', index_file=root / 'tts_cache_index.json'
+        )
+        tts_cache.stats()
+
+        def request_history(c=client, r=root, h=history_dir, t=tts_cache):
+            # 接口使用相对路径 static/...，需要在临时根目录下执行
+            with working_directory(r), patch_attr(history_module, 'HISTORY_DIR', h), \
+                    patch_attr(tts_cache_module, '_tts_cache', t):
+                response = c.get('/api/history/default')
+            assert response.status_code == 200
+            assert b'audio_url' in response.data
+
+        cases.append(Case(
+            f'chat.history[uploads={upload_count},audio={audio_count},others={other_count}]',
+            request_history,
+            rounds=20, inner=3,
+        ))
+    return cases
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+打卡清单查询基准
+    - 打卡清单接口 GET /check/list（单个用户）
+    - 打卡提醒任务 check_and_remind（扫描所有用户并把提醒写入通知发件箱，不启动投递线程）
+临时数据库中有数千个用户，每人若干打卡项，约一半今日已打卡。
+"""
+from datetime import date
+
+from flask import Flask
+
+from benchmarks.harness import Case, patch_attr
+
+USER_COUNTS = [500, 3000]
+ITEMS_PER_USER = 5
+
+
+def _seed(get_db_connection, users):
+    today = date.today().isoformat()
+    conn = get_db_connection()
+    try:
+        conn.executemany('''
+            INSERT INTO user_profile (id, username, password, email) VALUES (?, ?, ?, ?)
+        ''', [(user_id, f'user{user_id}', 'x', f'user{user_id}@example.com') for user_id in range(1, users + 1)])
+        conn.executemany('''
+            INSERT INTO check_list (id, user_id, app_name) VALUES (?, ?, ?)
+        ''', [((user_id - 1) * ITEMS_PER_USER + index + 1, user_id, f'应用{index}')
+              for user_id in range(1, users + 1) for index in range(ITEMS_PER_USER)])
+        conn.executemany('''
+            INSERT INTO check_record (user_id, check_list_id, check_date, check_status, app_name)
+            VALUES (?, ?, ?, 'completed', ?)
+        ''', [(user_id, (user_id - 1) * ITEMS_PER_USER + index + 1, today, f'应用{index}')
+              for user_id in range(1, users + 1) for index in range(ITEMS_PER_USER)
+              if (user_id + index) % 2 == 0])
+        # 往日的打卡记录
+        conn.executemany('''
+            INSERT INTO check_record (user_id, check_list_id, check_date, check_status, app_name)
+            VALUES (?, ?, '2025-01-01', 'completed', ?)
+        ''', [(user_id, (user_id - 1) * ITEMS_PER_USER + index + 1, f'应用{index}')
+              for user_id in range(1, users + 1) for index in range(ITEMS_PER_USER)])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def collect(workdir, stack):
+    import database.db_init as db_init
+    from database import get_db_connection
+    from components.check import check_reminder
+    from components.notify import NotificationDispatcher
+    from route.index_box.check.api import check_api_bp
+
+    # 不启动投递线程，只测量查询、消息拼装和写入发件箱
+    dispatcher = NotificationDispatcher(autostart=False)
+    dispatcher.register_channel('wechat', lambda title, content: {'success': True})
+    stack.enter_context(patch_attr(check_reminder, 'get_dispatcher', lambda: dispatcher))
+
+    cases = []
+    for users in USER_COUNTS:
+        stack.enter_context(patch_attr(db_init, 'DB_FILE', workdir / f'check_{users}.db'))
+        db_init.init_database()
+        _seed(get_db_connection, users)
+        db_file = db_init.DB_FILE
+
+        app = Flask('bench_check')
+        app.secret_key = 'benchmark'
+        app.register_blueprint(check_api_bp)
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = users // 2
+            sess['email'] = f'user{users // 2}@example.com'
+
+        def list_api(c=client, f=db_file):
+            with patch_attr(db_init, 'DB_FILE', f):
+                response = c.get('/check/list')
+            assert response.status_code == 200
+            assert len(response.get_json()['data']) == ITEMS_PER_USER
+
+        def clear_outbox(f=db_file):
+            # 每轮清空发件箱，否则同一提醒时段的提醒会被去重
+            with patch_attr(db_init, 'DB_FILE', f):
+                conn = get_db_connection()
+                try:
+                    conn.execute('DELETE FROM notification_outbox')
+                    conn.commit()
+                finally:
+                    conn.close()
+
+        def remind(f=db_file, n=users):
+            with patch_attr(db_init, 'DB_FILE', f):
+                check_reminder.check_and_remind()
+                conn = get_db_connection()
+                try:
+                    queued = conn.execute('SELECT COUNT(*) FROM notification_outbox').fetchone()[0]
+                finally:
+                    conn.close()
+            assert queued == n
+
+        cases.append(Case(f'check.list_api[users={users}]', list_api, rounds=20, inner=20))
+        cases.append(Case(f'check.reminder[users={users}]', remind, setup=clear_outbox, rounds=5, inner=1))
+    return cases
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+数据库连接基准：点赞和打卡清单接口的吞吐量
+    - 单线程：连续点赞 / 连续获取打卡清单
+    - 多线程：多个用户同时点赞和刷新打卡清单（写请求与读请求并发）
+    - 总点赞数接口（点赞表中有大量往日记录）
+    - 账户资料接口
+使用临时数据库，每轮开始前清空今日点赞记录（每人每天最多点赞 10 次）。
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from flask import Flask
+
+from benchmarks.harness import Case, patch_attr
+
+USERS = 8
+CHECK_ITEMS = 6
+LIKES_PER_USER = 10
+LISTS_PER_USER = 30
+# 往日点赞记录数
+HISTORY_LIKES = 200000
+COUNTS_PER_ROUND = 50
+
+LIKE_URL = '/api/account/project-likes/like'
+LIKE_COUNT_URL = '/api/account/project-likes/count'
+PROFILE_URL = '/api/account/profile'
+CHECK_LIST_URL = '/check/list'
+
+
+def _seed(get_db_connection):
+    """创建用户、打卡清单和今日打卡记录"""
+    today = date.today().isoformat()
+    conn = get_db_connection()
+    try:
+        for user_id in range(1, USERS + 1):
+            conn.execute('''
+                INSERT INTO user_profile (id, username, password, email) VALUES (?, ?, ?, ?)
+            ''', (user_id, f'bench{user_id}', 'x', f'bench{user_id}@example.com'))
+            for index in range(CHECK_ITEMS):
+                cursor = conn.execute('''
+                    INSERT INTO check_list (user_id, app_name) VALUES (?, ?)
+                ''', (user_id, f'应用{index}'))
+                if index % 2 == 0:
+                    conn.execute('''
+                        INSERT INTO check_record (user_id, check_list_id, check_date, check_status, app_name)
+                        VALUES (?, ?, ?, 'success', ?)
+                    ''', (user_id, cursor.lastrowid, today, f'应用{index}'))
+        conn.executemany('''
+            INSERT INTO project_likes (user_id, like_date) VALUES (?, ?)
+        ''', [(i % USERS + 1, f'2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}') for i in range(HISTORY_LIKES)])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _clear_likes(get_db_connection):
+    conn = get_db_connection()
+    try:
+        conn.execute('DELETE FROM project_likes WHERE like_date = ?', (date.today().isoformat(),))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def collect(workdir, stack):
+    import database.db_init as db_init
+    from database import get_db_connection, init_app
+    from components.user_cache import invalidate_user_profile
+    from route.login_route.account import account_bp
+    from route.index_box.check.api import check_api_bp
+
+    stack.enter_context(patch_attr(db_init, 'DB_FILE', workdir / 'bench.db'))
+    db_init.init_database()
+    _seed(get_db_connection)
+    # 用户资料缓存按用户ID缓存，切换数据库后清空
+    invalidate_user_profile()
+
+    app = Flask('bench_db')
+    app.secret_key = 'benchmark'
+    app.register_blueprint(account_bp)
+    app.register_blueprint(check_api_bp)
+    init_app(app)
+
+    clients = []
+    for user_id in range(1, USERS + 1):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+        clients.append(client)
+
+    executor = ThreadPoolExecutor(max_workers=USERS)
+    stack.callback(executor.shutdown)
+
+    def like(client, times=LIKES_PER_USER):
+        for _ in range(times):
+            response = client.post(LIKE_URL)
+            assert response.status_code == 200, response.get_json()
+
+    def check_list(client, times=LISTS_PER_USER):
+        for _ in range(times):
+            response = client.get(CHECK_LIST_URL)
+            assert response.status_code == 200, response.get_json()
+
+    def user_session(client):
+        # 每 3 次刷新清单点赞一次
+        likes = 0
+        for i in range(LISTS_PER_USER):
+            check_list(client, 1)
+            if i % 3 == 2 and likes < LIKES_PER_USER:
+                like(client, 1)
+                likes += 1
+
+    def like_count(client, times=COUNTS_PER_ROUND):
+        for _ in range(times):
+            response = client.get(LIKE_COUNT_URL)
+            assert response.status_code == 200, response.get_json()
+
+    def profile(client, times=COUNTS_PER_ROUND):
+        for _ in range(times):
+            response = client.get(PROFILE_URL)
+            assert response.status_code == 200, response.get_json()
+
+    def concurrent_users():
+        for future in [executor.submit(user_session, client) for client in clients]:
+            future.result()
+
+    reset = lambda: _clear_likes(get_db_connection)
+    return [
+        Case('db.like[threads=1]', lambda: like(clients[0]), setup=reset,
+             rounds=10, inner=1, ops=LIKES_PER_USER),
+        Case('db.check_list[threads=1]', lambda: check_list(clients[0]),
+             rounds=10, inner=1, ops=LISTS_PER_USER),
+        Case(f'db.mixed[threads={USERS}]', concurrent_users, setup=reset,
+             rounds=8, inner=1, ops=USERS * (LISTS_PER_USER + LIKES_PER_USER)),
+        Case(f'db.like_count[likes={HISTORY_LIKES}]', lambda: like_count(clients[0]),
+             rounds=10, inner=1, ops=COUNTS_PER_ROUND),
+        Case('db.account_profile[threads=1]', lambda: profile(clients[0]),
+             rounds=10, inner=1, ops=COUNTS_PER_ROUND),
+    ]
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+表情包基准：find_matching_emojis 匹配（使用真实 emojis.json）以及ID/收藏图片查询
+"""
+from benchmarks.harness import Case
+
+MESSAGES = {
+    'short': '哈哈哈',
+    'medium': '今天好累啊，不过看到你的消息还是很开心，晚安啦',
+    'long': ('（伸了个懒腰）今天终于把作业写完了！！虽然中间有点崩溃，但是想到周末可以去看电影就又有动力了～'
+             'By the way, did you watch the new anime yesterday? 我觉得第二集超级好笑，尤其是那个猫猫的表情，'
+             '简直和你发的表情包一模一样哈哈哈。对了，明天记得提醒我早点起床，不然又要迟到被老师说了，呜呜呜。') * 2,
+}
+
+
+def collect(workdir, stack):
+    from tools.send_pics.emoji_manager import (
+        load_emoji_database,
+        find_matching_emojis,
+        get_emoji_info,
+        get_emoji_file_path,
+        get_favorite_images,
+    )
+
+    # 预先加载数据库，只测量匹配本身
+    load_emoji_database()
+
+    cases = []
+    for label, message in MESSAGES.items():
+        cases.append(Case(
+            f'emoji.find_matching_emojis[{label}]',
+            lambda m=message: find_matching_emojis(m),
+            rounds=30, inner=20,
+        ))
+
+    emoji_ids = [emoji.get('id') for emoji in load_emoji_database()]
+
+    def lookup_all():
+        for emoji_id in emoji_ids:
+            get_emoji_info(emoji_id)
+            get_emoji_file_path(emoji_id)
+
+    cases.append(Case(f'emoji.lookup[ids={len(emoji_ids)}]', lookup_all, rounds=30, inner=20))
+    cases.append(Case('emoji.get_favorite_images', get_favorite_images, rounds=30, inner=20))
+    return cases
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+小说列表基准：/fiction/list
+在临时目录按日期生成大量文章 JSON
+"""
+import json
+from datetime import date, timedelta
+
+from flask import Flask
+
+from benchmarks.harness import Case, patch_attr
+
+# (日期文件夹数, 每天文章数)
+SCENARIOS = [
+    (30, 10),
+    (100, 20),
+]
+
+
+def _build_articles(out_dir, days, per_day):
+    body = '夜色渐深，街角的路灯一盏盏亮起，她抱着刚买的书慢慢往家走。' * 100
+    start = date(2025, 1, 1)
+    for d in range(days):
+        date_dir = out_dir / (start + timedelta(days=d)).strftime('%Y-%m-%d')
+        date_dir.mkdir(parents=True, exist_ok=True)
+        for i in range(per_day):
+            article = {
+                'title': f'第{d}天的第{i}篇故事',
+                'time': f'{8 + i % 12:02d}:00:00',
+                'word_count': len(body),
+                'content': body,
+            }
+            with open(date_dir / f'story_{i:03d}.json', 'w', encoding='utf-8') as f:
+                json.dump(article, f, ensure_ascii=False, indent=2)
+
+
+def collect(workdir, stack):
+    import route.index_box.fiction.api as fiction_api
+    from route.index_box.fiction.api import fiction_api_bp
+
+    cases = []
+    for days, per_day in SCENARIOS:
+        out_dir = workdir / f'out_{days}_{per_day}'
+        _build_articles(out_dir, days, per_day)
+
+        app = Flask('bench_fiction')
+        app.register_blueprint(fiction_api_bp, url_prefix='/api')
+        client = app.test_client()
+
+        def fetch(c=client, o=out_dir):
+            with patch_attr(fiction_api, 'FICTION_OUT_DIR', o):
+                response = c.get('/api/fiction/list')
+            assert response.status_code == 200
+
+        cases.append(Case(
+            f'fiction.get_fiction_list[days={days},per_day={per_day}]',
+            fetch,
+            rounds=10, inner=1,
+        ))
+    return cases
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+聊天历史存储基准：save_message / get_conversation_history
+覆盖不同会话长度（消息数）与用户历史文件数量
+"""
+import json
+from datetime import datetime, timedelta
+
+from benchmarks.harness import Case, patch_attr
+
+# (历史文件数, 最新会话消息数)
+SCENARIOS = [
+    (1, 10),
+    (1, 50),
+    (100, 50),
+    (1000, 50),
+]
+
+
+def make_messages(count):
+    """构造接近真实对话的消息列表"""
+    messages = []
+    for i in range(count):
+        if i % 2 == 0:
+            messages.append({
+                'role': 'user',
+                'content': f'第{i}条消息：今天天气怎么样？顺便帮我推荐一首适合晚上听的歌吧 hello world',
+                'timestamp': '2025-12-27T20:01:04.123456'
+            })
+        else:
+            messages.append({
+                'role': 'assistant',
+                'content': f'（歪头）第{i}条回复～今晚适合听点安静的曲子呀，比如《夜曲》，**要不要我再多推荐几首？**' * 2,
+                'timestamp': '2025-12-27T20:01:05.654321'
+            })
+    return messages
+
+
+def _populate_user(history_module, email, file_count, message_count):
+    """为用户生成 file_count 个历史文件，最新的一个包含 message_count 条消息"""
+    user_dir = history_module._get_user_dir(email)
+    start = datetime(2025, 1, 1, 8, 0, 0)
+    latest = None
+    for i in range(file_count):
+        name = (start + timedelta(minutes=37 * i)).strftime('%Y%m%d_%H%M%S') + '.json'
+        content = make_messages(message_count) if i == file_count - 1 else make_messages(4)
+        with open(user_dir / name, 'w', encoding='utf-8') as f:
+            json.dump(content, f, ensure_ascii=False, indent=2)
+        latest = name
+    return user_dir / latest
+
+
+def collect(workdir, stack):
+    from config.llm.base import history as history_module
+
+    stack.enter_context(patch_attr(history_module, 'HISTORY_DIR', workdir / 'chat_history'))
+
+    cases = []
+    for file_count, message_count in SCENARIOS:
+        email = f'bench_{file_count}_{message_count}@example.com'
+        latest_path = _populate_user(history_module, email, file_count, message_count)
+        latest_name = latest_path.name
+        snapshot = latest_path.read_bytes()
+        tag = f'files={file_count},msgs={message_count}'
+
+        cases.append(Case(
+            f'history.get_conversation_history[{tag},latest]',
+            lambda e=email: history_module.get_conversation_history(e),
+            rounds=30, inner=5,
+        ))
+        cases.append(Case(
+            f'history.get_conversation_history[{tag},current]',
+            lambda e=email, n=latest_name: history_module.get_conversation_history(e, None, n),
+            rounds=30, inner=5,
+        ))
+
+        def reset(e=email, path=latest_path, data=snapshot):
+            # 每轮恢复文件内容并清空线程本地的当前文件，测量“查找最新文件 + 追加”路径
+            path.write_bytes(data)
+            history_module.set_current_file(e, None)
+
+        cases.append(Case(
+            f'history.save_message[{tag}]',
+            lambda e=email: history_module.save_message(e, 'user', '基准测试消息：明天早上提醒我打卡'),
+            setup=reset, rounds=40, inner=1,
+        ))
+    return cases
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+通知投递基准
+模拟一个每次耗时 20 ms 的推送接口，投递一批提醒：
+    - workers=1：相当于原来在定时任务线程里逐个同步推送
+    - workers=4：投递线程池并发推送
+耗时为入队到全部发送完成（wait_idle）的时间。
+"""
+import time
+
+from benchmarks.harness import Case, patch_attr
+
+MESSAGES = 100
+ENDPOINT_DELAY = 0.02
+
+
+def _slow_endpoint(title, content):
+    time.sleep(ENDPOINT_DELAY)
+    return {'success': True}
+
+
+def collect(workdir, stack):
+    import database.db_init as db_init
+    from database import get_db_connection
+    from components.notify import NotificationDispatcher
+
+    stack.enter_context(patch_attr(db_init, 'DB_FILE', workdir / 'notify.db'))
+    db_init.init_database()
+
+    def clear_outbox():
+        conn = get_db_connection()
+        try:
+            conn.execute('DELETE FROM notification_outbox')
+            conn.commit()
+        finally:
+            conn.close()
+
+    cases = []
+    for workers in (1, 4):
+        # 每个投递器使用单独的渠道名，投递线程不会取到另一个用例的通知
+        channel = f'wechat_{workers}'
+        dispatcher = NotificationDispatcher(workers=workers)
+        dispatcher.register_channel(channel, _slow_endpoint)
+        dispatcher.start()
+        stack.callback(dispatcher.stop)
+        messages = [{'channel': channel, 'title': '📋 打卡提醒', 'content': f'用户 {i} 的打卡提醒'}
+                    for i in range(MESSAGES)]
+
+        def deliver(d=dispatcher, m=messages):
+            d.enqueue_many(m)
+            assert d.wait_idle(timeout=60)
+
+        cases.append(Case(
+            f'notify.deliver[messages={MESSAGES},endpoint={ENDPOINT_DELAY * 1000:.0f}ms,workers={workers}]',
+            deliver, setup=clear_outbox, rounds=3, inner=1, ops=MESSAGES,
+        ))
+    return cases
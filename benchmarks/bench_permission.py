@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+相册权限判断基准：check_image_permission
+遍历所有分类 × 图片类型 × 登录状态组合
+"""
+from benchmarks.harness import Case
+
+CATEGORIES = ['anime', 'photo', 'wallpaper', 'scene', 'unknown']
+IMAGE_TYPES = ['normal', 'abnormal', 'other']
+LOGIN_STATES = [(False, False), (True, False), (True, True)]
+
+
+def collect(workdir, stack):
+    from route.album_route.utils import check_image_permission
+
+    combos = [
+        (category, image_type, is_logged_in, is_admin)
+        for category in CATEGORIES
+        for image_type in IMAGE_TYPES
+        for is_logged_in, is_admin in LOGIN_STATES
+    ]
+
+    def run_all():
+        for args in combos:
+            check_image_permission(*args)
+
+    return [Case(f'album.check_image_permission[combos={len(combos)}]', run_all, rounds=30, inner=200)]
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+启动耗时基准：多模态模型模块的加载
+    - 导入 route.chat_route.utils（应用启动时由上传/生成路由导入）
+    - 各模型模块第一次使用时的加载和客户端创建
+    - 已是最新表结构时的 init_database()（每次应用启动都会执行）
+另外在子进程中用 -X importtime 测一次冷启动导入 route 包的累计耗时（包括依赖库），随结果打印。
+"""
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.harness import Case, patch_attr
+
+PROJECT_ROOT = Path(__file__).parent.parent
+UTILS_FILE = PROJECT_ROOT / 'route' / 'chat_route' / 'utils.py'
+
+
+def _exec_fresh(path, name):
+    """重新执行模块文件（不复用 sys.modules 中已导入的模块）"""
+    spec = importlib.util.spec_from_file_location(name, str(path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _cold_import_ms(workdir, module_names):
+    """在新进程中导入 route 包，返回各模块的累计导入耗时（毫秒），子进程失败时返回空字典"""
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT))
+    try:
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import route'],
+            cwd=workdir, env=env, capture_output=True, text=True, timeout=120
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return {}
+    pattern = re.compile(r'^import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*(\S+)$')
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = pattern.match(line.strip())
+        if match and match.group(2) in module_names:
+            timings[match.group(2)] = int(match.group(1)) / 1000
+    return timings
+
+
+def collect(workdir, stack):
+    from route.chat_route import utils as chat_utils
+
+    cold = _cold_import_ms(workdir, ('route', 'route.chat_route.utils'))
+    cold_info = None
+    if cold:
+        cold_info = '冷启动累计导入耗时: ' + '，'.join(f'{name} {ms:.0f} ms' for name, ms in cold.items())
+
+    cases = [Case(
+        'startup.import[route.chat_route.utils]',
+        lambda: _exec_fresh(UTILS_FILE, 'bench_chat_utils'),
+        rounds=20, inner=5, info=cold_info,
+    )]
+
+    for name in chat_utils.PROVIDERS:
+        state = {}
+
+        def reset(s=state):
+            s['registry'] = chat_utils.ProviderRegistry()
+
+        def first_use(s=state, n=name):
+            s['registry'].get(n).get_client()
+
+        cases.append(Case(f'startup.provider_first_use[{name}]', first_use, setup=reset, rounds=10, inner=1))
+
+    import database.db_init as db_init
+
+    stack.enter_context(patch_attr(db_init, 'DB_FILE', workdir / 'bench.db'))
+    db_init.init_database()
+    cases.append(Case('startup.init_database[up_to_date]', db_init.init_database, rounds=20, inner=20))
+    return cases
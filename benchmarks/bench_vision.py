@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+图片识别前预处理基准
+构造一张手机截图（PNG）和一张带 EXIF 方向的相机照片（JPEG），对比：
+    - 编码：原图直接 base64 与 预处理后 base64 的耗时和请求体大小
+    - 端到端：通过本地模拟的识别接口调用 recognize_image，接口按模拟上行带宽计算接收耗时
+
+需要 Pillow（构造测试图片和预处理都依赖它），未安装时跳过。
+"""
+import base64
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.harness import Case, patch_attr
+
+# 模拟的上行带宽（Mbps），本地回环没有带宽限制，按请求体大小补足传输耗时
+UPLINK_MBPS = 50
+
+
+def _make_screenshot(path):
+    """1170x2532 的聊天界面截图：顶栏、头像、文字行和几张图片消息"""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    rng = random.Random(37)
+    image = Image.new('RGB', (1170, 2532), (245, 245, 245))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 1170, 220), fill=(88, 101, 242))
+    y = 260
+    while y < 2400:
+        left = rng.random() < 0.5
+        x0 = 40 if left else 330
+        draw.ellipse((x0 - 10 if left else 1050, y, x0 + 90 if left else 1150, y + 100),
+                     fill=tuple(rng.randrange(256) for _ in range(3)))
+        if rng.random() < 0.25:
+            # 图片消息：带噪点的照片区域
+            photo = Image.effect_noise((560, 360), 60).convert('RGB').filter(ImageFilter.GaussianBlur(1))
+            image.paste(photo, (x0 + 120 if left else x0 - 40, y))
+            y += 400
+            continue
+        lines = rng.randint(1, 4)
+        bubble_right = x0 + 120 + 700 if left else 1030
+        draw.rounded_rectangle((x0 + 120 if left else x0, y, bubble_right, y + 30 + lines * 56),
+                               radius=24, fill=(255, 255, 255) if left else (149, 236, 105))
+        for line in range(lines):
+            x = (x0 + 150) if left else (x0 + 30)
+            while x < bubble_right - 80:
+                width = rng.randint(20, 44)
+                draw.rectangle((x, y + 28 + line * 56, x + width, y + 62 + line * 56), fill=(40, 40, 40))
+                x += width + rng.randint(4, 12)
+        y += 60 + lines * 56
+    image.save(path, 'PNG')
+
+
+def _make_photo(path):
+    """4032x3024 的相机照片（EXIF 方向为旋转 90 度）"""
+    from PIL import Image, ImageFilter
+
+    noise = Image.effect_noise((4032, 3024), 48).filter(ImageFilter.GaussianBlur(2))
+    gradient = Image.linear_gradient('L').resize((4032, 3024))
+    image = Image.merge('RGB', (gradient, noise, Image.eval(gradient, lambda v: 255 - v)))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    image.save(path, 'JPEG', quality=92, exif=exif.tobytes())
+
+
+class _FakeVisionHandler(BaseHTTPRequestHandler):
+    """模拟识别接口：读取请求体，按上行带宽等待后返回固定结果"""
+
+    received = []
+
+    def do_POST(self):
+        length = int(self.headers.get('content-length', 0))
+        body = self.rfile.read(length)
+        time.sleep(len(body) / (UPLINK_MBPS * 125000))
+        self.received.append(len(body))
+        payload = json.dumps({
+            'id': 'bench', 'object': 'chat.completion', 'created': 0, 'model': 'bench',
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': '一张图片'}}],
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _start_fake_vision(stack):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _FakeVisionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stack.callback(server.server_close)
+    stack.callback(server.shutdown)
+    return f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def _kb(size):
+    return f'{size / 1024:.0f} KB'
+
+
+def collect(workdir, stack):
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        print('⚠️  未安装 Pillow，跳过图片预处理基准')
+        return []
+
+    from openai import OpenAI
+    from components.media import prepare_image, vision_data_url
+    from route.chat_route import utils as chat_utils
+    from route.chat_route.upload_api import recognize_uploaded_image
+
+    images = {
+        'screenshot': workdir / 'screenshot.png',
+        'photo': workdir / 'photo.jpg',
+    }
+    _make_screenshot(images['screenshot'])
+    _make_photo(images['photo'])
+
+    base_url = _start_fake_vision(stack)
+    stack.enter_context(patch_attr(
+        chat_utils.get_provider('recognition'), '_client', OpenAI(base_url=base_url, api_key='benchmark')
+    ))
+
+    cases = []
+    for label, path in images.items():
+        data = path.read_bytes()
+        prepared = prepare_image(data, filename=path.name)
+        raw_url_size = len(base64.b64encode(data))
+        prepared_url_size = len(base64.b64encode(prepared.data))
+        size_info = (f'原图 {_kb(len(data))}（base64 {_kb(raw_url_size)}） -> '
+                     f'预处理 {prepared.width}x{prepared.height} {_kb(prepared.size)}'
+                     f'（base64 {_kb(prepared_url_size)}，{prepared_url_size / raw_url_size:.0%}）')
+
+        cases.append(Case(
+            f'vision.encode[{label},raw]',
+            lambda d=data: base64.b64encode(d),
+            rounds=10, inner=3, info=f'请求体图片 {_kb(raw_url_size)}',
+        ))
+        cases.append(Case(
+            f'vision.encode[{label},preprocessed]',
+            lambda d=data, n=path.name: vision_data_url(d, filename=n),
+            rounds=10, inner=3, info=size_info,
+        ))
+
+        def recognize_raw(p=path):
+            # 预处理之前的行为：读取原图直接 base64 编码
+            chat_utils.recognize_image(image_path=str(p))
+
+        cases.append(Case(
+            f'vision.recognize[{label},raw,uplink={UPLINK_MBPS}Mbps]',
+            recognize_raw,
+            rounds=5, inner=1,
+        ))
+        cases.append(Case(
+            f'vision.recognize[{label},preprocessed,uplink={UPLINK_MBPS}Mbps]',
+            lambda d=data, n=path.name: recognize_uploaded_image(d, n),
+            rounds=5, inner=1, info=size_info,
+        ))
+    return cases
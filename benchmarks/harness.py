@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试框架
+负责用例计时、统计、基线读写以及回归阈值判断
+"""
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# 基线文件路径
+BASELINE_FILE = Path(__file__).parent / 'baseline.json'
+
+# 默认回归阈值：中位数比基线慢 30% 以上视为回归
+DEFAULT_THRESHOLD = 0.30
+
+
+def prepare_environment():
+    """
+    准备基准测试运行环境
+
+    部分模块在导入时就会创建大模型客户端，缺少密钥会直接抛错。
+    基准测试不会调用任何外部接口，这里只补一个占位值保证模块可以导入。
+    """
+    os.environ.setdefault('ARK_API_KEY', 'benchmark-placeholder')
+    project_root = str(Path(__file__).parent.parent)
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+
+class Case:
+    """
+    单个基准用例
+
+    Args:
+        name: 用例名称（基线中的键）
+        func: 被测函数，无参数
+        setup: 每轮计时前执行的准备函数（不计入耗时）
+        rounds: 计时轮数
+        inner: 每轮内连续调用次数
+        threshold: 该用例的回归阈值（None 表示使用基线或默认值）
+        info: 随结果打印的附加说明（例如请求体大小），不写入基线
+        ops: 每次调用 func 处理的请求数，设置后按中位数打印吞吐量（次/秒）
+    """
+
+    def __init__(self, name, func, setup=None, rounds=20, inner=1, threshold=None, info=None, ops=None):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.rounds = rounds
+        self.inner = inner
+        self.threshold = threshold
+        self.info = info
+        self.ops = ops
+
+
+@contextmanager
+def patch_attr(obj, attr, value):
+    """临时替换对象属性（用于把数据目录指向临时目录），退出时恢复"""
+    original = getattr(obj, attr)
+    setattr(obj, attr, value)
+    try:
+        yield value
+    finally:
+        setattr(obj, attr, original)
+
+
+@contextmanager
+def working_directory(path):
+    """临时切换工作目录（部分路由使用相对路径 static/...）"""
+    original = os.getcwd()
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(original)
+
+
+@contextmanager
+def quiet():
+    """屏蔽被测代码中的 print 输出，避免终端IO干扰计时"""
+    devnull = open(os.devnull, 'w', encoding='utf-8')
+    saved = sys.stdout
+    sys.stdout = devnull
+    try:
+        yield
+    finally:
+        sys.stdout = saved
+        devnull.close()
+
+
+def measure(case):
+    """
+    执行一个用例并返回统计结果（单位：毫秒/次）
+
+    Returns:
+        dict: {'min_ms', 'median_ms', 'mean_ms', 'p95_ms', 'rounds', 'inner'}
+    """
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    with quiet():
+        # 预热一次，填充各类缓存
+        if case.setup:
+            case.setup()
+        case.func()
+
+        for _ in range(case.rounds):
+            if case.setup:
+                case.setup()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                for _ in range(case.inner):
+                    case.func()
+                elapsed = time.perf_counter() - start
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+            samples.append(elapsed * 1000.0 / case.inner)
+
+    samples.sort()
+    p95_index = min(len(samples) - 1, int(round(len(samples) * 0.95)) - 1)
+    return {
+        'min_ms': round(samples[0], 4),
+        'median_ms': round(statistics.median(samples), 4),
+        'mean_ms': round(statistics.fmean(samples), 4),
+        'p95_ms': round(samples[max(p95_index, 0)], 4),
+        'rounds': case.rounds,
+        'inner': case.inner,
+    }
+
+
+def load_baseline(path=BASELINE_FILE):
+    """读取基线文件，不存在时返回空基线"""
+    if not Path(path).exists():
+        return {'default_threshold': DEFAULT_THRESHOLD, 'benchmarks': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(results, previous=None, path=BASELINE_FILE):
+    """
+    保存基线
+
+    已有基线中手工调整过的阈值会被保留。
+    """
+    previous = previous or {}
+    old_entries = previous.get('benchmarks', {})
+    entries = {}
+    for name, stats in sorted(results.items()):
+        entry = {
+            'median_ms': stats['median_ms'],
+            'min_ms': stats['min_ms'],
+        }
+        old_threshold = old_entries.get(name, {}).get('threshold')
+        if old_threshold is not None:
+            entry['threshold'] = old_threshold
+        elif stats.get('threshold') is not None:
+            entry['threshold'] = stats['threshold']
+        entries[name] = entry
+
+    # 只更新了部分用例时，保留其余用例的旧基线
+    for name, entry in old_entries.items():
+        entries.setdefault(name, entry)
+
+    data = {
+        'default_threshold': previous.get('default_threshold', DEFAULT_THRESHOLD),
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+        },
+        'benchmarks': dict(sorted(entries.items())),
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    return data
+
+
+def compare(results, baseline, threshold_override=None):
+    """
+    将本次结果与基线对比
+
+    Returns:
+        list: [(name, status, ratio, threshold)]，status 为 ok/regression/faster/new
+    """
+    default_threshold = baseline.get('default_threshold', DEFAULT_THRESHOLD)
+    entries = baseline.get('benchmarks', {})
+    report = []
+    for name, stats in results.items():
+        entry = entries.get(name)
+        if not entry or not entry.get('median_ms'):
+            report.append((name, 'new', None, None))
+            continue
+
+        if threshold_override is not None:
+            threshold = threshold_override
+        else:
+            threshold = entry.get('threshold', stats.get('threshold') or default_threshold)
+
+        ratio = stats['median_ms'] / entry['median_ms']
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 / (1 + threshold):
+            status = 'faster'
+        else:
+            status = 'ok'
+        report.append((name, status, ratio, threshold))
+    return report
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试入口
+
+    python -m benchmarks.run [-k 关键字] [--update-baseline] [--threshold 0.3] [--no-fail]
+
+存在回归（中位数超过基线 × (1 + 阈值)）时以退出码 1 结束。
+"""
+import argparse
+import importlib
+import sys
+import tempfile
+from contextlib import ExitStack
+from pathlib import Path
+
+from benchmarks.harness import (
+    prepare_environment,
+    measure,
+    quiet,
+    load_baseline,
+    save_baseline,
+    compare,
+)
+
+# 基准模块列表，每个模块提供 collect(workdir, stack) -> [Case]
+BENCH_MODULES = [
+    'benchmarks.bench_history',
+    'benchmarks.bench_emoji',
+    'benchmarks.bench_chat_history',
+    'benchmarks.bench_album',
+    'benchmarks.bench_fiction',
+    'benchmarks.bench_permission',
+    'benchmarks.bench_vision',
+    'benchmarks.bench_startup',
+    'benchmarks.bench_db',
+    'benchmarks.bench_check',
+    'benchmarks.bench_notify',
+    'benchmarks.bench_admin_db',
+]
+
+
+def run_benchmarks(keyword=None, modules=None):
+    """
+    运行基准用例
+
+    Args:
+        keyword: 只运行名称包含该关键字的用例
+        modules: 要运行的模块列表（默认全部）
+
+    Returns:
+        dict: {用例名: 统计结果}
+    """
+    results = {}
+    for module_name in modules or BENCH_MODULES:
+        module = importlib.import_module(module_name)
+        # 每个模块使用独立的临时目录，ExitStack 先于临时目录清理
+        with tempfile.TemporaryDirectory(prefix='dodokolu_bench_') as tmp:
+            with ExitStack() as stack:
+                with quiet():
+                    cases = module.collect(Path(tmp), stack)
+                for case in cases:
+                    if keyword and keyword not in case.name:
+                        continue
+                    stats = measure(case)
+                    stats['threshold'] = case.threshold
+                    results[case.name] = stats
+                    print(f"  {case.name:<58} median {stats['median_ms']:>10.4f} ms  "
+                          f"min {stats['min_ms']:>10.4f} ms  p95 {stats['p95_ms']:>10.4f} ms")
+                    if case.ops and stats['median_ms']:
+                        print(f"      吞吐量 {case.ops * 1000 / stats['median_ms']:.0f} 次/秒")
+                    if case.info:
+                        print(f"      {case.info}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='dodokolu 热点路径基准测试')
+    parser.add_argument('-k', '--keyword', help='只运行名称包含该关键字的用例')
+    parser.add_argument('--update-baseline', action='store_true', help='以本次结果更新基线文件')
+    parser.add_argument('--threshold', type=float, default=None, help='覆盖所有用例的回归阈值（如 0.3 表示慢 30%%）')
+    parser.add_argument('--no-fail', action='store_true', help='出现回归时不返回非零退出码')
+    args = parser.parse_args(argv)
+
+    prepare_environment()
+
+    print('⏱️  开始运行基准测试...')
+    results = run_benchmarks(keyword=args.keyword)
+    if not results:
+        print('⚠️  没有匹配的基准用例')
+        return 0
+
+    baseline = load_baseline()
+
+    if args.update_baseline:
+        save_baseline(results, previous=baseline)
+        print(f'✅ 基线已更新，共 {len(results)} 个用例')
+        return 0
+
+    report = compare(results, baseline, threshold_override=args.threshold)
+    regressions = []
+    print('\n📊 与基线对比:')
+    for name, status, ratio, threshold in report:
+        if status == 'new':
+            print(f'  🆕 {name}: 基线中无记录')
+            continue
+        mark = {'ok': '✅', 'faster': '🚀', 'regression': '❌'}[status]
+        print(f'  {mark} {name}: {ratio:.2f}x（阈值 +{threshold:.0%}）')
+        if status == 'regression':
+            regressions.append(name)
+
+    if regressions:
+        print(f'\n❌ 发现 {len(regressions)} 个性能回归: {", ".join(regressions)}')
+        return 0 if args.no_fail else 1
+
+    print('\n✅ 未发现性能回归')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,13 +2,24 @@
 """
 打卡提醒定时任务
 每天9:00、15:00、21:00检查打卡状态，如果未完成则发送微信推送
+推送消息批量写入通知发件箱，由通知投递线程发送（限流、失败重试），
+同一用户在同一提醒时段只会入队一次。
 """
 import schedule
 import time
 import threading
-from datetime import date, datetime
-from database import get_db_connection
-from components.check.message_wechat_push import push_wechat_message
+from datetime import datetime
+from components.check.check_store import get_all_users_today_status
+from components.notify import get_dispatcher
+
+# 每天的提醒时间
+REMINDER_TIMES = ['09:00', '15:00', '21:00']
+
+
+def _reminder_slot(now):
+    """当前时间所属的提醒时段（用于去重），早于第一个提醒时间时为 00:00"""
+    current = now.strftime('%H:%M')
+    return max((t for t in REMINDER_TIMES if t <= current), default='00:00')
 
 
 def check_and_remind():
@@ -19,100 +30,65 @@ def check_and_remind():
         print(f"📋 [{timestamp}] 开始执行打卡提醒任务...")
         print(f"{'=' * 70}")
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        now = datetime.now()
+        today = now.date().isoformat()
+        slot = _reminder_slot(now)
         
-        try:
-            today = date.today().isoformat()
-            
-            # 获取所有活跃用户
-            cursor.execute('''
-                SELECT DISTINCT user_id FROM check_list WHERE is_active = 1
-            ''')
+        # 所有用户的有效打卡项及今日状态（一条 JOIN 查询）
+        users = get_all_users_today_status(today)
+        total_users = len(users)
+        
+        messages = []
+        recipients = []
+        for user in users:
+            check_items = user['items']
             
-            users = cursor.fetchall()
-            total_users = len(users)
-            success_count = 0
-            failed_count = 0
+            # 检查每个清单项的今日打卡状态
+            completed_items = [item['app_name'] for item in check_items if item['status'] == 'completed']
+            pending_items = [item['app_name'] for item in check_items if item['status'] != 'completed']
             
-            for user_row in users:
-                user_id = user_row['user_id']
-                
-                # 获取该用户的待打卡清单
-                cursor.execute('''
-                    SELECT id, app_name
-                    FROM check_list
-                    WHERE user_id = ? AND is_active = 1
-                ''', (user_id,))
-                
-                check_items = cursor.fetchall()
-                
-                if not check_items:
+            # 如果有未完成的打卡项，发送提醒（用户已不存在时跳过）
+            if pending_items:
+                if not user['email']:
                     continue
                 
-                # 检查每个清单项的今日打卡状态
-                pending_items = []
-                completed_items = []
+                # 构建提醒消息
+                title = "📋 打卡提醒"
+                content = f"今日打卡状态检查\n\n"
+                content += f"✅ 已完成 ({len(completed_items)}/{len(check_items)}):\n"
+                if completed_items:
+                    for app in completed_items:
+                        content += f"  • {app}\n"
+                else:
+                    content += "  暂无\n"
                 
-                for item in check_items:
-                    item_id = item['id']
-                    app_name = item['app_name']
-                    
-                    # 查询今日打卡记录
-                    cursor.execute('''
-                        SELECT check_status
-                        FROM check_record
-                        WHERE user_id = ? AND check_list_id = ? AND check_date = ?
-                    ''', (user_id, item_id, today))
-                    
-                    record = cursor.fetchone()
-                    if record and record['check_status'] == 'completed':
-                        completed_items.append(app_name)
-                    else:
-                        pending_items.append(app_name)
+                content += f"\n⏰ 待完成 ({len(pending_items)}/{len(check_items)}):\n"
+                for app in pending_items:
+                    content += f"  • {app}\n"
                 
-                # 如果有未完成的打卡项，发送提醒
-                if pending_items:
-                    # 获取用户邮箱（用于标识）
-                    cursor.execute('''
-                        SELECT email FROM user_profile WHERE id = ?
-                    ''', (user_id,))
-                    
-                    user = cursor.fetchone()
-                    if not user:
-                        continue
-                    
-                    # 构建提醒消息
-                    title = "📋 打卡提醒"
-                    content = f"今日打卡状态检查\n\n"
-                    content += f"✅ 已完成 ({len(completed_items)}/{len(check_items)}):\n"
-                    if completed_items:
-                        for app in completed_items:
-                            content += f"  • {app}\n"
-                    else:
-                        content += "  暂无\n"
-                    
-                    content += f"\n⏰ 待完成 ({len(pending_items)}/{len(check_items)}):\n"
-                    for app in pending_items:
-                        content += f"  • {app}\n"
-                    
-                    content += f"\n请及时完成打卡任务！"
-                    
-                    # 发送微信推送
-                    result = push_wechat_message(title=title, content=content)
-                    
-                    if result.get('success'):
-                        success_count += 1
-                        print(f"   ✅ 用户 {user['email']} - 提醒发送成功 ({len(pending_items)} 项待完成)")
-                    else:
-                        failed_count += 1
-                        print(f"   ❌ 用户 {user['email']} - 提醒发送失败: {result.get('error_message')}")
-            
-            print(f"\n📊 任务统计: 总用户 {total_users}, 成功 {success_count}, 失败 {failed_count}")
-            print(f"{'=' * 70}\n")
+                content += f"\n请及时完成打卡任务！"
+                
+                messages.append({
+                    'channel': 'wechat',
+                    'title': title,
+                    'content': content,
+                    # 同一用户同一提醒时段只提醒一次（任务重复执行或手动执行时不会重复推送）
+                    'dedup_key': f"check_reminder:{user['user_id']}:{today}:{slot}"
+                })
+                recipients.append((user['email'], len(pending_items)))
+        
+        # 批量写入发件箱，由通知投递线程发送
+        ids = get_dispatcher().enqueue_many(messages) if messages else []
+        queued_count = 0
+        for (email, pending_count), notification_id in zip(recipients, ids):
+            if notification_id is None:
+                print(f"   ⏭️  用户 {email} - 本时段已提醒，跳过")
+            else:
+                queued_count += 1
+                print(f"   📨 用户 {email} - 提醒已加入发送队列 ({pending_count} 项待完成)")
         
-        finally:
-            conn.close()
+        print(f"\n📊 任务统计: 总用户 {total_users}, 入队 {queued_count}, 重复跳过 {len(ids) - queued_count}")
+        print(f"{'=' * 70}\n")
     
     except Exception as e:
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -127,9 +103,8 @@ def start_check_reminder_schedule():
     """在后台线程中启动打卡提醒定时任务"""
     def run_schedule():
         # 设置三个时间点执行：9:00、15:00、21:00
-        schedule.every().day.at("09:00").do(check_and_remind)
-        schedule.every().day.at("15:00").do(check_and_remind)
-        schedule.every().day.at("21:00").do(check_and_remind)
+        for reminder_time in REMINDER_TIMES:
+            schedule.every().day.at(reminder_time).do(check_and_remind)
         
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         print(f"   ⏰ [{timestamp}] 定时任务已注册: 每天 9:00、15:00、21:00 执行")
@@ -151,6 +126,8 @@ if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == '--now':
         print("立即执行打卡提醒检查...")
         check_and_remind()
+        # 投递线程是守护线程，等待发送完成后再退出
+        get_dispatcher().wait_idle(timeout=120)
     else:
         # 否则启动定时任务
         print("启动定时任务模式")
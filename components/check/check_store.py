@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+打卡数据访问
+“有效打卡项及其今日状态”由打卡清单接口和打卡提醒任务共用，
+每次调用只执行一条 check_list LEFT JOIN check_record 查询，不再逐项查询打卡记录。
+"""
+from datetime import date
+from itertools import groupby
+
+from database import get_db_connection
+
+# 有效打卡项 + 指定日期的打卡记录（没有记录时记录字段为 NULL）+ 用户邮箱
+_ITEMS_WITH_STATUS_SQL = '''
+    SELECT cl.id, cl.user_id, cl.app_name, cl.created_at, cl.updated_at,
+           cr.check_status, cr.check_in_date, cr.details, cr.confidence,
+           u.email
+    FROM check_list cl
+    LEFT JOIN check_record cr
+        ON cr.user_id = cl.user_id AND cr.check_list_id = cl.id AND cr.check_date = ?
+    LEFT JOIN user_profile u ON u.id = cl.user_id
+    WHERE cl.is_active = 1 {condition}
+    ORDER BY {order}
+'''
+
+
+def _item(row):
+    return {
+        'id': row['id'],
+        'app_name': row['app_name'],
+        'status': row['check_status'] or 'pending',
+        'check_in_date': row['check_in_date'],
+        'details': row['details'],
+        'confidence': row['confidence'],
+        'created_at': row['created_at'],
+        'updated_at': row['updated_at']
+    }
+
+
+def _query(sql, params, conn=None):
+    owned = conn is None
+    if owned:
+        conn = get_db_connection()
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        if owned:
+            conn.close()
+
+
+def get_items_with_today_status(user_id, today=None, conn=None):
+    """
+    用户的有效打卡项及今日打卡状态
+
+    Args:
+        user_id: 用户ID
+        today: 日期（ISO 格式，默认今天）
+        conn: 使用已有连接（默认从连接池取出）
+
+    Returns:
+        list: [{'id', 'app_name', 'status', 'check_in_date', 'details', 'confidence',
+                'created_at', 'updated_at'}]，按创建时间排序，没有今日记录时 status 为 pending
+    """
+    today = today or date.today().isoformat()
+    sql = _ITEMS_WITH_STATUS_SQL.format(condition='AND cl.user_id = ?', order='cl.created_at ASC, cl.id ASC')
+    return [_item(row) for row in _query(sql, (today, user_id), conn)]
+
+
+def get_all_users_today_status(today=None, conn=None):
+    """
+    所有有效打卡项的用户及其今日打卡状态（打卡提醒使用）
+
+    Returns:
+        list: [{'user_id', 'email', 'items': [...]}]，按用户ID排序；
+              email 为None表示用户已不存在，items 格式同 get_items_with_today_status
+    """
+    today = today or date.today().isoformat()
+    sql = _ITEMS_WITH_STATUS_SQL.format(condition='', order='cl.user_id ASC, cl.id ASC')
+    rows = _query(sql, (today,), conn)
+    users = []
+    for user_id, group in groupby(rows, key=lambda row: row['user_id']):
+        group = list(group)
+        users.append({'user_id': user_id, 'email': group[0]['email'], 'items': [_item(row) for row in group]})
+    return users
+
+
+__all__ = ['get_items_with_today_status', 'get_all_users_today_status']
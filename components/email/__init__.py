@@ -2,7 +2,15 @@
 """
 邮箱发送模块
 """
-from .email_sender import send_email, send_verification_code
-
-__all__ = ['send_email', 'send_verification_code']
+from .email_sender import send_email, send_verification_code, verification_code_content
+from .outbox import EMAIL_CHANNEL, SMTPSender, enqueue_email, register_email_channel
 
+__all__ = [
+    'send_email',
+    'send_verification_code',
+    'verification_code_content',
+    'EMAIL_CHANNEL',
+    'SMTPSender',
+    'enqueue_email',
+    'register_email_channel'
+]
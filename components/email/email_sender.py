@@ -15,9 +15,26 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
-def send_email(to_email, subject, content, content_type='html', image_paths=None):
+def get_smtp_config():
+    """读取 SMTP 配置（每次调用时读取环境变量）"""
+    config = {
+        'server': os.getenv('QQ_EMAIL_SMTP_SERVER', 'smtp.qq.com'),
+        'port': int(os.getenv('QQ_EMAIL_SMTP_PORT', '587')),
+        'use_ssl': os.getenv('QQ_EMAIL_USE_SSL', 'false').lower() == 'true',
+        'starttls': os.getenv('QQ_EMAIL_STARTTLS', 'true').lower() == 'true',
+        'timeout': float(os.getenv('QQ_EMAIL_TIMEOUT', '30')),
+        'sender_email': os.getenv('QQ_EMAIL_SENDER'),
+        'sender_password': os.getenv('QQ_EMAIL_PASSWORD'),
+        'sender_name': os.getenv('QQ_EMAIL_SENDER_NAME', '系统通知')
+    }
+    if not config['sender_email'] or not config['sender_password']:
+        raise ValueError("请在 .env 文件中配置 QQ_EMAIL_SENDER 和 QQ_EMAIL_PASSWORD")
+    return config
+
+
+def build_message(to_email, subject, content, content_type='html', image_paths=None):
     """
-    发送邮件
+    构建邮件
     
     Args:
         to_email (str): 收件人邮箱地址
@@ -27,17 +44,11 @@ def send_email(to_email, subject, content, content_type='html', image_paths=None
         image_paths (list): 可选，图片文件路径列表，将作为附件发送
     
     Returns:
-        bool: 发送成功返回 True
+        str: 完整的邮件文本（附件已编码在内）
     """
-    # 读取配置
-    smtp_server = os.getenv('QQ_EMAIL_SMTP_SERVER', 'smtp.qq.com')
-    smtp_port = int(os.getenv('QQ_EMAIL_SMTP_PORT', '587'))
-    sender_email = os.getenv('QQ_EMAIL_SENDER')
-    sender_password = os.getenv('QQ_EMAIL_PASSWORD')
-    sender_name = os.getenv('QQ_EMAIL_SENDER_NAME', '系统通知')
-    
-    if not sender_email or not sender_password:
-        raise ValueError("请在 .env 文件中配置 QQ_EMAIL_SENDER 和 QQ_EMAIL_PASSWORD")
+    config = get_smtp_config()
+    sender_email = config['sender_email']
+    sender_name = config['sender_name']
     
     # 检查是否有有效的图片附件
     valid_image_paths = []
@@ -83,29 +94,97 @@ def send_email(to_email, subject, content, content_type='html', image_paths=None
         message['To'] = to_email
         message['Subject'] = Header(subject, 'utf-8')
     
-    # 发送邮件
-    try:
-        server = smtplib.SMTP(smtp_server, smtp_port, timeout=30)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        server.sendmail(sender_email, [to_email], message.as_string())
-        server.quit()
-        return True
-    except Exception as e:
-        raise Exception(f"发送邮件失败: {str(e)}")
+    return message.as_string()
 
 
-def send_verification_code(to_email, code):
+class SMTPConnection:
     """
-    发送验证码邮件
+    可复用的 SMTP 连接（非线程安全，每个发送线程一个）
+    第一次发送时连接并登录，之后复用；连接被服务器断开时重新连接并重发一次。
+    """
+
+    def __init__(self):
+        self._server = None
+        self._sender_email = None
+        self.connects = 0
+
+    @property
+    def connected(self):
+        return self._server is not None
+
+    def _connect(self):
+        config = get_smtp_config()
+        if config['use_ssl']:
+            server = smtplib.SMTP_SSL(config['server'], config['port'], timeout=config['timeout'])
+        else:
+            server = smtplib.SMTP(config['server'], config['port'], timeout=config['timeout'])
+        try:
+            if not config['use_ssl'] and config['starttls']:
+                server.starttls()
+            server.login(config['sender_email'], config['sender_password'])
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        self._sender_email = config['sender_email']
+        self.connects += 1
+
+    def send(self, to_email, message):
+        """
+        发送一封已构建好的邮件
+
+        Raises:
+            smtplib.SMTPException / OSError: 发送失败
+        """
+        if self._server is None:
+            self._connect()
+        try:
+            self._server.sendmail(self._sender_email, [to_email], message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # 空闲连接可能已被服务器关闭，重新连接后重发一次
+            self.close()
+            self._connect()
+            self._server.sendmail(self._sender_email, [to_email], message)
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+
+
+def send_email(to_email, subject, content, content_type='html', image_paths=None):
+    """
+    同步发送邮件（每次新建连接，请求中发送邮件请使用 components.email.outbox）
     
     Args:
         to_email (str): 收件人邮箱地址
-        code (str): 验证码
+        subject (str): 邮件主题
+        content (str): 邮件内容
+        content_type (str): 内容类型，'html' 或 'plain'，默认为 'html'
+        image_paths (list): 可选，图片文件路径列表，将作为附件发送
     
     Returns:
         bool: 发送成功返回 True
     """
+    message = build_message(to_email, subject, content, content_type, image_paths)
+    
+    # 发送邮件
+    connection = SMTPConnection()
+    try:
+        connection.send(to_email, message)
+        return True
+    except Exception as e:
+        raise Exception(f"发送邮件失败: {str(e)}")
+    finally:
+        connection.close()
+
+
+def verification_code_content(code):
+    """验证码邮件的主题和内容"""
     subject = "dodokolu注册验证码"
     content = f"""
     <html>
@@ -119,4 +198,19 @@ def send_verification_code(to_email, code):
     </body>
     </html>
     """
+    return subject, content
+
+
+def send_verification_code(to_email, code):
+    """
+    同步发送验证码邮件
+    
+    Args:
+        to_email (str): 收件人邮箱地址
+        code (str): 验证码
+    
+    Returns:
+        bool: 发送成功返回 True
+    """
+    subject, content = verification_code_content(code)
     return send_email(to_email, subject, content, 'html')
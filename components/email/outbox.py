@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+邮件发送渠道
+邮件作为通知投递器（components.notify）的 email 渠道发送：请求中只把构建好的邮件写入发件箱
+（notification_outbox，recipient 为收件人），立即返回；重试、发送租约和统计都由投递器负责。
+
+    - 复用一个已登录的 SMTP 连接（渠道并发上限为 1），空闲超过 EMAIL_SMTP_IDLE_TIMEOUT 秒后下次发送前重新连接
+    - 连接断开、4xx 响应等临时错误按投递器的退避时间重试，5xx（收件人不存在、内容被拒等）直接标记为失败
+    - 发送成功或最终失败后清空邮件正文（验证码不在数据库中长期保留）
+"""
+import os
+import smtplib
+import threading
+import time
+
+from .email_sender import SMTPConnection, build_message
+
+# 渠道名
+EMAIL_CHANNEL = 'email'
+# 默认最大尝试次数
+EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', '5'))
+# SMTP 连接空闲多久后不再复用（秒），QQ 邮箱会断开长时间空闲的连接
+EMAIL_SMTP_IDLE_TIMEOUT = float(os.getenv('EMAIL_SMTP_IDLE_TIMEOUT', '60'))
+
+
+def is_permanent_error(error):
+    """5xx 响应（认证失败除外）重试也不会成功，其余错误视为临时错误"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(500 <= code < 600 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
+class SMTPSender:
+    """
+    email 渠道的发送函数：sender(recipient, subject, message) -> dict
+
+    Args:
+        idle_timeout: SMTP 连接空闲超时（秒）
+        connection_factory: 创建 SMTP 连接的函数
+    """
+
+    def __init__(self, idle_timeout=EMAIL_SMTP_IDLE_TIMEOUT, connection_factory=SMTPConnection):
+        self.idle_timeout = idle_timeout
+        self._connection = connection_factory()
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+        self._counters = {'reconnects': 0}
+
+    def __call__(self, recipient, subject, message):
+        """
+        发送一封已构建好的邮件
+
+        Raises:
+            ValueError: 5xx 响应，不再重试
+        """
+        with self._lock:
+            if self._connection.connected and time.monotonic() - self._last_used > self.idle_timeout:
+                self._connection.close()
+            was_connected = self._connection.connected
+            connects = getattr(self._connection, 'connects', 0)
+            try:
+                self._connection.send(recipient, message)
+                return {'success': True}
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                if is_permanent_error(e):
+                    raise ValueError(error)
+                # 连接状态未知，下次发送时重新连接
+                self._connection.close()
+                return {'success': False, 'error_message': error}
+            finally:
+                self._last_used = time.monotonic()
+                if was_connected and getattr(self._connection, 'connects', 0) > connects:
+                    self._counters['reconnects'] += 1
+
+    def close(self):
+        """关闭 SMTP 连接"""
+        with self._lock:
+            self._connection.close()
+
+    def stats(self):
+        with self._lock:
+            return {'connected': self._connection.connected, **self._counters}
+
+
+def register_email_channel(dispatcher, idle_timeout=EMAIL_SMTP_IDLE_TIMEOUT, connection_factory=SMTPConnection,
+                           max_attempts=EMAIL_MAX_ATTEMPTS):
+    """
+    在投递器上注册 email 渠道
+
+    Returns:
+        SMTPSender: 渠道的发送函数
+    """
+    sender = SMTPSender(idle_timeout, connection_factory)
+    dispatcher.register_channel(
+        EMAIL_CHANNEL,
+        sender,
+        max_attempts=max_attempts,
+        concurrency=1,
+        with_recipient=True,
+        keep_content=False
+    )
+    return sender
+
+
+def enqueue_email(to_email, subject, content, content_type='html', image_paths=None, max_attempts=None,
+                  dispatcher=None):
+    """
+    提交一封邮件（附件在入队时读取并编码）
+
+    Args:
+        dispatcher: 通知投递器（默认 get_dispatcher()）
+
+    Returns:
+        int: 通知ID
+
+    Raises:
+        ValueError: 未配置发件邮箱
+    """
+    if dispatcher is None:
+        from components.notify import get_dispatcher
+        dispatcher = get_dispatcher()
+    message = build_message(to_email, subject, content, content_type, image_paths)
+    return dispatcher.enqueue(EMAIL_CHANNEL, subject, message, max_attempts=max_attempts, recipient=to_email)
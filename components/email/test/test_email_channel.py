@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+邮件发送测试
+在本机启动一个 SMTP 服务替身（socketserver 实现的最小 SMTP 会话），邮件通过通知投递器的 email 渠道发送：
+    - 4xx 响应按退避时间重试，成功后只收到一封
+    - 5xx 响应不重试，直接标记为失败
+    - 连接被服务器断开时重新连接并重发
+    - 两个投递器（模拟 Flask 重载时的父子进程）共用发件箱时，每封邮件只发送一次
+    - 发送完成后清空邮件正文
+"""
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+root_dir = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database import db_init
+from components.email import EMAIL_CHANNEL, enqueue_email, register_email_channel
+from components.notify import NotificationDispatcher, STATUS_FAILED, STATUS_SENDING, STATUS_SENT
+
+
+class StandInHandler(socketserver.StreamRequestHandler):
+    """一个 SMTP 会话：支持 EHLO / AUTH PLAIN / MAIL / RCPT / DATA，并按服务的 failures 依次模拟失败"""
+
+    def reply(self, *lines):
+        self.wfile.write(''.join(f'{line}\r\n' for line in lines).encode('ascii'))
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 stand-in ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line.decode('ascii', 'replace').strip().split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250-stand-in', '250-AUTH PLAIN', '250 8BITMIME')
+            elif verb == 'AUTH':
+                self.reply('235 2.7.0 Authentication successful')
+            elif verb == 'MAIL':
+                if server.take_failure('drop'):
+                    # 模拟服务器断开空闲连接
+                    return
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                if server.take_failure('451'):
+                    self.reply('451 4.3.0 Try again later')
+                elif server.take_failure('550'):
+                    self.reply('550 5.1.1 No such user')
+                else:
+                    recipient = line.decode('ascii').split(':', 1)[1].strip().strip('<>')
+                    self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                for data_line in self.rfile:
+                    if data_line == b'.\r\n':
+                        break
+                    data.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                if server.delay:
+                    time.sleep(server.delay)
+                with server.lock:
+                    server.received.append((recipient, b''.join(data)))
+                self.reply('250 OK')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    """本机 SMTP 服务替身，记录收到的邮件"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.port = self.server_address[1]
+        self.lock = threading.Lock()
+        # 依次模拟的失败：'drop'（MAIL 时断开连接）、'451'、'550'（RCPT 响应）
+        self.failures = []
+        self.received = []
+        self.delay = 0
+        self.connections = 0
+
+    def take_failure(self, failure):
+        with self.lock:
+            if self.failures and self.failures[0] == failure:
+                self.failures.pop(0)
+                return True
+            return False
+
+
+@contextmanager
+def smtp_stand_in():
+    """启动 SMTP 服务替身，并让发件配置指向它"""
+    server = StandInServer()
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    env = {
+        'QQ_EMAIL_SMTP_SERVER': '127.0.0.1',
+        'QQ_EMAIL_SMTP_PORT': str(server.port),
+        'QQ_EMAIL_USE_SSL': 'false',
+        'QQ_EMAIL_STARTTLS': 'false',
+        'QQ_EMAIL_TIMEOUT': '5',
+        'QQ_EMAIL_SENDER': 'sender@example.com',
+        'QQ_EMAIL_PASSWORD': 'secret'
+    }
+    try:
+        with mock.patch.dict(os.environ, env):
+            yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def temp_database():
+    """临时数据库"""
+    with tempfile.TemporaryDirectory() as workdir:
+        with mock.patch.object(db_init, 'DB_FILE', Path(workdir) / 'email.db'):
+            db_init.init_database()
+            yield
+
+
+def make_dispatcher(**kwargs):
+    dispatcher = NotificationDispatcher(workers=2, retry_base_delay=0.2, **kwargs)
+    register_email_channel(dispatcher, max_attempts=3)
+    return dispatcher
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_retry_with_backoff():
+    """4xx 响应按退避时间重试，成功后只收到一封"""
+    with temp_database(), smtp_stand_in() as server:
+        server.failures = ['451']
+        dispatcher = make_dispatcher()
+        email_id = enqueue_email('user@example.com', '验证码', '<p>123456</p>', dispatcher=dispatcher)
+        assert wait_until(lambda: dispatcher.get(email_id)['status'] == STATUS_SENT)
+
+        email = dispatcher.get(email_id)
+        assert email['channel'] == EMAIL_CHANNEL and email['recipient'] == 'user@example.com'
+        assert email['attempts'] == 2
+        assert email['last_error'] is None
+        assert email['content'] == ''
+        assert len(server.received) == 1
+        assert server.received[0][0] == 'user@example.com'
+        dispatcher.stop(1)
+
+
+def test_permanent_failure():
+    """5xx 响应不重试"""
+    with temp_database(), smtp_stand_in() as server:
+        server.failures = ['550']
+        dispatcher = make_dispatcher()
+        email_id = enqueue_email('nobody@example.com', '验证码', '<p>123456</p>', dispatcher=dispatcher)
+        assert wait_until(lambda: dispatcher.get(email_id)['status'] == STATUS_FAILED)
+
+        email = dispatcher.get(email_id)
+        assert email['attempts'] == 1
+        assert '550' in email['last_error']
+        assert email['content'] == ''
+        assert server.received == []
+        dispatcher.stop(1)
+
+
+def test_reconnect_after_disconnect():
+    """复用的连接被服务器断开后重新连接并重发"""
+    with temp_database(), smtp_stand_in() as server:
+        dispatcher = make_dispatcher()
+        first = enqueue_email('a@example.com', '通知', '第一封', dispatcher=dispatcher)
+        assert wait_until(lambda: dispatcher.get(first)['status'] == STATUS_SENT)
+
+        server.failures = ['drop']
+        second = enqueue_email('b@example.com', '通知', '第二封', dispatcher=dispatcher)
+        assert wait_until(lambda: dispatcher.get(second)['status'] == STATUS_SENT)
+        assert dispatcher.get(second)['attempts'] == 1
+        assert [recipient for recipient, _ in server.received] == ['a@example.com', 'b@example.com']
+        assert dispatcher.stats()['channels'][EMAIL_CHANNEL]['sender']['reconnects'] == 1
+        assert server.connections == 2
+        dispatcher.stop(1)
+
+
+def test_no_duplicate_send_across_instances():
+    """两个投递器共用发件箱：另一个投递器启动、恢复和入队时不会重复发送"""
+    with temp_database(), smtp_stand_in() as server:
+        server.delay = 0.3
+        parent = make_dispatcher()
+        child = make_dispatcher()
+
+        slow_id = enqueue_email('slow@example.com', '通知', '慢', dispatcher=parent)
+        assert wait_until(lambda: parent.get(slow_id)['status'] == STATUS_SENDING)
+
+        # 子进程：启动恢复 + 入队自动启动投递线程
+        assert child.recover_expired() == 0
+        ids = [enqueue_email(f'user{i}@example.com', '通知', str(i), dispatcher=child) for i in range(4)]
+        for notification_id in [slow_id, *ids]:
+            assert wait_until(lambda: parent.get(notification_id)['status'] == STATUS_SENT, timeout=10)
+
+        recipients = sorted(recipient for recipient, _ in server.received)
+        assert recipients == sorted(['slow@example.com', *(f'user{i}@example.com' for i in range(4))])
+        parent.stop(1)
+        child.stop(1)
+
+
+if __name__ == '__main__':
+    test_retry_with_backoff()
+    test_permanent_failure()
+    test_reconnect_after_disconnect()
+    test_no_duplicate_send_across_instances()
+    print("✅ 邮件发送测试通过")
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+后台任务模块
+"""
+from .job_queue import (
+    JobQueue,
+    JobContext,
+    JobPending,
+    PermanentJobError,
+    QuotaExceeded,
+    get_job_queue,
+    start_job_workers,
+    STATUS_QUEUED,
+    STATUS_RUNNING,
+    STATUS_SUCCEEDED,
+    STATUS_FAILED,
+    FINISHED_STATUSES
+)
+
+__all__ = [
+    'JobQueue',
+    'JobContext',
+    'JobPending',
+    'PermanentJobError',
+    'QuotaExceeded',
+    'get_job_queue',
+    'start_job_workers',
+    'STATUS_QUEUED',
+    'STATUS_RUNNING',
+    'STATUS_SUCCEEDED',
+    'STATUS_FAILED',
+    'FINISHED_STATUSES'
+]
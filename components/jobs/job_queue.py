@@ -0,0 +1,622 @@
+# -*- coding: utf-8 -*-
+"""
+后台任务队列
+任务持久化在 SQLite 的 generation_jobs 表中，由常驻的工作线程池执行。
+路由只负责入队并立即返回任务ID，前端通过状态接口或 SSE 获取进度。
+
+调度规则：
+    - 同时执行的任务数不超过工作线程数（全局并发上限），生成任务不会占满 Web 请求线程
+    - 优先级数值小的任务类型先执行（图片生成比视频生成便宜，优先）
+    - 同一优先级内按用户轮转：正在执行任务少、最久未被调度的用户优先，单个用户同时执行的任务数有上限
+    - 入队时检查用户配额：未完成任务数和每日提交数
+
+执行租约：
+    - 取出任务时记录执行者（worker_id）和租约到期时间，执行期间由续约线程和 ctx.set_progress 续约
+    - 任务结束时的状态更新只在租约仍属于本执行者时生效
+    - 只有应用启动时（start_job_workers）才把租约已过期的运行中任务放回队列；
+      入队时自动启动工作线程不会恢复任务，其他进程正在执行的任务不会被重复执行
+
+任务处理函数签名：handler(ctx) -> dict（任务结果）
+    - ctx.payload: 入队时的参数（可通过 ctx.update_payload 持久化中间状态，例如上游任务ID）
+    - ctx.set_progress(message): 更新进度描述
+    - 抛出 JobPending(delay) 表示上游仍在处理，delay 秒后再次执行（不计入重试次数，也不占用工作线程）
+    - 抛出 PermanentJobError 表示失败且不再重试，其他异常按指数退避重试
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+from database import get_db_connection
+
+# 工作线程数（全局并发上限）
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+# 单个用户同时执行的任务数上限
+JOB_USER_MAX_RUNNING = int(os.getenv('JOB_USER_MAX_RUNNING', '1'))
+# 单个用户未完成（排队中+执行中）的任务数上限
+JOB_USER_MAX_ACTIVE = int(os.getenv('JOB_USER_MAX_ACTIVE', '3'))
+# 单个用户每天可提交的任务数（0 表示不限制）
+JOB_USER_DAILY_LIMIT = int(os.getenv('JOB_USER_DAILY_LIMIT', '30'))
+# 默认最大尝试次数
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+# 重试退避基数（秒），第 n 次重试等待 base * 2^(n-1)
+JOB_RETRY_BASE_DELAY = float(os.getenv('JOB_RETRY_BASE_DELAY', '5'))
+# 执行租约时长（秒），执行者超过该时间未续约时任务才可被恢复
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '120'))
+# 默认优先级（数值越小越优先）
+JOB_DEFAULT_PRIORITY = 10
+# 空闲时检查到期任务的最长间隔（秒）
+JOB_POLL_INTERVAL = 1.0
+# 每次调度时读取的候选任务数
+JOB_SCHEDULE_BATCH = 100
+# 每种任务类型保留的等待时间样本数（用于统计）
+WAIT_SAMPLES = 200
+
+# 任务状态
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+
+
+class JobPending(Exception):
+    """上游仍在处理，稍后再次执行任务（不计入重试次数）"""
+
+    def __init__(self, delay, message=None):
+        super().__init__(message or '')
+        self.delay = delay
+        self.message = message
+
+
+class PermanentJobError(Exception):
+    """不可重试的任务错误"""
+
+
+class QuotaExceeded(Exception):
+    """用户任务配额已用完"""
+
+
+class LeaseLost(Exception):
+    """任务的执行租约已不属于当前执行者（已过期并被恢复），应放弃执行"""
+
+
+class JobContext:
+    """传给任务处理函数的上下文"""
+
+    def __init__(self, job_queue, job):
+        self._queue = job_queue
+        self.job_id = job['id']
+        self.job_type = job['job_type']
+        self.user_email = job['user_email']
+        self.payload = job['payload']
+        self.attempts = job['attempts']
+
+    def set_progress(self, message):
+        """
+        更新进度描述，同时续约
+
+        Raises:
+            LeaseLost: 租约已不属于当前执行者
+        """
+        self._queue._update_leased(self.job_id, progress=message)
+
+    def update_payload(self, **changes):
+        """
+        修改并持久化任务参数（重试或进程重启后仍可读取），同时续约
+
+        Raises:
+            LeaseLost: 租约已不属于当前执行者
+        """
+        self.payload.update(changes)
+        self._queue._update_leased(self.job_id, payload=json.dumps(self.payload, ensure_ascii=False))
+
+
+def _row_to_job(row):
+    """数据库行转为任务字典"""
+    if row is None:
+        return None
+    job = dict(row)
+    job['payload'] = json.loads(job['payload']) if job['payload'] else {}
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+def _percentile(sorted_values, ratio):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * ratio))
+    return sorted_values[index]
+
+
+class JobQueue:
+    """
+    持久化任务队列
+
+    Args:
+        workers: 工作线程数（全局并发上限）
+        user_max_running: 单个用户同时执行的任务数上限
+        user_max_active: 单个用户未完成的任务数上限
+        user_daily_limit: 单个用户每天可提交的任务数（0 表示不限制）
+        lease_seconds: 执行租约时长（秒）
+    """
+
+    def __init__(self, workers=JOB_WORKERS, user_max_running=JOB_USER_MAX_RUNNING,
+                 user_max_active=JOB_USER_MAX_ACTIVE, user_daily_limit=JOB_USER_DAILY_LIMIT,
+                 lease_seconds=JOB_LEASE_SECONDS):
+        self.workers = max(1, workers)
+        self.user_max_running = max(1, user_max_running)
+        self.user_max_active = user_max_active
+        self.user_daily_limit = user_daily_limit
+        self.lease_seconds = lease_seconds
+        # 执行者标识：同一数据库的多个进程（以及同一进程中的多个队列实例）互不相同
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._handlers = {}
+        self._threads = []
+        self._cond = threading.Condition()
+        self._version = 0  # 任何任务状态变化时递增，用于唤醒等待方
+        self._started = False
+        self._lock = threading.Lock()
+        self._enqueue_lock = threading.Lock()
+        # 调度状态（受 _schedule_lock 保护）
+        self._schedule_lock = threading.Lock()
+        self._running_by_user = {}
+        self._last_served = {}
+        self._wait_samples = {}
+        self._counters = {'succeeded': 0, 'failed': 0, 'retried': 0, 'rejected': 0, 'recovered': 0, 'lease_lost': 0}
+
+    # ------------------------------------------------------------------
+    # 注册与启动
+    # ------------------------------------------------------------------
+
+    def register_handler(self, job_type, handler, max_attempts=JOB_MAX_ATTEMPTS, priority=JOB_DEFAULT_PRIORITY):
+        """
+        注册任务处理函数
+
+        Args:
+            job_type: 任务类型
+            handler: 处理函数
+            max_attempts: 最大尝试次数
+            priority: 优先级（数值越小越优先）
+        """
+        self._handlers[job_type] = {'handler': handler, 'max_attempts': max_attempts, 'priority': priority}
+
+    def start(self):
+        """
+        启动工作线程和续约线程（重复调用无副作用）
+
+        不恢复任务：运行中的任务可能正由其他进程执行，恢复由 recover_expired 在应用启动时单独执行
+        """
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._renew_loop, name='job-lease-renewer', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"🧵 [任务队列] 已启动 {self.workers} 个工作线程")
+
+    def recover_expired(self):
+        """
+        把租约已过期的运行中任务放回队列（执行它的进程已退出），退还本次尝试次数
+
+        Returns:
+            int: 恢复的任务数
+        """
+        now = time.time()
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute('''
+                UPDATE generation_jobs
+                SET status = ?, attempts = MAX(attempts - 1, 0), next_run_at = ?, updated_at = ?,
+                    worker_id = NULL, lease_expires_at = NULL
+                WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+            ''', (STATUS_QUEUED, now, now, STATUS_RUNNING, now))
+            conn.commit()
+            recovered = cursor.rowcount
+        finally:
+            conn.close()
+        if recovered:
+            with self._schedule_lock:
+                self._counters['recovered'] += recovered
+            print(f"🧵 [任务队列] 恢复 {recovered} 个租约已过期的任务")
+            self._notify()
+        return recovered
+
+    # ------------------------------------------------------------------
+    # 入队与查询
+    # ------------------------------------------------------------------
+
+    def enqueue(self, job_type, user_email, payload, max_attempts=None):
+        """
+        提交任务
+
+        Returns:
+            str: 任务ID
+
+        Raises:
+            QuotaExceeded: 用户未完成任务过多或当日提交数已达上限
+        """
+        if job_type not in self._handlers:
+            raise ValueError(f'未注册的任务类型: {job_type}')
+        if max_attempts is None:
+            max_attempts = self._handlers[job_type]['max_attempts']
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        # 配额检查与插入需要串行，避免并发提交绕过配额
+        with self._enqueue_lock:
+            conn = get_db_connection()
+            try:
+                self._check_quota(conn, user_email, now)
+                conn.execute('''
+                    INSERT INTO generation_jobs
+                    (id, job_type, user_email, payload, status, progress, attempts, max_attempts,
+                     next_run_at, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?)
+                ''', (job_id, job_type, user_email, json.dumps(payload, ensure_ascii=False),
+                      STATUS_QUEUED, '排队中', max_attempts, now, now, now))
+                conn.commit()
+            finally:
+                conn.close()
+
+        self.start()
+        self._notify()
+        return job_id
+
+    def _check_quota(self, conn, user_email, now):
+        """检查用户配额，超出时抛出 QuotaExceeded"""
+        if self.user_max_active > 0:
+            active = conn.execute('''
+                SELECT COUNT(*) FROM generation_jobs
+                WHERE user_email = ? AND status IN (?, ?)
+            ''', (user_email, STATUS_QUEUED, STATUS_RUNNING)).fetchone()[0]
+            if active >= self.user_max_active:
+                with self._schedule_lock:
+                    self._counters['rejected'] += 1
+                raise QuotaExceeded(f'还有 {active} 个生成任务未完成，请稍后再试')
+
+        if self.user_daily_limit > 0:
+            day_start = datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+            submitted = conn.execute('''
+                SELECT COUNT(*) FROM generation_jobs
+                WHERE user_email = ? AND created_at >= ?
+            ''', (user_email, day_start)).fetchone()[0]
+            if submitted >= self.user_daily_limit:
+                with self._schedule_lock:
+                    self._counters['rejected'] += 1
+                raise QuotaExceeded(f'今日生成次数已达上限（{self.user_daily_limit} 次），明天再来吧')
+
+    def get(self, job_id):
+        """查询任务，不存在时返回None"""
+        conn = get_db_connection()
+        try:
+            row = conn.execute('SELECT * FROM generation_jobs WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return _row_to_job(row)
+
+    def queue_position(self, job):
+        """
+        排队任务前面还有多少个同优先级或更高优先级的到期任务（非排队状态返回0）
+        """
+        if job['status'] != STATUS_QUEUED:
+            return 0
+        priority = self._priority(job['job_type'])
+        ahead_types = [t for t in self._handlers if self._priority(t) <= priority]
+        placeholders = ','.join('?' * len(ahead_types))
+        conn = get_db_connection()
+        try:
+            return conn.execute(f'''
+                SELECT COUNT(*) FROM generation_jobs
+                WHERE status = ? AND job_type IN ({placeholders}) AND next_run_at < ? AND id != ?
+            ''', (STATUS_QUEUED, *ahead_types, job['next_run_at'], job['id'])).fetchone()[0]
+        finally:
+            conn.close()
+
+    def wait_for_update(self, version, timeout):
+        """
+        等待任务状态变化
+
+        Args:
+            version: 调用方上次看到的版本号
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            int: 当前版本号
+        """
+        with self._cond:
+            if self._version == version:
+                self._cond.wait(timeout)
+            return self._version
+
+    @property
+    def version(self):
+        return self._version
+
+    def stats(self):
+        """
+        队列统计：各类型排队/执行数、最早排队任务的等待时长、调度等待时间分布、用户数和计数器
+        """
+        now = time.time()
+        conn = get_db_connection()
+        try:
+            rows = conn.execute('''
+                SELECT job_type, status, COUNT(*) AS count, MIN(created_at) AS oldest
+                FROM generation_jobs
+                WHERE status IN (?, ?)
+                GROUP BY job_type, status
+            ''', (STATUS_QUEUED, STATUS_RUNNING)).fetchall()
+        finally:
+            conn.close()
+
+        types = {}
+        for job_type, handler in self._handlers.items():
+            types[job_type] = {'priority': handler['priority'], 'queued': 0, 'running': 0, 'oldest_queued_age': None}
+        for row in rows:
+            entry = types.setdefault(row['job_type'], {'priority': None, 'queued': 0, 'running': 0, 'oldest_queued_age': None})
+            entry[row['status']] = row['count']
+            if row['status'] == STATUS_QUEUED:
+                entry['oldest_queued_age'] = round(now - row['oldest'], 1)
+
+        with self._schedule_lock:
+            for job_type, samples in self._wait_samples.items():
+                waits = sorted(samples)
+                entry = types.setdefault(job_type, {'priority': None, 'queued': 0, 'running': 0, 'oldest_queued_age': None})
+                entry['wait'] = {
+                    'samples': len(waits),
+                    'avg': round(sum(waits) / len(waits), 2) if waits else None,
+                    'p50': round(_percentile(waits, 0.5), 2) if waits else None,
+                    'p95': round(_percentile(waits, 0.95), 2) if waits else None,
+                    'max': round(waits[-1], 2) if waits else None
+                }
+            running_users = sum(1 for count in self._running_by_user.values() if count)
+            counters = dict(self._counters)
+
+        return {
+            'workers': self.workers,
+            'user_max_running': self.user_max_running,
+            'user_max_active': self.user_max_active,
+            'user_daily_limit': self.user_daily_limit,
+            'lease_seconds': self.lease_seconds,
+            'queue_depth': sum(entry['queued'] for entry in types.values()),
+            'running': sum(entry['running'] for entry in types.values()),
+            'running_users': running_users,
+            'types': types,
+            'counters': counters
+        }
+
+    # ------------------------------------------------------------------
+    # 工作线程
+    # ------------------------------------------------------------------
+
+    def _priority(self, job_type):
+        handler = self._handlers.get(job_type)
+        return handler['priority'] if handler else JOB_DEFAULT_PRIORITY
+
+    def _worker_loop(self):
+        while True:
+            try:
+                job = self._claim_next()
+            except Exception as e:
+                print(f"❌ [任务队列] 获取任务失败: {e}")
+                job = None
+
+            if job is None:
+                with self._cond:
+                    self._cond.wait(JOB_POLL_INTERVAL)
+                continue
+
+            try:
+                self._run(job)
+            finally:
+                with self._schedule_lock:
+                    self._running_by_user[job['user_email']] -= 1
+                # 释放了一个执行名额，唤醒其他工作线程重新调度
+                self._notify()
+
+    def _claim_next(self):
+        """按调度规则取出一个到期的排队任务并标记为运行中，没有时返回None"""
+        job_types = list(self._handlers)
+        if not job_types:
+            return None
+        placeholders = ','.join('?' * len(job_types))
+        now = time.time()
+        conn = get_db_connection()
+        try:
+            rows = conn.execute(f'''
+                SELECT * FROM generation_jobs
+                WHERE status = ? AND next_run_at <= ? AND job_type IN ({placeholders})
+                ORDER BY next_run_at
+                LIMIT ?
+            ''', (STATUS_QUEUED, now, *job_types, JOB_SCHEDULE_BATCH)).fetchall()
+            if not rows:
+                return None
+
+            with self._schedule_lock:
+                running = self._running_by_user
+                candidates = [row for row in rows if running.get(row['user_email'], 0) < self.user_max_running]
+                # 优先级 -> 用户正在执行的任务数 -> 用户上次被调度的时间 -> 到期时间
+                candidates.sort(key=lambda row: (
+                    self._priority(row['job_type']),
+                    running.get(row['user_email'], 0),
+                    self._last_served.get(row['user_email'], 0),
+                    row['next_run_at']
+                ))
+                for row in candidates:
+                    # 条件更新保证多个工作线程（或多个进程）不会取到同一个任务
+                    cursor = conn.execute('''
+                        UPDATE generation_jobs
+                        SET status = ?, attempts = attempts + 1, started_at = COALESCE(started_at, ?), updated_at = ?,
+                            worker_id = ?, lease_expires_at = ?
+                        WHERE id = ? AND status = ?
+                    ''', (STATUS_RUNNING, now, now, self.worker_id, now + self.lease_seconds,
+                          row['id'], STATUS_QUEUED))
+                    conn.commit()
+                    if cursor.rowcount != 1:
+                        continue
+
+                    user_email = row['user_email']
+                    running[user_email] = running.get(user_email, 0) + 1
+                    self._last_served[user_email] = now
+                    if row['started_at'] is None:
+                        # 首次开始执行：记录排队等待时间
+                        samples = self._wait_samples.setdefault(row['job_type'], deque(maxlen=WAIT_SAMPLES))
+                        samples.append(now - row['created_at'])
+
+                    job = _row_to_job(row)
+                    job['attempts'] += 1
+                    return job
+            return None
+        finally:
+            conn.close()
+
+    def _run(self, job):
+        handler = self._handlers[job['job_type']]['handler']
+        ctx = JobContext(self, job)
+        try:
+            result = handler(ctx)
+        except LeaseLost:
+            self._lease_lost(job)
+        except JobPending as pending:
+            # 上游未完成：退还本次尝试次数，稍后再执行
+            self._release(
+                job,
+                status=STATUS_QUEUED,
+                attempts=job['attempts'] - 1,
+                next_run_at=time.time() + pending.delay,
+                progress=pending.message
+            )
+        except Exception as e:
+            retryable = not isinstance(e, PermanentJobError)
+            if retryable and job['attempts'] < job['max_attempts']:
+                delay = JOB_RETRY_BASE_DELAY * (2 ** (job['attempts'] - 1))
+                print(f"⚠️  [任务队列] 任务 {job['id']} 第 {job['attempts']} 次执行失败，{delay:.0f} 秒后重试: {e}")
+                with self._schedule_lock:
+                    self._counters['retried'] += 1
+                self._release(
+                    job,
+                    status=STATUS_QUEUED,
+                    next_run_at=time.time() + delay,
+                    error=str(e),
+                    progress=f'执行失败，{delay:.0f} 秒后重试'
+                )
+            else:
+                print(f"❌ [任务队列] 任务 {job['id']} 失败: {e}")
+                with self._schedule_lock:
+                    self._counters['failed'] += 1
+                self._release(
+                    job,
+                    status=STATUS_FAILED,
+                    error=str(e),
+                    progress='生成失败',
+                    finished_at=time.time()
+                )
+        else:
+            with self._schedule_lock:
+                self._counters['succeeded'] += 1
+            self._release(
+                job,
+                status=STATUS_SUCCEEDED,
+                result=json.dumps(result, ensure_ascii=False),
+                error=None,
+                progress='已完成',
+                finished_at=time.time()
+            )
+
+    def _update(self, job_id, owned=False, **fields):
+        """
+        更新任务字段并唤醒等待方
+
+        Args:
+            owned: 只在任务仍由本执行者运行时更新
+
+        Returns:
+            bool: 是否更新了任务
+        """
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        where = 'id = ?'
+        params = [*fields.values(), job_id]
+        if owned:
+            where += ' AND status = ? AND worker_id = ?'
+            params += [STATUS_RUNNING, self.worker_id]
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute(f'UPDATE generation_jobs SET {assignments} WHERE {where}', params)
+            conn.commit()
+            updated = cursor.rowcount == 1
+        finally:
+            conn.close()
+        self._notify()
+        return updated
+
+    def _update_leased(self, job_id, **fields):
+        """执行中更新任务字段并续约，租约已不属于本执行者时抛出 LeaseLost"""
+        if not self._update(job_id, owned=True, lease_expires_at=time.time() + self.lease_seconds, **fields):
+            raise LeaseLost(job_id)
+
+    def _release(self, job, **fields):
+        """执行结束（完成、失败或放回队列）时更新任务并释放租约"""
+        if fields['status'] == STATUS_QUEUED:
+            fields['worker_id'] = None
+        if not self._update(job['id'], owned=True, lease_expires_at=None, **fields):
+            self._lease_lost(job)
+
+    def _lease_lost(self, job):
+        print(f"⚠️  [任务队列] 任务 {job['id']} 的租约已过期并被恢复，放弃本次执行结果")
+        with self._schedule_lock:
+            self._counters['lease_lost'] += 1
+
+    def _renew_loop(self):
+        """定期为本执行者正在运行的任务续约（处理函数长时间没有更新进度时租约也不会过期）"""
+        while True:
+            time.sleep(self.lease_seconds / 3)
+            now = time.time()
+            conn = get_db_connection()
+            try:
+                conn.execute('''
+                    UPDATE generation_jobs SET lease_expires_at = ?
+                    WHERE status = ? AND worker_id = ?
+                ''', (now + self.lease_seconds, STATUS_RUNNING, self.worker_id))
+                conn.commit()
+            except Exception as e:
+                print(f"⚠️  [任务队列] 续约失败: {e}")
+            finally:
+                conn.close()
+
+    def _notify(self):
+        with self._cond:
+            self._version += 1
+            self._cond.notify_all()
+
+
+# 任务队列单例
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """获取任务队列单例"""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue()
+    return _job_queue
+
+
+def start_job_workers():
+    """启动任务队列工作线程（应用启动时调用，恢复租约已过期的任务）"""
+    job_queue = get_job_queue()
+    job_queue.recover_expired()
+    job_queue.start()
+    return job_queue
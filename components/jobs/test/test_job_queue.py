@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+任务队列测试
+两个队列实例（模拟 Flask 重载时的父子进程）共用同一个数据库：
+    - 另一个实例启动、入队时不会把正在执行的任务放回队列，任务只执行一次
+    - 执行者退出后，租约过期的任务在启动恢复时放回队列，由另一个实例执行
+    - 租约被恢复后，原执行者的进度更新和结束状态不再生效
+"""
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+root_dir = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database import db_init
+from components.jobs.job_queue import JobContext, JobQueue, LeaseLost, STATUS_QUEUED, STATUS_RUNNING, STATUS_SUCCEEDED
+
+
+@contextmanager
+def temp_database():
+    """临时数据库"""
+    with tempfile.TemporaryDirectory() as workdir:
+        with mock.patch.object(db_init, 'DB_FILE', Path(workdir) / 'jobs.db'):
+            db_init.init_database()
+            yield
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def make_queue(handler, **kwargs):
+    job_queue = JobQueue(workers=1, user_daily_limit=0, **kwargs)
+    job_queue.register_handler('test', handler, max_attempts=1)
+    return job_queue
+
+
+def test_second_instance_does_not_requeue_running_job():
+    """另一个实例启动、恢复和入队时，正在执行的任务不受影响"""
+    with temp_database():
+        release = threading.Event()
+        runs = []
+
+        def handler(ctx):
+            runs.append(ctx.job_id)
+            if ctx.payload.get('block'):
+                release.wait(5)
+            ctx.set_progress('即将完成')
+            return {'ok': True}
+
+        parent = make_queue(handler)
+        child = make_queue(handler)
+
+        job_id = parent.enqueue('test', 'a@example.com', {'block': True})
+        assert wait_until(lambda: parent.get(job_id)['status'] == STATUS_RUNNING)
+
+        # 子进程：启动恢复 + 入队自动启动工作线程
+        assert child.recover_expired() == 0
+        other_id = child.enqueue('test', 'b@example.com', {})
+        assert wait_until(lambda: child.get(other_id)['status'] == STATUS_SUCCEEDED)
+        assert parent.get(job_id)['status'] == STATUS_RUNNING
+
+        release.set()
+        assert wait_until(lambda: parent.get(job_id)['status'] == STATUS_SUCCEEDED)
+        assert runs.count(job_id) == 1
+        assert parent.get(job_id)['worker_id'] == parent.worker_id
+        assert parent.get(job_id)['lease_expires_at'] is None
+
+
+def test_expired_lease_is_recovered_once():
+    """执行者退出后租约过期的任务被恢复并由另一个实例执行，原执行者的更新不再生效"""
+    with temp_database():
+        runs = []
+
+        def handler(ctx):
+            runs.append(ctx.job_id)
+            return {'ok': True}
+
+        # 已退出的进程：取出了任务但不再续约（不启动工作线程）
+        dead = make_queue(handler, lease_seconds=0.2)
+        with mock.patch.object(dead, 'start'):
+            job_id = dead.enqueue('test', 'a@example.com', {})
+        job = dead._claim_next()
+        assert job['id'] == job_id
+        stale = dead.get(job_id)
+        assert stale['status'] == STATUS_RUNNING and stale['worker_id'] == dead.worker_id
+
+        alive = make_queue(handler)
+        # 租约未过期时不恢复
+        assert alive.recover_expired() == 0
+        time.sleep(0.3)
+        assert alive.recover_expired() == 1
+        recovered = alive.get(job_id)
+        assert recovered['status'] == STATUS_QUEUED
+        assert recovered['attempts'] == 0
+        assert recovered['worker_id'] is None
+
+        alive.start()
+        assert wait_until(lambda: alive.get(job_id)['status'] == STATUS_SUCCEEDED)
+        assert runs == [job_id]
+
+        # 原执行者迟到的进度更新和结束状态被拒绝
+        ctx_job = dict(job)
+        ctx = JobContext(dead, ctx_job)
+        try:
+            ctx.set_progress('还在执行')
+        except LeaseLost:
+            pass
+        else:
+            raise AssertionError('租约已过期时 set_progress 应抛出 LeaseLost')
+        dead._release(job, status='failed', error='迟到的失败')
+        assert alive.get(job_id)['status'] == STATUS_SUCCEEDED
+        assert dead.stats()['counters']['lease_lost'] == 1
+
+
+def test_progress_extends_lease():
+    """set_progress 续约"""
+    with temp_database():
+        leases = []
+
+        def handler(ctx):
+            leases.append(ctx._queue.get(ctx.job_id)['lease_expires_at'])
+            time.sleep(0.05)
+            ctx.set_progress('处理中')
+            leases.append(ctx._queue.get(ctx.job_id)['lease_expires_at'])
+            return {}
+
+        job_queue = make_queue(handler)
+        job_id = job_queue.enqueue('test', 'a@example.com', {})
+        assert wait_until(lambda: job_queue.get(job_id)['status'] == STATUS_SUCCEEDED)
+        assert leases[1] > leases[0]
+
+
+if __name__ == '__main__':
+    test_second_instance_does_not_requeue_running_job()
+    test_expired_lease_is_recovered_once()
+    test_progress_extends_lease()
+    print("✅ 任务队列测试通过")
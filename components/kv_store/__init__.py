@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+短期键值存储
+带有效期的键值数据（验证码、发送限流等），按命名空间区分，两种后端接口相同：
+    - memory：进程内存储，时间轮定时清理过期键（默认，单进程部署）
+    - sqlite：存在数据库 kv_store 表中，多个工作进程共享（多进程部署时使用）
+
+通过环境变量 KV_STORE_BACKEND 选择后端。
+
+接口：
+    get(key, default=None)     读取未过期的值
+    set(key, value, ttl)       写入，ttl 秒后过期
+    add(key, value, ttl)       不存在时写入，返回是否写入（限流）
+    incr(key, ttl)             计数加一，返回新值（首次加一时开始计算有效期）
+    delete(key)                删除，返回是否删除了未过期的值（只有一个调用方返回 True）
+    purge_expired()            清理过期键
+"""
+import os
+import threading
+
+from .memory import MemoryKVStore
+from .sqlite import SQLiteKVStore
+
+KV_STORE_BACKEND = os.getenv('KV_STORE_BACKEND', 'memory')
+
+BACKENDS = {
+    'memory': MemoryKVStore,
+    'sqlite': SQLiteKVStore
+}
+
+# 命名空间 -> 存储实例
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_kv_store(namespace, backend=None):
+    """
+    获取命名空间对应的键值存储（单例）
+
+    Args:
+        namespace: 命名空间
+        backend: memory / sqlite（默认读取 KV_STORE_BACKEND）
+    """
+    backend = backend or KV_STORE_BACKEND
+    key = (backend, namespace)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                if backend not in BACKENDS:
+                    raise ValueError(f'未知的键值存储后端: {backend}')
+                store = BACKENDS[backend](namespace)
+                _stores[key] = store
+    return store
+
+
+def get_kv_store_stats():
+    """所有已创建的存储的统计信息"""
+    with _stores_lock:
+        stores = list(_stores.values())
+    return [store.stats() for store in stores]
+
+
+__all__ = [
+    'KV_STORE_BACKEND',
+    'MemoryKVStore',
+    'SQLiteKVStore',
+    'get_kv_store',
+    'get_kv_store_stats'
+]
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+进程内的短期键值存储
+过期时间由时间轮管理：每个键按过期时刻放入对应的槽，后台线程每个刻度只检查当前槽，
+过期的键即使再也不被访问也会被清理，内存不会随废弃的键无限增长。
+读取时也会检查过期时间，清理线程只负责回收内存。
+"""
+import copy
+import math
+import threading
+import time
+
+# 时间轮刻度（秒）和槽数：一圈 10 分钟，更长的有效期在槽中停留多圈
+WHEEL_TICK = 1.0
+WHEEL_SLOTS = 600
+
+
+class MemoryKVStore:
+    """
+    进程内键值存储（线程安全），只适用于单进程部署
+
+    Args:
+        namespace: 命名空间（统计展示用）
+        tick: 时间轮刻度（秒）
+        slots: 时间轮槽数
+    """
+
+    backend = 'memory'
+
+    def __init__(self, namespace, tick=WHEEL_TICK, slots=WHEEL_SLOTS):
+        self.namespace = namespace
+        self.tick = tick
+        # 键 -> (值, 过期时间)
+        self._data = {}
+        self._wheel = [set() for _ in range(slots)]
+        self._lock = threading.Lock()
+        self._cursor = int(time.monotonic() / tick)
+        self._thread = None
+        self._stats = {'expired': 0}
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
+
+    def get(self, key, default=None):
+        """读取未过期的值"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= now:
+                return default
+            return copy.deepcopy(entry[0])
+
+    def set(self, key, value, ttl):
+        """写入（覆盖已有值），ttl 秒后过期"""
+        with self._lock:
+            self._put(key, value, time.monotonic() + ttl)
+        self._ensure_sweeper()
+
+    def add(self, key, value, ttl):
+        """
+        键不存在（或已过期）时写入
+
+        Returns:
+            bool: 是否写入（用于限流：同一时间窗口内只有一个调用方成功）
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] > now:
+                return False
+            self._put(key, value, now + ttl)
+        self._ensure_sweeper()
+        return True
+
+    def incr(self, key, ttl):
+        """
+        计数加一；键不存在（或已过期）时从 1 开始，有效期为 ttl 秒（之后的加一不延长有效期）
+
+        Returns:
+            int: 加一后的值
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= now:
+                self._put(key, 1, now + ttl)
+                count = 1
+            else:
+                count = entry[0] + 1
+                self._data[key] = (count, entry[1])
+        self._ensure_sweeper()
+        return count
+
+    def delete(self, key):
+        """
+        删除
+
+        Returns:
+            bool: 是否删除了未过期的值（并发删除时只有一个调用方返回 True）
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry is not None and entry[1] > now
+
+    def _put(self, key, value, expires_at):
+        self._data[key] = (copy.deepcopy(value), expires_at)
+        # 覆盖写入时旧槽中的记录留到该槽被检查时再跳过
+        self._wheel[self._slot(expires_at)].add(key)
+
+    def _slot(self, expires_at):
+        """过期时刻之后的第一个刻度所在的槽：检查该槽时键一定已经过期"""
+        return math.ceil(expires_at / self.tick) % len(self._wheel)
+
+    # ------------------------------------------------------------------
+    # 过期清理
+    # ------------------------------------------------------------------
+
+    def purge_expired(self):
+        """
+        推进时间轮，清理到期槽中已过期的键
+
+        Returns:
+            int: 清理的键数
+        """
+        now = time.monotonic()
+        target = int(now / self.tick)
+        removed = 0
+        with self._lock:
+            # 落后超过一圈时每个槽检查一次即可
+            start = max(self._cursor, target - len(self._wheel) + 1)
+            for position in range(start, target + 1):
+                slot = self._wheel[position % len(self._wheel)]
+                if not slot:
+                    continue
+                keep = set()
+                for key in slot:
+                    entry = self._data.get(key)
+                    if entry is None:
+                        continue
+                    if entry[1] <= now:
+                        del self._data[key]
+                        removed += 1
+                    elif self._slot(entry[1]) == position % len(self._wheel):
+                        # 有效期超过一圈，留在本槽等下一圈
+                        keep.add(key)
+                slot.clear()
+                slot.update(keep)
+            self._cursor = target + 1
+            self._stats['expired'] += removed
+        return removed
+
+    def _ensure_sweeper(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._sweep_loop, name=f'kv-sweeper-{self.namespace}', daemon=True
+            )
+        self._thread.start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.tick)
+            try:
+                self.purge_expired()
+            except Exception as e:
+                print(f"⚠️  [键值存储] 清理过期键失败: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': self.backend,
+                'namespace': self.namespace,
+                'keys': len(self._data),
+                'expired': self._stats['expired']
+            }
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite 中的短期键值存储
+数据在 kv_store 表中（迁移 0006），多个工作进程共享同一份数据；
+每个操作是一条语句，add / incr / delete 在并发下的结果与进程内存储相同。
+过期的键读取时忽略，由后台线程定期批量删除。
+"""
+import json
+import threading
+import time
+
+from database import get_db_connection
+
+# 批量删除过期键的间隔（秒）
+PURGE_INTERVAL = 60
+
+
+class SQLiteKVStore:
+    """
+    SQLite 键值存储（多进程共享），值需要可以 JSON 序列化
+
+    Args:
+        namespace: 命名空间（同一张表中区分不同用途）
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {'expired': 0}
+
+    def _execute(self, sql, params):
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute(sql, params)
+            row = cursor.fetchone()
+            rowcount = cursor.rowcount
+            conn.commit()
+            return row, rowcount
+        finally:
+            conn.close()
+
+    def get(self, key, default=None):
+        """读取未过期的值"""
+        row, _ = self._execute('''
+            SELECT value FROM kv_store WHERE namespace = ? AND key = ? AND expires_at > ?
+        ''', (self.namespace, key, time.time()))
+        return json.loads(row['value']) if row else default
+
+    def set(self, key, value, ttl):
+        """写入（覆盖已有值），ttl 秒后过期"""
+        self._execute('''
+            INSERT OR REPLACE INTO kv_store (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)
+        ''', (self.namespace, key, json.dumps(value, ensure_ascii=False), time.time() + ttl))
+        self._ensure_purger()
+
+    def add(self, key, value, ttl):
+        """
+        键不存在（或已过期）时写入
+
+        Returns:
+            bool: 是否写入
+        """
+        now = time.time()
+        _, rowcount = self._execute('''
+            INSERT INTO kv_store (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+            WHERE kv_store.expires_at <= ?
+        ''', (self.namespace, key, json.dumps(value, ensure_ascii=False), now + ttl, now))
+        self._ensure_purger()
+        return rowcount == 1
+
+    def incr(self, key, ttl):
+        """
+        计数加一；键不存在（或已过期）时从 1 开始，有效期为 ttl 秒（之后的加一不延长有效期）
+
+        Returns:
+            int: 加一后的值
+        """
+        now = time.time()
+        row, _ = self._execute('''
+            INSERT INTO kv_store (namespace, key, value, expires_at) VALUES (?, ?, '1', ?)
+            ON CONFLICT (namespace, key) DO UPDATE SET
+                value = CASE WHEN kv_store.expires_at <= ? THEN '1'
+                             ELSE CAST(CAST(kv_store.value AS INTEGER) + 1 AS TEXT) END,
+                expires_at = CASE WHEN kv_store.expires_at <= ? THEN excluded.expires_at
+                                  ELSE kv_store.expires_at END
+            RETURNING value
+        ''', (self.namespace, key, now + ttl, now, now))
+        self._ensure_purger()
+        return int(row['value'])
+
+    def delete(self, key):
+        """
+        删除
+
+        Returns:
+            bool: 是否删除了未过期的值（并发删除时只有一个调用方返回 True）
+        """
+        _, rowcount = self._execute('''
+            DELETE FROM kv_store WHERE namespace = ? AND key = ? AND expires_at > ?
+        ''', (self.namespace, key, time.time()))
+        return rowcount == 1
+
+    def purge_expired(self):
+        """
+        删除已过期的键（所有命名空间）
+
+        Returns:
+            int: 删除的键数
+        """
+        _, rowcount = self._execute('DELETE FROM kv_store WHERE expires_at <= ?', (time.time(),))
+        with self._lock:
+            self._stats['expired'] += max(rowcount, 0)
+        return rowcount
+
+    def _ensure_purger(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._purge_loop, name=f'kv-purger-{self.namespace}', daemon=True
+            )
+        self._thread.start()
+
+    def _purge_loop(self):
+        while True:
+            time.sleep(PURGE_INTERVAL)
+            try:
+                self.purge_expired()
+            except Exception as e:
+                print(f"⚠️  [键值存储] 清理过期键失败: {e}")
+
+    def stats(self):
+        row, _ = self._execute('''
+            SELECT COUNT(*) AS keys FROM kv_store WHERE namespace = ? AND expires_at > ?
+        ''', (self.namespace, time.time()))
+        with self._lock:
+            expired = self._stats['expired']
+        return {'backend': self.backend, 'namespace': self.namespace, 'keys': row['keys'], 'expired': expired}
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+短期键值存储测试
+两种后端（memory / sqlite）的有效期语义相同：
+    - 过期的值读取不到
+    - add 限流：有效期内只有第一次写入成功，过期后可以再次写入
+    - incr 计数：有效期从第一次加一开始，之后的加一不延长有效期，过期后从 1 重新计数
+    - delete 只对未过期的值返回 True
+进程内存储的时间轮会清理不再被访问的过期键。
+"""
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+root_dir = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database import db_init
+from components.kv_store import MemoryKVStore, SQLiteKVStore
+
+# 测试用的有效期（秒）
+TTL = 0.3
+
+
+@contextmanager
+def memory_store():
+    yield MemoryKVStore('test', tick=0.05, slots=20)
+
+
+@contextmanager
+def sqlite_store():
+    with tempfile.TemporaryDirectory() as workdir:
+        with mock.patch.object(db_init, 'DB_FILE', Path(workdir) / 'kv.db'):
+            db_init.init_database()
+            yield SQLiteKVStore('test')
+
+
+STORES = [memory_store, sqlite_store]
+
+
+def check_ttl(store):
+    store.set('code', {'code': '123456'}, TTL)
+    assert store.get('code') == {'code': '123456'}
+    time.sleep(TTL + 0.1)
+    assert store.get('code') is None
+    assert store.get('code', 'default') == 'default'
+
+
+def check_throttle(store):
+    assert store.add('throttle', 1, TTL)
+    assert not store.add('throttle', 1, TTL)
+    time.sleep(TTL + 0.1)
+    # 过期后限流解除
+    assert store.add('throttle', 1, TTL)
+    assert not store.add('throttle', 1, TTL)
+
+
+def check_counter(store):
+    assert store.incr('hourly', TTL) == 1
+    time.sleep(TTL / 2)
+    assert store.incr('hourly', TTL) == 2
+    # 之后的加一不延长有效期：从第一次加一算起过期
+    time.sleep(TTL / 2 + 0.1)
+    assert store.incr('hourly', TTL) == 1
+
+
+def check_delete(store):
+    store.set('once', 'x', TTL)
+    assert store.delete('once')
+    assert not store.delete('once')
+    store.set('stale', 'x', 0.05)
+    time.sleep(0.1)
+    assert not store.delete('stale')
+
+
+def test_ttl_expiry():
+    for make_store in STORES:
+        with make_store() as store:
+            check_ttl(store)
+
+
+def test_throttle_expiry():
+    for make_store in STORES:
+        with make_store() as store:
+            check_throttle(store)
+
+
+def test_counter_expiry():
+    for make_store in STORES:
+        with make_store() as store:
+            check_counter(store)
+
+
+def test_delete():
+    for make_store in STORES:
+        with make_store() as store:
+            check_delete(store)
+
+
+def test_purge_expired():
+    """不再被访问的过期键也会被清理"""
+    with memory_store() as store:
+        for i in range(50):
+            store.set(f'key{i}', i, 0.1)
+        # 有效期超过时间轮一圈（20 × 0.05 秒）的键在槽中停留多圈
+        store.set('long', 'x', 1.5)
+        time.sleep(0.2)
+        store.purge_expired()
+        assert store.stats()['keys'] == 1
+        assert store.get('long') == 'x'
+        time.sleep(1.4)
+        store.purge_expired()
+        assert store.stats()['keys'] == 0
+        assert store.stats()['expired'] == 51
+
+    with sqlite_store() as store:
+        for i in range(5):
+            store.set(f'key{i}', i, 0.05)
+        store.set('live', 'x', 60)
+        time.sleep(0.1)
+        assert store.purge_expired() == 5
+        assert store.stats()['keys'] == 1
+
+
+def test_wheel_reclaims_within_one_tick():
+    """过期的键在过期后的第一个刻度被清理（过期前刚检查过所在的槽也不会多等一圈）"""
+    clock = [100.0]
+    with mock.patch('components.kv_store.memory.time.monotonic', lambda: clock[0]):
+        store = MemoryKVStore('test', tick=1.0, slots=10)
+        with mock.patch.object(store, '_ensure_sweeper'):
+            store.set('code', 'x', 0.5)
+        clock[0] = 100.2
+        assert store.purge_expired() == 0
+        clock[0] = 100.7
+        assert store.get('code') is None
+        clock[0] = 101.0
+        assert store.purge_expired() == 1
+        assert store.stats()['keys'] == 0
+
+
+if __name__ == '__main__':
+    test_ttl_expiry()
+    test_throttle_expiry()
+    test_counter_expiry()
+    test_delete()
+    test_purge_expired()
+    test_wheel_reclaims_within_one_tick()
+    print("✅ 键值存储测试通过")
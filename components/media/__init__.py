@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+媒体文件处理模块
+"""
+from .ingest import ingest_url, claim_path, sniff_extension, guess_extension
+from .preprocess import PreparedImage, prepare_image, vision_data_url
+from .uploads import (
+    user_upload_key, user_upload_dir, upload_static_path, next_upload_number, save_upload, migrate_legacy_uploads
+)
+from .vision_cache import VisionCache, get_vision_cache, get_vision_cache_stats, perceptual_hash
+
+__all__ = [
+    'ingest_url',
+    'claim_path',
+    'sniff_extension',
+    'guess_extension',
+    'PreparedImage',
+    'prepare_image',
+    'vision_data_url',
+    'VisionCache',
+    'get_vision_cache',
+    'get_vision_cache_stats',
+    'perceptual_hash',
+    'user_upload_key',
+    'user_upload_dir',
+    'upload_static_path',
+    'next_upload_number',
+    'save_upload',
+    'migrate_legacy_uploads'
+]
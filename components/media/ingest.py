@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+媒体文件下载入库
+一次流式下载到临时文件，同时根据文件头识别格式，完成后用硬链接原子地占用一个不冲突的文件名
+（目标已存在时链接失败，换下一个序号重试），不会覆盖已有文件，也不会留下写了一半的文件。
+"""
+import os
+import re
+import threading
+import uuid
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+
+# 下载分块大小
+CHUNK_SIZE = 64 * 1024
+# 识别格式需要的文件头长度
+SNIFF_BYTES = 16
+# 下载超时（连接, 读取）秒
+DOWNLOAD_TIMEOUT = (10, 60)
+
+# Content-Type 与扩展名的对应关系
+CONTENT_TYPE_EXTENSIONS = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+    'video/mp4': 'mp4',
+    'video/webm': 'webm',
+    'video/quicktime': 'mov'
+}
+URL_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'mp4', 'webm', 'mov'}
+
+
+def sniff_extension(head: bytes):
+    """
+    根据文件头识别格式
+
+    Returns:
+        str: 扩展名（不含点），无法识别时返回None
+    """
+    if head.startswith(b'\x89PNG'):
+        return 'png'
+    if head.startswith(b'\xff\xd8'):
+        return 'jpg'
+    if head.startswith((b'GIF87a', b'GIF89a')):
+        return 'gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    if head[4:8] == b'ftyp':
+        return 'mov' if head[8:10] == b'qt' else 'mp4'
+    if head.startswith(b'\x1a\x45\xdf\xa3'):
+        return 'webm'
+    return None
+
+
+def guess_extension(head: bytes, url: str = '', content_type: str = '', default: str = 'jpg') -> str:
+    """按 文件头 -> URL 后缀 -> Content-Type -> 默认值 的顺序确定扩展名"""
+    ext = sniff_extension(head)
+    if ext:
+        return ext
+    suffix = Path(urlparse(url).path).suffix.lower().lstrip('.')
+    if suffix in URL_EXTENSIONS:
+        return 'jpg' if suffix == 'jpeg' else suffix
+    ext = CONTENT_TYPE_EXTENSIONS.get((content_type or '').split(';')[0].strip().lower())
+    return ext or default
+
+
+def _glob_escape(text: str) -> str:
+    """转义 glob 特殊字符"""
+    return re.sub(r'([*?\[])', r'[\1]', text)
+
+
+class _SequenceIndex:
+    """
+    目录内 "{前缀}_{序号}.{扩展名}" 文件的序号索引
+
+    每个（目录, 前缀）只在首次使用时扫描一次目录，之后在内存中递增；
+    其他进程写入造成的冲突由硬链接失败后重试处理。
+    """
+
+    def __init__(self):
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def next_number(self, save_dir: Path, prefix: str) -> int:
+        key = (str(save_dir.resolve()), prefix)
+        with self._lock:
+            number = self._next.get(key)
+            if number is None:
+                number = self._scan(save_dir, prefix) + 1
+            self._next[key] = number + 1
+            return number
+
+    def _scan(self, save_dir, prefix):
+        pattern = re.compile(rf'^{re.escape(prefix)}_(\d+)\.[^.]+$')
+        max_number = 0
+        for path in save_dir.glob(f'{_glob_escape(prefix)}_*'):
+            match = pattern.match(path.name)
+            if match:
+                max_number = max(max_number, int(match.group(1)))
+        return max_number
+
+
+_sequence_index = _SequenceIndex()
+
+
+def _link_exclusive(source: Path, target: Path) -> bool:
+    """
+    原子地把 source 放到 target（target 已存在时不覆盖）
+
+    Returns:
+        bool: 是否成功
+    """
+    try:
+        os.link(source, target)
+        return True
+    except FileExistsError:
+        return False
+    except OSError:
+        # 文件系统不支持硬链接：先独占创建占位文件，再替换
+        try:
+            fd = os.open(target, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        os.close(fd)
+        os.replace(source, target)
+        return True
+
+
+def claim_path(temp_path: Path, save_dir: Path, prefix: str, ext: str, numbered: bool = True) -> Path:
+    """
+    把临时文件放到一个不冲突的文件名下
+
+    Args:
+        temp_path: 已写完的临时文件（同一目录下）
+        save_dir: 目标目录
+        prefix: 文件名前缀
+        ext: 扩展名
+        numbered: True 时文件名为 {前缀}_{序号}.{扩展名}；
+                  False 时优先使用 {前缀}.{扩展名}，冲突时再追加序号
+
+    Returns:
+        Path: 最终文件路径
+    """
+    if not numbered:
+        target = save_dir / f'{prefix}.{ext}'
+        if _link_exclusive(temp_path, target):
+            return target
+
+    while True:
+        number = _sequence_index.next_number(save_dir, prefix)
+        if not numbered and number == 1:
+            continue
+        target = save_dir / f'{prefix}_{number}.{ext}'
+        if _link_exclusive(temp_path, target):
+            return target
+
+
+def ingest_url(url: str, save_dir, prefix: str, default_ext: str = 'jpg', numbered: bool = True,
+               timeout=DOWNLOAD_TIMEOUT, on_progress=None) -> Path:
+    """
+    下载远程文件并保存到目录
+
+    Args:
+        url: 文件URL
+        save_dir: 保存目录
+        prefix: 文件名前缀
+        default_ext: 无法识别格式时使用的扩展名
+        numbered: 文件名是否带序号（见 claim_path）
+        timeout: requests 超时设置
+        on_progress: 进度回调 on_progress(已下载字节数, 总字节数或None)
+
+    Returns:
+        Path: 保存的文件路径
+    """
+    save_dir = Path(save_dir)
+    save_dir.mkdir(parents=True, exist_ok=True)
+    temp_path = save_dir / f'.{uuid.uuid4().hex}.part'
+
+    response = requests.get(url, stream=True, timeout=timeout)
+    try:
+        response.raise_for_status()
+        total = int(response.headers.get('content-length', 0)) or None
+        head = b''
+        written = 0
+        with open(temp_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if not chunk:
+                    continue
+                if len(head) < SNIFF_BYTES:
+                    head += chunk[:SNIFF_BYTES - len(head)]
+                f.write(chunk)
+                written += len(chunk)
+                if on_progress:
+                    on_progress(written, total)
+        if written == 0:
+            raise ValueError(f'下载内容为空: {url}')
+
+        ext = guess_extension(head, url, response.headers.get('content-type', ''), default_ext)
+        return claim_path(temp_path, save_dir, prefix, ext, numbered=numbered)
+    finally:
+        response.close()
+        if temp_path.exists():
+            temp_path.unlink()
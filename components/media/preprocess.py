@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+识别前的图片预处理
+上传的手机截图和照片通常有几 MB，直接 base64 编码发给识别接口会拖慢上传和识别。
+发送前先按 EXIF 方向转正、把长边缩小到 VISION_MAX_EDGE，再以目标质量重新编码为 JPEG/WebP；
+磁盘上保存的仍是原图。
+
+Pillow 为可选依赖：未安装或图片无法解析时直接发送原图。
+"""
+import base64
+import io
+import os
+from pathlib import Path
+
+from .ingest import sniff_extension
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - 未安装 Pillow 时发送原图
+    Image = None
+
+# 发送给识别接口的图片长边上限（像素）
+VISION_MAX_EDGE = int(os.getenv('VISION_MAX_EDGE', '1600'))
+# 重新编码的格式：jpeg 或 webp
+VISION_IMAGE_FORMAT = os.getenv('VISION_IMAGE_FORMAT', 'jpeg').lower()
+# 重新编码的质量（1-95）
+VISION_IMAGE_QUALITY = int(os.getenv('VISION_IMAGE_QUALITY', '85'))
+
+# 编码格式 -> (Pillow 格式名, MIME 类型)
+OUTPUT_FORMATS = {
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'webp': ('WEBP', 'image/webp')
+}
+# 原图扩展名 -> MIME 类型（不做预处理时使用）
+MIME_TYPES = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'webp': 'image/webp'
+}
+# EXIF 方向标签
+EXIF_ORIENTATION = 0x0112
+# EXIF 方向 -> 转正所需的变换（与 ImageOps.exif_transpose 一致）
+ORIENTATION_TRANSPOSE = {
+    2: 'FLIP_LEFT_RIGHT',
+    3: 'ROTATE_180',
+    4: 'FLIP_TOP_BOTTOM',
+    5: 'TRANSPOSE',
+    6: 'ROTATE_270',
+    7: 'TRANSVERSE',
+    8: 'ROTATE_90'
+}
+
+
+class PreparedImage:
+    """
+    预处理后的图片
+
+    Attributes:
+        data: 图片数据
+        mime_type: MIME 类型
+        width, height: 发送的尺寸（未解析时为None）
+        original_size: 原图字节数
+        processed: 是否经过缩放或重新编码（False 表示发送原图）
+    """
+
+    __slots__ = ('data', 'mime_type', 'width', 'height', 'original_size', 'processed')
+
+    def __init__(self, data, mime_type, width=None, height=None, original_size=None, processed=False):
+        self.data = data
+        self.mime_type = mime_type
+        self.width = width
+        self.height = height
+        self.original_size = len(data) if original_size is None else original_size
+        self.processed = processed
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    def data_url(self):
+        """data:image/...;base64,... 格式，可直接作为识别接口的 image_url"""
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('ascii')}"
+
+
+def _original_mime(data, filename=None):
+    ext = sniff_extension(data[:16])
+    if ext is None and filename:
+        ext = Path(filename).suffix.lower().lstrip('.')
+    return MIME_TYPES.get(ext, 'image/jpeg')
+
+
+def _flatten(image):
+    """转为 RGB，透明区域铺白底（JPEG 不支持透明通道）"""
+    if image.mode == 'P' and 'transparency' in image.info:
+        image = image.convert('RGBA')
+    if image.mode in ('RGBA', 'LA'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+
+def prepare_image(data: bytes, filename=None, max_edge=None, fmt=None, quality=None) -> PreparedImage:
+    """
+    转正、缩小并重新编码图片
+
+    Args:
+        data: 原图数据
+        filename: 原文件名（无法从文件头识别格式时用于确定 MIME 类型）
+        max_edge: 长边上限（默认 VISION_MAX_EDGE）
+        fmt: 输出格式 jpeg/webp（默认 VISION_IMAGE_FORMAT）
+        quality: 编码质量（默认 VISION_IMAGE_QUALITY）
+
+    Returns:
+        PreparedImage: 原图不需要缩放/转正且重新编码后不会更小时，返回原图
+    """
+    original = PreparedImage(data, _original_mime(data, filename))
+    if Image is None:
+        return original
+
+    max_edge = max_edge or VISION_MAX_EDGE
+    pil_format, mime_type = OUTPUT_FORMATS.get(fmt or VISION_IMAGE_FORMAT, OUTPUT_FORMATS['jpeg'])
+    quality = quality or VISION_IMAGE_QUALITY
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = original.width, original.height = image.size
+            orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+            rotated = orientation in ORIENTATION_TRANSPOSE
+            resized = max(width, height) > max_edge
+            if resized:
+                # JPEG 解码时直接按 1/2、1/4... 缩小（不小于目标尺寸），避免完整解码大照片
+                scale = max_edge / max(width, height)
+                image.draft('RGB', (int(width * scale), int(height * scale)))
+                image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            # 先缩小再转正，旋转的像素更少
+            if rotated:
+                image = image.transpose(getattr(Image.Transpose, ORIENTATION_TRANSPOSE[orientation]))
+            image = _flatten(image)
+
+            output = io.BytesIO()
+            image.save(output, pil_format, quality=quality, optimize=pil_format == 'JPEG')
+            width, height = image.size
+    except Exception as e:
+        print(f"⚠️  [图片预处理] 无法处理图片，发送原图: {e}")
+        return original
+
+    encoded = output.getvalue()
+    if not resized and not rotated and len(encoded) >= len(data):
+        return original
+    return PreparedImage(encoded, mime_type, width, height, original_size=len(data), processed=True)
+
+
+def vision_data_url(source, filename=None, **options) -> str:
+    """
+    读取图片并预处理，返回识别接口使用的 data URL
+
+    Args:
+        source: 图片文件路径或图片数据（bytes）
+        filename: 原文件名（source 为 bytes 时用于确定 MIME 类型）
+        **options: 传给 prepare_image 的参数
+    """
+    if isinstance(source, (bytes, bytearray)):
+        data = bytes(source)
+    else:
+        filename = filename or str(source)
+        with open(source, 'rb') as f:
+            data = f.read()
+    return prepare_image(data, filename=filename, **options).data_url()
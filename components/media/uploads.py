@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+聊天上传文件存储
+每个用户一个子目录，文件名序号由 SQLite 中的计数器原子递增分配，上传时不再列出整个上传目录。
+
+目录结构：
+    static/users/chat_upload/{safe_email}/{safe_email}_{序号}.{扩展名}
+文件名保持旧格式不变（历史记录中保存的 image_filename 仍然有效）。
+旧版所有用户共用的平铺目录 static/users/chat_upload/{safe_email}_{序号}.{扩展名}
+在启动时迁移到用户子目录，旧 URL 通过重定向继续可用。
+"""
+import os
+import re
+import shutil
+from pathlib import Path
+
+from werkzeug.utils import secure_filename
+
+from database import get_db_connection
+
+# 上传根目录
+UPLOAD_ROOT = Path('static') / 'users' / 'chat_upload'
+# 上传根目录相对 static 的 URL 路径
+UPLOAD_URL_PREFIX = 'users/chat_upload'
+
+# 上传文件名：{safe_email}_{序号}.{扩展名}
+UPLOAD_FILE_PATTERN = re.compile(r'^(.+)_(\d+)\.[^.]+$')
+
+
+def user_upload_key(email: str) -> str:
+    """用户上传目录名（也是文件名前缀）"""
+    return secure_filename(email.replace('@', '_at_').replace('.', '_'))
+
+
+def user_upload_dir(email: str, root=None) -> Path:
+    """用户上传目录"""
+    return Path(root or UPLOAD_ROOT) / user_upload_key(email)
+
+
+def upload_static_path(filename: str):
+    """
+    上传文件相对 static 的路径（可直接用于 url_for('static', filename=...)）
+
+    Args:
+        filename: 上传文件名 {safe_email}_{序号}.{扩展名}
+
+    Returns:
+        str: 文件名格式不正确时返回None
+    """
+    match = UPLOAD_FILE_PATTERN.match(filename)
+    if not match:
+        return None
+    return f"{UPLOAD_URL_PREFIX}/{match.group(1)}/{filename}"
+
+
+def _scan_max_number(user_dir: Path, key: str) -> int:
+    """扫描用户目录中已使用的最大序号（只在计数器首次创建时执行）"""
+    max_number = 0
+    if user_dir.exists():
+        for path in user_dir.iterdir():
+            match = UPLOAD_FILE_PATTERN.match(path.name)
+            if match and match.group(1) == key:
+                max_number = max(max_number, int(match.group(2)))
+    return max_number
+
+
+def next_upload_number(email: str, root=None) -> int:
+    """
+    原子地分配用户的下一个上传序号
+
+    计数器不存在时先用用户目录中的最大序号初始化（并发初始化时只有一个生效），
+    然后以一条 UPDATE ... RETURNING 递增，多个线程/进程不会拿到同一个序号。
+    """
+    key = user_upload_key(email)
+    conn = get_db_connection()
+    try:
+        row = conn.execute('''
+            UPDATE upload_counters SET last_number = last_number + 1
+            WHERE user_key = ?
+            RETURNING last_number
+        ''', (key,)).fetchone()
+        if row is None:
+            conn.execute('''
+                INSERT OR IGNORE INTO upload_counters (user_key, last_number) VALUES (?, ?)
+            ''', (key, _scan_max_number(user_upload_dir(email, root), key)))
+            row = conn.execute('''
+                UPDATE upload_counters SET last_number = last_number + 1
+                WHERE user_key = ?
+                RETURNING last_number
+            ''', (key,)).fetchone()
+        conn.commit()
+        return row['last_number']
+    finally:
+        conn.close()
+
+
+def save_upload(file, email: str, ext: str, root=None):
+    """
+    保存上传文件到用户目录
+
+    Args:
+        file: werkzeug FileStorage
+        email: 用户邮箱
+        ext: 扩展名（含点，如 .jpg）
+        root: 上传根目录（默认 UPLOAD_ROOT）
+
+    Returns:
+        tuple: (文件名, 文件路径 Path, 相对 static 的路径)
+    """
+    key = user_upload_key(email)
+    user_dir = user_upload_dir(email, root)
+    user_dir.mkdir(parents=True, exist_ok=True)
+
+    while True:
+        filename = f"{key}_{next_upload_number(email, root)}{ext}"
+        file_path = user_dir / filename
+        # 独占创建：计数器落后于磁盘（例如数据库被重置）时跳到下一个序号，不覆盖已有文件
+        try:
+            fd = os.open(file_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            continue
+        with os.fdopen(fd, 'wb') as f:
+            shutil.copyfileobj(file.stream, f)
+        return filename, file_path, f"{UPLOAD_URL_PREFIX}/{key}/{filename}"
+
+
+def migrate_legacy_uploads(root=None):
+    """
+    把旧版平铺目录中的 {safe_email}_{序号}.{扩展名} 移动到用户子目录
+
+    Returns:
+        int: 迁移的文件数
+    """
+    root = Path(root or UPLOAD_ROOT)
+    if not root.exists():
+        return 0
+
+    moved = 0
+    for path in root.iterdir():
+        if not path.is_file():
+            continue
+        match = UPLOAD_FILE_PATTERN.match(path.name)
+        if not match:
+            continue
+        target_dir = root / match.group(1)
+        target_dir.mkdir(exist_ok=True)
+        target = target_dir / path.name
+        if target.exists():
+            print(f"⚠️  [上传迁移] 目标已存在，跳过: {path.name}")
+            continue
+        os.replace(path, target)
+        moved += 1
+
+    if moved:
+        print(f"📦 [上传迁移] 已将 {moved} 个上传文件移动到用户目录")
+    return moved
+
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+图片识别结果缓存
+用户经常重复上传同一张图片（同一个表情包、几乎一样的每日打卡截图），每次都会调用一次识别模型。
+识别结果按图片内容持久化在 SQLite 的 vision_cache 表中：
+    - 精确匹配：图片内容的 SHA-256 相同
+    - 近似匹配（可选）：64 位 dHash 的汉明距离不超过配置的阈值
+
+近似匹配的索引：dHash 切成 4 段 16 位分别建索引，只取至少一段完全相同的记录计算汉明距离。
+阈值小于 4 时（鸽巢原理）不会漏掉任何满足条件的记录；阈值更大时只在这些候选中查找。
+
+未命中时通过 single-flight 合并同一张图片的并发识别，只缓存识别成功的结果。
+
+用法：
+    cache = get_vision_cache('recognize_image')
+    result = cache.get_or_compute(image_bytes, recognize, image_bytes)
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+from database import get_db_connection
+from components.single_flight import get_single_flight
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - 未安装 Pillow 时只做精确匹配
+    Image = None
+
+# 近似匹配的汉明距离阈值（0 表示只做精确匹配），普通图片识别
+VISION_CACHE_NEAR_DISTANCE = int(os.getenv('VISION_CACHE_NEAR_DISTANCE', '0'))
+# 打卡截图的近似匹配阈值（截图中的日期等细节决定识别结果，默认只做精确匹配）
+VISION_CACHE_CHECK_NEAR_DISTANCE = int(os.getenv('VISION_CACHE_CHECK_NEAR_DISTANCE', '0'))
+# 缓存有效期（天），过期记录不再命中并定期清理
+VISION_CACHE_TTL_DAYS = float(os.getenv('VISION_CACHE_TTL_DAYS', '30'))
+# 清理过期记录的最短间隔（秒）
+PRUNE_INTERVAL = 3600
+
+# dHash 分段数和每段位数
+DHASH_BANDS = 4
+DHASH_BAND_BITS = 16
+
+
+def perceptual_hash(data: bytes):
+    """
+    计算图片的 64 位 dHash（缩小到 9x8 灰度图，比较相邻像素的明暗）
+
+    Returns:
+        int: 无符号 64 位整数，未安装 Pillow 或无法解析图片时返回None
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.draft('L', (64, 64))
+            pixels = list(image.convert('L').resize((9, 8), Image.BILINEAR).getdata())
+    except Exception:
+        return None
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个哈希值的汉明距离"""
+    return bin(a ^ b).count('1')
+
+
+def _to_signed(value):
+    """无符号 64 位整数转为 SQLite INTEGER 可存储的有符号整数"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def _bands(value):
+    mask = (1 << DHASH_BAND_BITS) - 1
+    return [(value >> (DHASH_BAND_BITS * i)) & mask for i in range(DHASH_BANDS)]
+
+
+class VisionCache:
+    """
+    单类识别结果的缓存（线程安全）
+
+    Args:
+        kind: 识别类型（同时作为 single-flight 分组名）
+        near_distance: 近似匹配的汉明距离阈值，0 表示只做精确匹配
+        ttl: 缓存有效期（秒）
+    """
+
+    def __init__(self, kind, near_distance=0, ttl=VISION_CACHE_TTL_DAYS * 86400):
+        self.kind = kind
+        self.near_distance = near_distance
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._last_prune = 0
+        self._stats = {
+            'lookups': 0,     # 查询次数
+            'exact_hits': 0,  # 内容完全相同的命中
+            'near_hits': 0,   # 感知哈希近似命中
+            'misses': 0,      # 未命中（调用了识别）
+            'stores': 0       # 写入的识别结果数
+        }
+
+    def get_or_compute(self, image_bytes: bytes, compute, *args, cacheable=None, **kwargs):
+        """
+        查询缓存，未命中时调用识别函数并缓存结果
+
+        Args:
+            image_bytes: 原图数据（用于计算哈希）
+            compute: 识别函数
+            *args, **kwargs: 传给识别函数的参数
+            cacheable: 判断结果是否可缓存的函数（默认只要求返回值是非空字典）
+
+        Returns:
+            识别结果（命中时为缓存的结果）
+        """
+        sha256 = hashlib.sha256(image_bytes).hexdigest()
+        dhash = None
+        result = self._lookup_exact(sha256)
+        if result is None and self.near_distance > 0:
+            dhash = perceptual_hash(image_bytes)
+            if dhash is not None:
+                result = self._lookup_near(dhash)
+        if result is not None:
+            return result
+
+        with self._lock:
+            self._stats['misses'] += 1
+
+        def compute_and_store():
+            value = compute(*args, **kwargs)
+            ok = cacheable(value) if cacheable else isinstance(value, dict) and bool(value)
+            if ok:
+                self.store(sha256, value, dhash if dhash is not None else perceptual_hash(image_bytes))
+            return value
+
+        # 同一张图片的并发请求共享一次识别
+        return get_single_flight(self.kind).do(sha256, compute_and_store)
+
+    def _lookup_exact(self, sha256):
+        with self._lock:
+            self._stats['lookups'] += 1
+        conn = get_db_connection()
+        try:
+            row = conn.execute('''
+                SELECT id, result FROM vision_cache
+                WHERE kind = ? AND sha256 = ? AND created_at >= ?
+            ''', (self.kind, sha256, time.time() - self.ttl)).fetchone()
+            if row is None:
+                return None
+            self._record_hit(conn, row['id'])
+        finally:
+            conn.close()
+        with self._lock:
+            self._stats['exact_hits'] += 1
+        return json.loads(row['result'])
+
+    def _lookup_near(self, dhash):
+        bands = _bands(dhash)
+        conditions = ' OR '.join(f'band{i} = ?' for i in range(DHASH_BANDS))
+        conn = get_db_connection()
+        try:
+            rows = conn.execute(f'''
+                SELECT id, dhash, result FROM vision_cache
+                WHERE kind = ? AND ({conditions}) AND created_at >= ?
+            ''', (self.kind, *bands, time.time() - self.ttl)).fetchall()
+            best = None
+            best_distance = self.near_distance + 1
+            for row in rows:
+                distance = hamming_distance(dhash, _to_unsigned(row['dhash']))
+                if distance < best_distance:
+                    best, best_distance = row, distance
+            if best is None:
+                return None
+            self._record_hit(conn, best['id'])
+        finally:
+            conn.close()
+        with self._lock:
+            self._stats['near_hits'] += 1
+        return json.loads(best['result'])
+
+    def _record_hit(self, conn, entry_id):
+        conn.execute('''
+            UPDATE vision_cache SET hits = hits + 1, last_hit_at = ? WHERE id = ?
+        ''', (time.time(), entry_id))
+        conn.commit()
+
+    def store(self, sha256, result, dhash=None):
+        """写入识别结果（同一内容已存在时覆盖）"""
+        now = time.time()
+        bands = _bands(dhash) if dhash is not None else [None] * DHASH_BANDS
+        conn = get_db_connection()
+        try:
+            conn.execute('''
+                INSERT INTO vision_cache (kind, sha256, dhash, band0, band1, band2, band3, result, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(kind, sha256) DO UPDATE SET
+                    dhash = excluded.dhash, band0 = excluded.band0, band1 = excluded.band1,
+                    band2 = excluded.band2, band3 = excluded.band3, result = excluded.result,
+                    created_at = excluded.created_at
+            ''', (self.kind, sha256, _to_signed(dhash) if dhash is not None else None, *bands,
+                  json.dumps(result, ensure_ascii=False), now))
+            if now - self._last_prune > PRUNE_INTERVAL:
+                self._last_prune = now
+                conn.execute('DELETE FROM vision_cache WHERE kind = ? AND created_at < ?', (self.kind, now - self.ttl))
+            conn.commit()
+        finally:
+            conn.close()
+        with self._lock:
+            self._stats['stores'] += 1
+
+    def stats(self):
+        """命中统计与缓存条目数"""
+        with self._lock:
+            stats = dict(self._stats)
+        conn = get_db_connection()
+        try:
+            row = conn.execute('''
+                SELECT COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS total_hits
+                FROM vision_cache WHERE kind = ?
+            ''', (self.kind,)).fetchone()
+        finally:
+            conn.close()
+        hits = stats['exact_hits'] + stats['near_hits']
+        stats['hit_rate'] = round(hits / stats['lookups'], 4) if stats['lookups'] else 0.0
+        stats['near_distance'] = self.near_distance
+        stats['entries'] = row['entries']
+        stats['total_hits'] = row['total_hits']
+        return stats
+
+
+# 各识别类型的近似匹配阈值
+NEAR_DISTANCES = {
+    'recognize_image': VISION_CACHE_NEAR_DISTANCE,
+    'check_recognition': VISION_CACHE_CHECK_NEAR_DISTANCE
+}
+
+# 按识别类型注册的缓存
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_vision_cache(kind) -> VisionCache:
+    """获取（或创建）指定识别类型的缓存"""
+    cache = _caches.get(kind)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(kind)
+            if cache is None:
+                cache = VisionCache(kind, near_distance=NEAR_DISTANCES.get(kind, 0))
+                _caches[kind] = cache
+    return cache
+
+
+def get_vision_cache_stats():
+    """所有识别缓存的统计信息"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.kind: cache.stats() for cache in caches}
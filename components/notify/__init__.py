@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+通知模块
+"""
+from .dispatcher import (
+    NotificationDispatcher,
+    TokenBucket,
+    get_dispatcher,
+    start_notification_workers,
+    STATUS_PENDING,
+    STATUS_SENDING,
+    STATUS_SENT,
+    STATUS_FAILED
+)
+
+__all__ = [
+    'NotificationDispatcher',
+    'TokenBucket',
+    'get_dispatcher',
+    'start_notification_workers',
+    'STATUS_PENDING',
+    'STATUS_SENDING',
+    'STATUS_SENT',
+    'STATUS_FAILED'
+]
@@ -0,0 +1,603 @@
+# -*- coding: utf-8 -*-
+"""
+通知投递
+通知先写入 SQLite 的 notification_outbox 表（发件箱），由常驻的投递线程池发送：
+    - 线程数有上限，慢的推送接口不会拖住定时任务线程，也不会无限制地开线程
+    - 每个渠道（推送接口）一个令牌桶限流
+    - 发送失败按指数退避重试，超过最大尝试次数后标记为失败；进程重启后继续投递
+    - dedup_key 唯一，同一条通知（例如同一用户同一提醒时段）只会入队一次
+    - 统计投递延迟（入队到发送成功）和单次发送耗时，每批投递完成后打印汇总
+
+发送租约：取出通知时记录投递者（worker_id）和租约到期时间，发送结果只在租约仍属于本投递者时写入；
+只有应用启动时（start_notification_workers）才把租约已过期的发送中通知放回待发送，
+入队时自动启动投递线程不会恢复通知，其他进程正在发送的通知不会被重复发送。
+
+渠道发送函数签名：sender(title, content) -> dict，有收件人的渠道（邮件）为 sender(recipient, title, content)
+    - 返回 {'success': True} 表示发送成功，{'success': False, 'error_message': ...} 表示可重试的失败
+    - 抛出 ValueError 表示消息本身无效，不再重试
+    - 发送函数有 stats() 时其结果包含在 stats() 的渠道统计中，有 close() 时在 stop() 时调用
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+
+from database import get_db_connection
+
+# 投递线程数
+NOTIFY_WORKERS = int(os.getenv('NOTIFY_WORKERS', '4'))
+# 默认最大尝试次数
+NOTIFY_MAX_ATTEMPTS = int(os.getenv('NOTIFY_MAX_ATTEMPTS', '5'))
+# 重试退避基数（秒），第 n 次重试等待 base * 2^(n-1)，不超过 NOTIFY_RETRY_MAX_DELAY
+NOTIFY_RETRY_BASE_DELAY = float(os.getenv('NOTIFY_RETRY_BASE_DELAY', '30'))
+NOTIFY_RETRY_MAX_DELAY = float(os.getenv('NOTIFY_RETRY_MAX_DELAY', '1800'))
+# 发送租约时长（秒），需大于单次发送的最长耗时（含限流等待）
+NOTIFY_LEASE_SECONDS = float(os.getenv('NOTIFY_LEASE_SECONDS', '300'))
+# 已发送/已失败记录的保留天数（去重依赖这些记录）
+NOTIFY_RETENTION_DAYS = float(os.getenv('NOTIFY_RETENTION_DAYS', '7'))
+# 空闲时检查到期通知的最长间隔（秒）
+NOTIFY_POLL_INTERVAL = 1.0
+# 清理过期记录的最短间隔（秒）
+PRUNE_INTERVAL = 3600
+# 保留的延迟样本数（用于统计）
+LATENCY_SAMPLES = 500
+
+# 通知状态
+STATUS_PENDING = 'pending'
+STATUS_SENDING = 'sending'
+STATUS_SENT = 'sent'
+STATUS_FAILED = 'failed'
+
+
+class TokenBucket:
+    """
+    令牌桶限流（线程安全）
+
+    Args:
+        rate: 每秒补充的令牌数
+        capacity: 桶容量（允许的突发数）
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = max(1.0, capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        取一个令牌，不足时等待
+
+        Returns:
+            float: 等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # 先预订令牌（可能为负），在锁外等待，等待期间其他线程排在后面
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def _percentile(sorted_values, ratio):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * ratio))
+    return sorted_values[index]
+
+
+def _summary(samples):
+    values = sorted(samples)
+    if not values:
+        return {'samples': 0, 'avg': None, 'p50': None, 'p95': None, 'max': None}
+    return {
+        'samples': len(values),
+        'avg': round(sum(values) / len(values), 3),
+        'p50': round(_percentile(values, 0.5), 3),
+        'p95': round(_percentile(values, 0.95), 3),
+        'max': round(values[-1], 3)
+    }
+
+
+class NotificationDispatcher:
+    """
+    通知投递器
+
+    Args:
+        workers: 投递线程数
+        retry_base_delay: 重试退避基数（秒）
+        autostart: 入队时自动启动投递线程（不恢复发送中的通知）
+        lease_seconds: 发送租约时长（秒）
+    """
+
+    def __init__(self, workers=NOTIFY_WORKERS, retry_base_delay=NOTIFY_RETRY_BASE_DELAY, autostart=True,
+                 lease_seconds=NOTIFY_LEASE_SECONDS):
+        self.workers = max(1, workers)
+        self.retry_base_delay = retry_base_delay
+        self.autostart = autostart
+        self.lease_seconds = lease_seconds
+        # 投递者标识：同一数据库的多个进程（以及同一进程中的多个投递器）互不相同
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._channels = {}
+        self._threads = []
+        self._cond = threading.Condition()
+        # _notify() 的调用次数：投递线程据此判断取通知之后是否有新的入队
+        self._wakeups = 0
+        # 发送中的数量减少时通知 wait_idle()
+        self._idle_cond = threading.Condition()
+        self._started = False
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._last_prune = 0
+        # 统计（受 _stats_lock 保护）
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        # 渠道 -> 正在发送的数量（用于渠道并发上限）
+        self._channel_in_flight = {}
+        self._claim_lock = threading.Lock()
+        self._latency = deque(maxlen=LATENCY_SAMPLES)
+        self._send_time = deque(maxlen=LATENCY_SAMPLES)
+        self._counters = {'enqueued': 0, 'deduplicated': 0, 'sent': 0, 'failed': 0, 'retried': 0, 'throttled': 0,
+                          'recovered': 0, 'lease_lost': 0}
+        self._batch = None
+
+    # ------------------------------------------------------------------
+    # 注册与启动
+    # ------------------------------------------------------------------
+
+    def register_channel(self, name, sender, rate=None, burst=None, max_attempts=NOTIFY_MAX_ATTEMPTS,
+                         concurrency=None, with_recipient=False, keep_content=True):
+        """
+        注册发送渠道
+
+        Args:
+            name: 渠道名
+            sender: 发送函数
+            rate: 每秒最多发送数（None 表示不限流）
+            burst: 允许的突发数（默认等于 rate）
+            max_attempts: 最大尝试次数
+            concurrency: 同时发送的数量上限（None 表示不限制，例如只有一个 SMTP 连接时为 1）
+            with_recipient: 通知有收件人，发送函数签名为 sender(recipient, title, content)
+            keep_content: 发送成功或失败后是否保留正文（验证码邮件等不在数据库中长期保留）
+        """
+        self._channels[name] = {
+            'sender': sender,
+            'bucket': TokenBucket(rate, burst) if rate else None,
+            'max_attempts': max_attempts,
+            'concurrency': concurrency,
+            'with_recipient': with_recipient,
+            'keep_content': keep_content
+        }
+
+    def start(self):
+        """
+        启动投递线程（重复调用无副作用）
+
+        不恢复通知：发送中的通知可能正由其他进程发送，恢复由 recover_expired 在应用启动时单独执行
+        """
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f'notify-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        print(f"📨 [通知] 已启动 {self.workers} 个投递线程")
+
+    def recover_expired(self):
+        """
+        把租约已过期的发送中通知放回待发送（投递进程已退出），退还本次尝试次数
+
+        Returns:
+            int: 恢复的通知数
+        """
+        now = time.time()
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute('''
+                UPDATE notification_outbox
+                SET status = ?, attempts = MAX(attempts - 1, 0), next_attempt_at = ?,
+                    worker_id = NULL, lease_expires_at = NULL
+                WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+            ''', (STATUS_PENDING, now, STATUS_SENDING, now))
+            conn.commit()
+            recovered = cursor.rowcount
+        finally:
+            conn.close()
+        if recovered:
+            with self._stats_lock:
+                self._counters['recovered'] += recovered
+            print(f"📨 [通知] 恢复 {recovered} 条租约已过期的发送中通知")
+            self._notify()
+        return recovered
+
+    def stop(self, timeout=None):
+        """停止投递线程（正在发送的通知发送完后退出）并关闭渠道的连接，之后可以重新 start()"""
+        with self._lock:
+            if not self._started:
+                return
+            self._stopping = True
+            self._notify()
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+            self._stopping = False
+            self._started = False
+        for channel in self._channels.values():
+            close = getattr(channel['sender'], 'close', None)
+            if close is not None:
+                close()
+
+    # ------------------------------------------------------------------
+    # 入队与查询
+    # ------------------------------------------------------------------
+
+    def enqueue(self, channel, title, content, dedup_key=None, max_attempts=None, recipient=None):
+        """
+        提交一条通知
+
+        Args:
+            recipient: 收件人（有收件人的渠道必填）
+
+        Returns:
+            int: 通知ID，dedup_key 已存在时返回None
+        """
+        ids = self.enqueue_many([{
+            'channel': channel, 'title': title, 'content': content,
+            'dedup_key': dedup_key, 'max_attempts': max_attempts, 'recipient': recipient
+        }])
+        return ids[0]
+
+    def enqueue_many(self, messages):
+        """
+        在一个事务中批量提交通知
+
+        Args:
+            messages: [{'channel', 'title', 'content', 'dedup_key'(可选), 'max_attempts'(可选), 'recipient'(可选)}]
+
+        Returns:
+            list: 与 messages 一一对应的通知ID，重复的通知为None
+        """
+        for message in messages:
+            if message['channel'] not in self._channels:
+                raise ValueError(f"未注册的通知渠道: {message['channel']}")
+            if self._channels[message['channel']]['with_recipient'] and not message.get('recipient'):
+                raise ValueError(f"通知渠道 {message['channel']} 需要收件人")
+
+        now = time.time()
+        ids = []
+        conn = get_db_connection()
+        try:
+            for message in messages:
+                max_attempts = message.get('max_attempts') or self._channels[message['channel']]['max_attempts']
+                cursor = conn.execute('''
+                    INSERT OR IGNORE INTO notification_outbox
+                    (channel, recipient, dedup_key, title, content, status, max_attempts, next_attempt_at, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (message['channel'], message.get('recipient'), message.get('dedup_key'), message['title'],
+                      message['content'], STATUS_PENDING, max_attempts, now, now))
+                ids.append(cursor.lastrowid if cursor.rowcount == 1 else None)
+            self._prune(conn, now)
+            conn.commit()
+        finally:
+            conn.close()
+
+        accepted = sum(1 for notification_id in ids if notification_id is not None)
+        with self._stats_lock:
+            self._counters['enqueued'] += accepted
+            self._counters['deduplicated'] += len(ids) - accepted
+        if accepted:
+            if self.autostart:
+                self.start()
+            self._notify()
+        return ids
+
+    def get(self, notification_id):
+        """查询通知，不存在时返回None"""
+        conn = get_db_connection()
+        try:
+            row = conn.execute('SELECT * FROM notification_outbox WHERE id = ?', (notification_id,)).fetchone()
+        finally:
+            conn.close()
+        return dict(row) if row else None
+
+    def wait_idle(self, timeout=None):
+        """
+        等待没有到期的待发送通知且没有正在发送的通知（测试和手动执行时使用）
+
+        Returns:
+            bool: 超时前是否已空闲
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle_cond:
+            # 在条件变量的锁内检查，检查和等待之间不会漏掉投递线程的通知
+            while True:
+                with self._stats_lock:
+                    in_flight = self._in_flight
+                if in_flight == 0 and self._due_count() == 0:
+                    return True
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle_cond.wait(min(NOTIFY_POLL_INTERVAL, remaining) if remaining is not None else NOTIFY_POLL_INTERVAL)
+
+    def stats(self):
+        """发件箱各状态数量、投递延迟和发送耗时分布、计数器"""
+        conn = get_db_connection()
+        try:
+            rows = conn.execute('''
+                SELECT channel, status, COUNT(*) AS count, MIN(created_at) AS oldest
+                FROM notification_outbox
+                WHERE status IN (?, ?)
+                GROUP BY channel, status
+            ''', (STATUS_PENDING, STATUS_SENDING)).fetchall()
+        finally:
+            conn.close()
+
+        now = time.time()
+        channels = {name: {'pending': 0, 'sending': 0, 'oldest_pending_age': None} for name in self._channels}
+        for row in rows:
+            entry = channels.setdefault(row['channel'], {'pending': 0, 'sending': 0, 'oldest_pending_age': None})
+            entry[row['status']] = row['count']
+            if row['status'] == STATUS_PENDING:
+                entry['oldest_pending_age'] = round(now - row['oldest'], 1)
+        for name, channel in self._channels.items():
+            sender_stats = getattr(channel['sender'], 'stats', None)
+            if sender_stats is not None:
+                channels[name]['sender'] = sender_stats()
+
+        with self._stats_lock:
+            return {
+                'workers': self.workers,
+                'in_flight': self._in_flight,
+                'channels': channels,
+                'latency': _summary(self._latency),
+                'send_time': _summary(self._send_time),
+                'counters': dict(self._counters)
+            }
+
+    # ------------------------------------------------------------------
+    # 投递线程
+    # ------------------------------------------------------------------
+
+    def _worker_loop(self):
+        while not self._stopping:
+            wakeups = self._wakeups
+            try:
+                notification = self._claim_next()
+            except Exception as e:
+                print(f"❌ [通知] 获取待发送通知失败: {e}")
+                notification = None
+
+            if notification is None:
+                self._maybe_report_batch()
+                with self._cond:
+                    if not self._stopping and self._wakeups == wakeups:
+                        self._cond.wait(NOTIFY_POLL_INTERVAL)
+                continue
+
+            try:
+                self._deliver(notification)
+            except Exception as e:
+                print(f"❌ [通知] 投递通知 {notification['id']} 时出错: {e}")
+            finally:
+                self._release_in_flight(notification['channel'])
+                self._notify()
+
+    def _claim_next(self):
+        """取出一条到期的待发送通知并标记为发送中，没有时返回None"""
+        # 选择渠道和认领在同一把锁内，同时发送的数量不会超过渠道的并发上限
+        with self._claim_lock:
+            with self._stats_lock:
+                channels = [
+                    name for name, channel in self._channels.items()
+                    if channel['concurrency'] is None
+                    or self._channel_in_flight.get(name, 0) < channel['concurrency']
+                ]
+            if not channels:
+                return None
+            return self._claim(channels)
+
+    def _claim(self, channels):
+        placeholders = ','.join('?' * len(channels))
+        # 先计入发送中，认领和计数之间 wait_idle() 不会误判为空闲
+        with self._stats_lock:
+            self._in_flight += 1
+        row = None
+        now = time.time()
+        try:
+            conn = get_db_connection()
+            try:
+                # 单条 UPDATE ... RETURNING：多个投递线程（或多个进程）不会取到同一条通知
+                row = conn.execute(f'''
+                    UPDATE notification_outbox
+                    SET status = ?, attempts = attempts + 1, worker_id = ?, lease_expires_at = ?
+                    WHERE id = (
+                        SELECT id FROM notification_outbox
+                        WHERE status = ? AND next_attempt_at <= ? AND channel IN ({placeholders})
+                        ORDER BY next_attempt_at, id
+                        LIMIT 1
+                    ) AND status = ?
+                    RETURNING *
+                ''', (STATUS_SENDING, self.worker_id, now + self.lease_seconds,
+                      STATUS_PENDING, now, *channels, STATUS_PENDING)).fetchone()
+                conn.commit()
+            finally:
+                conn.close()
+        finally:
+            if row is None:
+                self._release_in_flight()
+            else:
+                with self._stats_lock:
+                    self._channel_in_flight[row['channel']] = self._channel_in_flight.get(row['channel'], 0) + 1
+                    if self._batch is None:
+                        self._batch = {'started': now, 'sent': 0, 'failed': 0, 'retried': 0}
+        return dict(row) if row is not None else None
+
+    def _deliver(self, notification):
+        channel = self._channels[notification['channel']]
+        if channel['bucket'] is not None and channel['bucket'].acquire() > 0:
+            with self._stats_lock:
+                self._counters['throttled'] += 1
+
+        args = (notification['title'], notification['content'])
+        if channel['with_recipient']:
+            args = (notification['recipient'], *args)
+        start = time.time()
+        try:
+            result = channel['sender'](*args)
+            error = None if result.get('success') else (result.get('error_message') or '发送失败')
+            permanent = False
+        except ValueError as e:
+            error, permanent = str(e), True
+        except Exception as e:
+            error, permanent = str(e), False
+        finished = time.time()
+
+        # 不保留正文的渠道在发送成功或最终失败后清空正文
+        finished_fields = {} if channel['keep_content'] else {'content': ''}
+
+        if error is None:
+            if not self._record(notification['id'], status=STATUS_SENT, sent_at=finished, last_error=None,
+                                **finished_fields):
+                return
+            with self._stats_lock:
+                self._counters['sent'] += 1
+                self._batch['sent'] += 1
+                self._latency.append(finished - notification['created_at'])
+                self._send_time.append(finished - start)
+            return
+
+        if not permanent and notification['attempts'] < notification['max_attempts']:
+            delay = min(NOTIFY_RETRY_MAX_DELAY, self.retry_base_delay * (2 ** (notification['attempts'] - 1)))
+            print(f"⚠️  [通知] 通知 {notification['id']} 第 {notification['attempts']} 次发送失败，{delay:.0f} 秒后重试: {error}")
+            if not self._record(notification['id'], status=STATUS_PENDING, next_attempt_at=finished + delay,
+                                last_error=error):
+                return
+            with self._stats_lock:
+                self._counters['retried'] += 1
+                self._batch['retried'] += 1
+            return
+
+        print(f"❌ [通知] 通知 {notification['id']} 发送失败: {error}")
+        if not self._record(notification['id'], status=STATUS_FAILED, last_error=error, **finished_fields):
+            return
+        with self._stats_lock:
+            self._counters['failed'] += 1
+            self._batch['failed'] += 1
+
+    def _maybe_report_batch(self):
+        """一批通知投递完（没有正在发送的通知）时打印汇总"""
+        with self._stats_lock:
+            batch = self._batch
+            if batch is None or self._in_flight:
+                return
+            self._batch = None
+            latency = _summary(self._latency)
+        elapsed = time.time() - batch['started']
+        print(f"📨 [通知] 本批投递完成: 成功 {batch['sent']}, 失败 {batch['failed']}, 待重试 {batch['retried']}, "
+              f"耗时 {elapsed:.1f} 秒, 投递延迟 p50 {latency['p50']} 秒 / p95 {latency['p95']} 秒")
+
+    def _record(self, notification_id, **fields):
+        """
+        写入发送结果并释放租约（只在通知仍由本投递者发送时生效）
+
+        Returns:
+            bool: 是否写入；租约已过期并被恢复时返回 False
+        """
+        fields['lease_expires_at'] = None
+        if fields['status'] == STATUS_PENDING:
+            fields['worker_id'] = None
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute(
+                f'UPDATE notification_outbox SET {assignments} WHERE id = ? AND status = ? AND worker_id = ?',
+                (*fields.values(), notification_id, STATUS_SENDING, self.worker_id)
+            )
+            conn.commit()
+            recorded = cursor.rowcount == 1
+        finally:
+            conn.close()
+        if not recorded:
+            print(f"⚠️  [通知] 通知 {notification_id} 的租约已过期并被恢复，忽略本次发送结果")
+            with self._stats_lock:
+                self._counters['lease_lost'] += 1
+        return recorded
+
+    def _due_count(self):
+        conn = get_db_connection()
+        try:
+            return conn.execute('''
+                SELECT COUNT(*) FROM notification_outbox WHERE status = ? AND next_attempt_at <= ?
+            ''', (STATUS_PENDING, time.time())).fetchone()[0]
+        finally:
+            conn.close()
+
+    def _prune(self, conn, now):
+        """清理超过保留期的已发送/已失败记录（最多每小时一次）"""
+        if now - self._last_prune < PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        conn.execute('''
+            DELETE FROM notification_outbox WHERE status IN (?, ?) AND created_at < ?
+        ''', (STATUS_SENT, STATUS_FAILED, now - NOTIFY_RETENTION_DAYS * 86400))
+
+    def _release_in_flight(self, channel=None):
+        with self._stats_lock:
+            self._in_flight -= 1
+            if channel is not None:
+                self._channel_in_flight[channel] -= 1
+        with self._idle_cond:
+            self._idle_cond.notify_all()
+
+    def _notify(self):
+        with self._cond:
+            self._wakeups += 1
+            self._cond.notify_all()
+
+
+# 投递器单例
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def _register_default_channels(dispatcher):
+    from components.check.message_wechat_push import push_wechat_message
+    from components.email.outbox import register_email_channel
+
+    dispatcher.register_channel(
+        'wechat',
+        push_wechat_message,
+        rate=float(os.getenv('NOTIFY_WECHAT_RATE', '2')),
+        burst=float(os.getenv('NOTIFY_WECHAT_BURST', '5'))
+    )
+    register_email_channel(dispatcher)
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    """获取通知投递器单例（已注册微信推送渠道 wechat 和邮件渠道 email）"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                dispatcher = NotificationDispatcher()
+                _register_default_channels(dispatcher)
+                _dispatcher = dispatcher
+    return _dispatcher
+
+
+def start_notification_workers():
+    """启动通知投递线程（应用启动时调用，恢复租约已过期的通知并继续投递）"""
+    dispatcher = get_dispatcher()
+    dispatcher.recover_expired()
+    dispatcher.start()
+    return dispatcher
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+通知投递测试
+两个投递器（模拟 Flask 重载时的父子进程）共用同一个发件箱：
+    - 另一个投递器启动、入队时不会把正在发送的通知放回待发送，通知只发送一次
+    - 投递进程退出后，租约过期的通知在启动恢复时放回待发送，由另一个投递器发送
+    - 发送失败按退避时间重试
+"""
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+root_dir = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database import db_init
+from components.notify.dispatcher import NotificationDispatcher, STATUS_PENDING, STATUS_SENDING, STATUS_SENT
+
+
+@contextmanager
+def temp_database():
+    """临时数据库"""
+    with tempfile.TemporaryDirectory() as workdir:
+        with mock.patch.object(db_init, 'DB_FILE', Path(workdir) / 'notify.db'):
+            db_init.init_database()
+            yield
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def make_dispatcher(sender, **kwargs):
+    dispatcher = NotificationDispatcher(workers=1, retry_base_delay=0.1, **kwargs)
+    dispatcher.register_channel('test', sender, max_attempts=3)
+    return dispatcher
+
+
+def test_second_instance_does_not_resend():
+    """另一个投递器启动、恢复和入队时，正在发送的通知不会被重复发送"""
+    with temp_database():
+        release = threading.Event()
+        sent = []
+
+        def sender(title, content):
+            sent.append(title)
+            if title == 'slow':
+                release.wait(5)
+            return {'success': True}
+
+        parent = make_dispatcher(sender)
+        child = make_dispatcher(sender)
+
+        slow_id = parent.enqueue('test', 'slow', '内容')
+        assert wait_until(lambda: parent.get(slow_id)['status'] == STATUS_SENDING)
+
+        # 子进程：启动恢复 + 入队自动启动投递线程
+        assert child.recover_expired() == 0
+        other_id = child.enqueue('test', 'other', '内容')
+        assert wait_until(lambda: child.get(other_id)['status'] == STATUS_SENT)
+        assert parent.get(slow_id)['status'] == STATUS_SENDING
+
+        release.set()
+        assert parent.wait_idle(5)
+        assert parent.get(slow_id)['status'] == STATUS_SENT
+        assert sorted(sent) == ['other', 'slow']
+        parent.stop(1)
+        child.stop(1)
+
+
+def test_expired_lease_is_recovered_once():
+    """投递进程退出后租约过期的通知被恢复并发送一次，原投递者的结果不再写入"""
+    with temp_database():
+        sent = []
+
+        def sender(title, content):
+            sent.append(title)
+            return {'success': True}
+
+        # 已退出的进程：取出了通知但没有发送完
+        dead = make_dispatcher(sender, autostart=False, lease_seconds=0.2)
+        notification_id = dead.enqueue('test', 'hello', '内容')
+        notification = dead._claim_next()
+        assert notification['id'] == notification_id
+        assert dead.get(notification_id)['worker_id'] == dead.worker_id
+
+        alive = make_dispatcher(sender)
+        assert alive.recover_expired() == 0
+        time.sleep(0.3)
+        assert alive.recover_expired() == 1
+        recovered = alive.get(notification_id)
+        assert recovered['status'] == STATUS_PENDING and recovered['attempts'] == 0
+
+        alive.start()
+        assert wait_until(lambda: alive.get(notification_id)['status'] == STATUS_SENT)
+        assert sent == ['hello']
+
+        # 原投递者迟到的发送结果被忽略
+        assert not dead._record(notification_id, status=STATUS_PENDING, next_attempt_at=time.time(), last_error='迟到')
+        assert alive.get(notification_id)['status'] == STATUS_SENT
+        assert dead.stats()['counters']['lease_lost'] == 1
+        alive.stop(1)
+
+
+def test_retry_with_backoff():
+    """发送失败后按退避时间重试"""
+    with temp_database():
+        attempts = []
+
+        def sender(title, content):
+            attempts.append(time.time())
+            if len(attempts) == 1:
+                return {'success': False, 'error_message': '接口繁忙'}
+            return {'success': True}
+
+        dispatcher = make_dispatcher(sender)
+        notification_id = dispatcher.enqueue('test', 'hello', '内容')
+        assert wait_until(lambda: dispatcher.get(notification_id)['status'] == STATUS_SENT)
+        notification = dispatcher.get(notification_id)
+        assert notification['attempts'] == 2
+        assert notification['last_error'] is None
+        assert attempts[1] - attempts[0] >= 0.1
+        dispatcher.stop(1)
+
+
+if __name__ == '__main__':
+    test_second_instance_does_not_resend()
+    test_expired_lease_is_recovered_once()
+    test_retry_with_backoff()
+    print("✅ 通知投递测试通过")
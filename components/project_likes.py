@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+项目点赞
+点赞数从计数表读取（由 project_likes 上的触发器维护，见迁移 0005），不再对点赞记录做 COUNT(*)：
+    - 总点赞数在进程内缓存 LIKE_TOTAL_CACHE_TTL 秒，本进程点赞后立即更新缓存
+    - 点赞用一条 INSERT ... SELECT ... WHERE 当日计数 < 上限 完成检查和写入，
+      并发点赞不会超过每日上限
+"""
+import os
+import threading
+import time
+from datetime import date
+
+from database import get_db_connection, transaction
+
+# 每人每天最多点赞次数
+DAILY_LIKE_LIMIT = 10
+# 总点赞数缓存时间（秒），其他进程的点赞最多延迟这么久可见
+LIKE_TOTAL_CACHE_TTL = float(os.getenv('LIKE_TOTAL_CACHE_TTL', '5'))
+
+# 缓存的总点赞数：(数值, 过期时间)
+_total_cache = None
+_total_lock = threading.Lock()
+
+
+def _set_total_cache(total):
+    global _total_cache
+    with _total_lock:
+        _total_cache = (total, time.monotonic() + LIKE_TOTAL_CACHE_TTL)
+
+
+def _read_total(conn):
+    row = conn.execute('SELECT total FROM project_like_totals WHERE id = 1').fetchone()
+    return row['total'] if row else 0
+
+
+def _read_today_count(conn, user_id, today):
+    row = conn.execute(
+        'SELECT count FROM project_like_daily WHERE user_id = ? AND like_date = ?',
+        (user_id, today)
+    ).fetchone()
+    return row['count'] if row else 0
+
+
+def get_total_likes(conn=None):
+    """
+    项目总点赞数（缓存未过期时不访问数据库）
+
+    Args:
+        conn: 使用已有连接（默认从连接池取出一个）
+    """
+    cached = _total_cache
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+
+    owned = conn is None
+    if owned:
+        conn = get_db_connection()
+    try:
+        total = _read_total(conn)
+    finally:
+        if owned:
+            conn.close()
+    _set_total_cache(total)
+    return total
+
+
+def get_today_like_count(user_id, today=None, conn=None):
+    """用户今日已点赞数"""
+    today = today or date.today().isoformat()
+    owned = conn is None
+    if owned:
+        conn = get_db_connection()
+    try:
+        return _read_today_count(conn, user_id, today)
+    finally:
+        if owned:
+            conn.close()
+
+
+def add_like(user_id, today=None, conn=None, limit=DAILY_LIKE_LIMIT):
+    """
+    点赞（未达到当日上限时写入）
+
+    Args:
+        user_id: 用户ID
+        today: 日期（默认今天，ISO 格式）
+        conn: 使用已有连接（默认从连接池取出一个）
+        limit: 每日上限
+
+    Returns:
+        dict: {'added': 是否写入, 'today_count': 今日点赞数, 'total_count': 总点赞数}
+    """
+    today = today or date.today().isoformat()
+    with transaction(conn) as conn:
+        cursor = conn.execute('''
+            INSERT INTO project_likes (user_id, like_date)
+            SELECT ?, ?
+            WHERE COALESCE(
+                (SELECT count FROM project_like_daily WHERE user_id = ? AND like_date = ?), 0
+            ) < ?
+        ''', (user_id, today, user_id, today, limit))
+        added = cursor.rowcount == 1
+        today_count = _read_today_count(conn, user_id, today)
+        total = _read_total(conn)
+    _set_total_cache(total)
+    return {'added': added, 'today_count': today_count, 'total_count': total}
+
+
+def clear_total_cache():
+    """清空总点赞数缓存（直接修改点赞记录后调用）"""
+    global _total_cache
+    with _total_lock:
+        _total_cache = None
+
+
+__all__ = [
+    'DAILY_LIKE_LIMIT',
+    'LIKE_TOTAL_CACHE_TTL',
+    'get_total_likes',
+    'get_today_like_count',
+    'add_like',
+    'clear_total_cache'
+]
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+请求合并（single-flight）
+同一个键的调用正在进行时，后到的调用不再重复请求上游，而是等待并共享第一次调用的结果。
+适用于 TTS 合成、图片识别等幂等且耗时的上游调用，键一般取输入内容的哈希。
+
+用法：
+    flight = get_single_flight('tts')
+    result = flight.do(key, func, *args, **kwargs)
+"""
+import threading
+
+
+class _Call:
+    """一次正在进行的调用"""
+
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    按键合并并发调用（线程安全）
+
+    只合并同时进行的调用，调用结束后不保留结果；需要结果缓存时由调用方自行处理。
+
+    Args:
+        name: 名称（用于统计展示）
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0,       # 总调用次数
+            'executed': 0,    # 实际执行上游调用的次数
+            'coalesced': 0,   # 被合并（共享结果）的次数
+            'errors': 0,      # 上游调用失败次数
+            'max_waiters': 0  # 单次调用最多被多少个调用方共享
+        }
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        执行调用；同一键已有调用在进行时等待其结果
+
+        Args:
+            key: 合并键
+            func: 上游调用
+            *args, **kwargs: 传给 func 的参数
+
+        Returns:
+            func 的返回值（被合并的调用方拿到同一个对象）
+
+        Raises:
+            func 抛出的异常（被合并的调用方收到同一个异常）
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats['coalesced'] += 1
+                self._stats['max_waiters'] = max(self._stats['max_waiters'], call.waiters)
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats['executed'] += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self):
+        """调用统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        calls = stats['calls']
+        stats['coalesced_rate'] = round(stats['coalesced'] / calls, 4) if calls else 0.0
+        return stats
+
+
+# 按名称注册的合并器
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def get_single_flight(name) -> SingleFlight:
+    """获取（或创建）指定名称的合并器"""
+    flight = _flights.get(name)
+    if flight is None:
+        with _flights_lock:
+            flight = _flights.get(name)
+            if flight is None:
+                flight = SingleFlight(name)
+                _flights[name] = flight
+    return flight
+
+
+def get_single_flight_stats():
+    """所有合并器的统计信息"""
+    with _flights_lock:
+        flights = list(_flights.values())
+    return {flight.name: flight.stats() for flight in flights}
+
+
+__all__ = ['SingleFlight', 'get_single_flight', 'get_single_flight_stats']
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""
+TTS 语音合成组件
+"""
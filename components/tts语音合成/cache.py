@@ -0,0 +1,515 @@
+# -*- coding: utf-8 -*-
+"""
+TTS 音频缓存
+按内容寻址的全局缓存：同一段文本在相同音色和语速/音量/音调/编码下只合成一次，
+所有用户共用同一个文件。缓存索引常驻内存并持久化到 index 文件，
+/tts 和历史记录的音频查找都是字典查询；定时任务按 LRU 淘汰超出容量上限的文件。
+
+多进程：淘汰任务和请求可能在不同进程中（例如 Flask 重载时的父子进程），每个进程只记录自己的改动
+（新增、移除、访问时间），写入时在文件锁内读取磁盘上的索引、合并改动后再写回，不会覆盖其他进程登记的音频；
+索引文件被其他进程更新后，下次查询时（最多每 TTS_CACHE_SYNC_INTERVAL 秒检查一次）重新读取。
+写入合并 TTS_CACHE_SAVE_DELAY 秒内的改动，进程退出时写回剩余的改动。
+
+目录结构：
+    static/audio/tts_cache/{key[:2]}/{key}.mp3
+旧版按用户保存的 static/audio/response_audio/{email}/tts_*.mp3 在首次建立索引时登记，
+同样参与查找和淘汰。
+"""
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from components.tts语音合成.utils import get_safe_email
+
+# 静态文件根目录（URL 中的路径相对于该目录）
+STATIC_DIR = Path('static')
+# 全局缓存目录
+CACHE_DIR = STATIC_DIR / 'audio' / 'tts_cache'
+# 旧版按用户保存的音频目录
+LEGACY_DIR = STATIC_DIR / 'audio' / 'response_audio'
+# 索引文件（放在数据库目录，避免通过静态路由暴露）
+INDEX_FILE = Path(__file__).parent.parent.parent / 'database' / 'tts_cache_index.json'
+
+# 缓存容量上限（MB）
+TTS_CACHE_MAX_MB = float(os.getenv('TTS_CACHE_MAX_MB', '512'))
+# 最近该时间内访问过的文件不淘汰（秒），避免删除正在播放的音频
+TTS_CACHE_GRACE = float(os.getenv('TTS_CACHE_GRACE', '600'))
+# 淘汰任务执行间隔（分钟）
+TTS_CACHE_EVICT_INTERVAL = int(os.getenv('TTS_CACHE_EVICT_INTERVAL', '60'))
+# 索引改动延迟写入的时间（秒），期间的多次改动合并为一次写入
+TTS_CACHE_SAVE_DELAY = float(os.getenv('TTS_CACHE_SAVE_DELAY', '5'))
+# 检查索引文件是否被其他进程更新的最短间隔（秒）
+TTS_CACHE_SYNC_INTERVAL = 5.0
+
+# 旧版文件名：tts_{message_id}_{hash}.mp3 或 tts_{hash}.mp3
+LEGACY_FILE_PATTERN = re.compile(r'^tts_(?:.+_)?([0-9a-f]{16})\.mp3$')
+
+
+def audio_cache_key(filtered_text: str, config) -> str:
+    """
+    计算缓存键：过滤后的文本 + 影响音频结果的合成参数
+
+    Args:
+        filtered_text: 过滤后的文本
+        config: TTSConfig 配置
+    """
+    payload = json.dumps([
+        filtered_text,
+        config.voice_type,
+        config.audio_speed_ratio,
+        config.audio_volume_ratio,
+        config.audio_pitch_ratio,
+        config.audio_encoding
+    ], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def legacy_cache_key(email: str, text_hash: str) -> str:
+    """旧版按用户保存的音频在索引中的键"""
+    return f"legacy:{get_safe_email(email)}:{text_hash}"
+
+
+class TTSAudioCache:
+    """
+    TTS 音频缓存索引（线程安全）
+
+    索引项: key -> {'path': 相对 static 的路径, 'size': 字节数, 'last_access': 时间戳}
+
+    Args:
+        static_dir: 静态文件根目录（缓存目录和旧版目录都在其下）
+        index_file: 索引文件路径
+        max_bytes: 容量上限（字节）
+    """
+
+    def __init__(self, static_dir=STATIC_DIR, index_file=INDEX_FILE, max_bytes=TTS_CACHE_MAX_MB * 1024 * 1024,
+                 save_delay=TTS_CACHE_SAVE_DELAY):
+        self.static_dir = Path(static_dir)
+        self.cache_dir = self.static_dir / CACHE_DIR.relative_to(STATIC_DIR)
+        self.legacy_dir = self.static_dir / LEGACY_DIR.relative_to(STATIC_DIR)
+        self.index_file = Path(index_file)
+        self.lock_file = self.index_file.with_name(f"{self.index_file.name}.lock")
+        self.max_bytes = int(max_bytes)
+        self.save_delay = save_delay
+        self._entries = None
+        self._total_size = 0
+        # 本进程尚未写入索引文件的改动
+        self._added = {}
+        self._removed = set()
+        self._accessed = {}
+        self._save_timer = None
+        # 上次读取或写入时索引文件的修改时间（纳秒）
+        self._synced_mtime = None
+        self._last_sync_check = 0.0
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def path_for(self, key: str) -> Path:
+        """缓存键对应的文件路径（文件不一定存在）"""
+        return self.cache_dir / key[:2] / f"{key}.mp3"
+
+    def lookup(self, key: str, touch=True):
+        """
+        查找缓存，命中时刷新访问时间
+
+        Args:
+            touch: 是否刷新访问时间；只读展示（如渲染聊天记录）传 False，不影响淘汰顺序也不触发保存
+
+        Returns:
+            str: 相对 static 目录的文件路径（可直接用于 url_for('static', filename=...)），未命中返回None
+        """
+        with self._lock:
+            self._maybe_reload()
+            entry = self._load().get(key)
+            if entry is None:
+                return None
+            if not touch:
+                return entry['path']
+            now = time.time()
+            entry['last_access'] = now
+            self._accessed[key] = now
+            self._schedule_save()
+            return entry['path']
+
+    def lookup_text(self, filtered_text: str, config, email=None, text_hash=None, verify=False, touch=True):
+        """
+        按文本查找音频：先查全局缓存，再查该用户的旧版音频
+
+        Args:
+            verify: 检查文件是否仍然存在，已被删除的索引项移除后视为未命中
+            touch: 是否刷新访问时间（见 lookup）
+
+        Returns:
+            str: 相对 static 目录的文件路径，未命中返回None
+        """
+        keys = [audio_cache_key(filtered_text, config)]
+        if email and text_hash:
+            keys.append(legacy_cache_key(email, text_hash))
+        for key in keys:
+            path = self.lookup(key, touch=touch)
+            if path is None:
+                continue
+            if verify and not (self.static_dir / path).exists():
+                self.discard(key)
+                continue
+            return path
+        return None
+
+    def stats(self):
+        """缓存统计"""
+        with self._lock:
+            self._maybe_reload()
+            entries = self._load()
+            return {
+                'entries': len(entries),
+                'total_size': self._total_size,
+                'max_size': self.max_bytes
+            }
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def add(self, key: str, path=None):
+        """
+        登记已写入缓存目录的音频文件
+
+        Args:
+            key: 缓存键
+            path: 文件路径（默认 path_for(key)）
+        """
+        path = Path(path) if path is not None else self.path_for(key)
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return
+        with self._lock:
+            entries = self._load()
+            old = entries.get(key)
+            if old is not None:
+                self._total_size -= old['size']
+            entry = {
+                'path': path.relative_to(self.static_dir).as_posix(),
+                'size': size,
+                'last_access': time.time()
+            }
+            entries[key] = entry
+            self._total_size += size
+            self._added[key] = entry
+            self._removed.discard(key)
+            self._schedule_save()
+
+    def discard(self, key: str):
+        """移除索引项（文件已不存在时调用）"""
+        with self._lock:
+            entry = self._load().pop(key, None)
+            if entry is None:
+                return
+            self._total_size -= entry['size']
+            self._added.pop(key, None)
+            self._accessed.pop(key, None)
+            self._removed.add(key)
+            self._schedule_save()
+
+    def prepare_path(self, key: str) -> Path:
+        """返回缓存文件路径，并确保所在目录存在"""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    # ------------------------------------------------------------------
+    # 淘汰
+    # ------------------------------------------------------------------
+
+    def evict(self, max_bytes=None, grace=TTS_CACHE_GRACE):
+        """
+        按最近访问时间淘汰文件，直到总大小不超过上限
+
+        在文件锁内基于合并后的索引（包含其他进程登记的音频和访问时间）执行，
+        淘汰结果写回索引后其他进程在下次同步时移除对应的索引项。
+
+        Args:
+            max_bytes: 容量上限（默认使用初始化时的设置）
+            grace: 最近该时间内访问过的文件不淘汰（秒）
+
+        Returns:
+            dict: 淘汰结果统计
+        """
+        max_bytes = self.max_bytes if max_bytes is None else int(max_bytes)
+        removed = 0
+        freed = 0
+        with self._lock, self._index_lock():
+            changed = self._merge()
+            entries = self._entries
+            # 清理文件已不存在的索引项
+            for key in [k for k, e in entries.items() if not (self.static_dir / e['path']).exists()]:
+                self._total_size -= entries.pop(key)['size']
+                changed = True
+
+            if self._total_size > max_bytes:
+                cutoff = time.time() - grace
+                for key, entry in sorted(entries.items(), key=lambda item: item[1]['last_access']):
+                    if self._total_size <= max_bytes:
+                        break
+                    if entry['last_access'] > cutoff:
+                        break
+                    try:
+                        (self.static_dir / entry['path']).unlink()
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        print(f"❌ [TTS缓存] 删除文件失败 {entry['path']}: {e}")
+                        continue
+                    del entries[key]
+                    self._total_size -= entry['size']
+                    removed += 1
+                    freed += entry['size']
+                    changed = True
+
+            if changed:
+                self._write()
+            return {
+                'removed': removed,
+                'freed': freed,
+                'total_size': self._total_size,
+                'entries': len(entries)
+            }
+
+    def flush(self):
+        """立即把本进程的改动合并写入索引文件（进程退出时自动调用）"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self._entries is None and not self._has_changes():
+                return
+            self._sync()
+
+    # ------------------------------------------------------------------
+    # 索引持久化
+    # ------------------------------------------------------------------
+
+    def _has_changes(self):
+        return bool(self._added or self._removed or self._accessed)
+
+    def _load(self):
+        """加载索引（调用方需持有锁），索引不存在或损坏时扫描目录重建"""
+        if self._entries is None:
+            self._sync()
+        return self._entries
+
+    def _maybe_reload(self):
+        """索引文件被其他进程更新过时重新读取并合并（调用方需持有锁）"""
+        if self._entries is None:
+            return
+        now = time.monotonic()
+        if now - self._last_sync_check < TTS_CACHE_SYNC_INTERVAL:
+            return
+        self._last_sync_check = now
+        try:
+            mtime = self.index_file.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._synced_mtime:
+            self._sync()
+
+    def _schedule_save(self):
+        """延迟写入（调用方需持有锁），合并一段时间内的改动"""
+        if self._save_timer is not None:
+            return
+        if self.save_delay <= 0:
+            self._sync()
+            return
+        self._save_timer = threading.Timer(self.save_delay, self._delayed_save)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def _delayed_save(self):
+        with self._lock:
+            self._save_timer = None
+            try:
+                self._sync()
+            except Exception as e:
+                print(f"❌ [TTS缓存] 保存索引失败: {e}")
+
+    def _sync(self):
+        """在文件锁内合并磁盘上的索引和本进程的改动，有改动时写回（调用方需持有锁）"""
+        with self._index_lock():
+            if self._merge():
+                self._write()
+
+    @contextmanager
+    def _index_lock(self):
+        """跨进程的索引文件锁"""
+        self.lock_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_file, 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _read(self):
+        """读取索引文件，不存在或损坏时返回None"""
+        if not self.index_file.exists():
+            return None
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  [TTS缓存] 索引文件损坏，重新扫描: {e}")
+            return None
+        entries = data.get('entries') if isinstance(data, dict) else None
+        return entries if isinstance(entries, dict) else None
+
+    def _merge(self):
+        """
+        读取磁盘上的索引并应用本进程的改动，结果作为内存中的索引（调用方需持有两把锁）
+
+        Returns:
+            bool: 是否需要写回索引文件
+        """
+        entries = self._read()
+        changed = self._has_changes()
+        if entries is None:
+            # 索引文件丢失：已加载过时以内存中的索引为准，否则扫描目录重建
+            entries = dict(self._entries) if self._entries is not None else self._scan()
+            changed = True
+        for key in self._removed:
+            entries.pop(key, None)
+        for key, entry in self._added.items():
+            entries[key] = entry
+        for key, last_access in self._accessed.items():
+            # 已被其他进程淘汰的索引项不恢复
+            entry = entries.get(key)
+            if entry is not None and last_access > entry['last_access']:
+                entry['last_access'] = last_access
+        self._added.clear()
+        self._removed.clear()
+        self._accessed.clear()
+
+        self._entries = entries
+        self._total_size = sum(entry['size'] for entry in entries.values())
+        try:
+            self._synced_mtime = self.index_file.stat().st_mtime_ns
+        except OSError:
+            self._synced_mtime = None
+        return changed
+
+    def _scan(self):
+        """扫描缓存目录和旧版用户目录，重建索引"""
+        entries = {}
+
+        def register(key, path):
+            try:
+                stat = path.stat()
+            except OSError:
+                return
+            entries[key] = {
+                'path': path.relative_to(self.static_dir).as_posix(),
+                'size': stat.st_size,
+                'last_access': stat.st_mtime
+            }
+
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob('*/*.mp3'):
+                register(path.stem, path)
+
+        if self.legacy_dir.exists():
+            for user_dir in self.legacy_dir.iterdir():
+                if not user_dir.is_dir():
+                    continue
+                for path in user_dir.glob('tts_*.mp3'):
+                    match = LEGACY_FILE_PATTERN.match(path.name)
+                    if match:
+                        register(f"legacy:{user_dir.name}:{match.group(1)}", path)
+
+        print(f"🔊 [TTS缓存] 已建立索引: {len(entries)} 个音频文件")
+        return entries
+
+    def _write(self):
+        """原子写入索引文件（调用方需持有两把锁）"""
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.index_file.with_name(f"{self.index_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'entries': self._entries}, f, ensure_ascii=False)
+            os.replace(temp_file, self.index_file)
+            self._synced_mtime = self.index_file.stat().st_mtime_ns
+        except OSError as e:
+            print(f"❌ [TTS缓存] 保存索引失败: {e}")
+
+
+# 缓存单例
+_tts_cache = None
+_tts_cache_lock = threading.Lock()
+
+
+def get_tts_cache() -> TTSAudioCache:
+    """获取 TTS 音频缓存单例"""
+    global _tts_cache
+    if _tts_cache is None:
+        with _tts_cache_lock:
+            if _tts_cache is None:
+                _tts_cache = TTSAudioCache()
+                # 进程退出时写回尚未保存的改动
+                atexit.register(_tts_cache.flush)
+    return _tts_cache
+
+
+def evict_tts_cache():
+    """执行一次缓存淘汰"""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    try:
+        result = get_tts_cache().evict()
+        freed_mb = result['freed'] / (1024 * 1024)
+        total_mb = result['total_size'] / (1024 * 1024)
+        print(f"🧹 [{timestamp}] [TTS缓存] 淘汰 {result['removed']} 个文件，释放 {freed_mb:.2f} MB，"
+              f"当前 {result['entries']} 个 / {total_mb:.2f} MB")
+        return result
+    except Exception as e:
+        print(f"❌ [{timestamp}] [TTS缓存] 淘汰失败: {e}")
+        return None
+
+
+def start_cache_eviction_schedule():
+    """
+    启动缓存淘汰定时任务（在后台线程中运行）
+    每 TTS_CACHE_EVICT_INTERVAL 分钟执行一次
+    """
+    import schedule
+
+    def run_schedule():
+        # 启动时先执行一次，顺便建立索引
+        evict_tts_cache()
+        schedule.every(TTS_CACHE_EVICT_INTERVAL).minutes.do(evict_tts_cache)
+        while True:
+            schedule.run_pending()
+            time.sleep(60)
+
+    thread = threading.Thread(target=run_schedule, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+TTS 预合成流水线
+在大模型流式输出的同时按句切分回复文本，分段提交给 TTS 服务并发合成，
+回复结束后按顺序拼接各段 MP3 帧，写入与 /tts 共用的全局音频缓存
+"""
+import os
+import threading
+from collections import deque
+
+from components.tts语音合成.service import get_tts_service
+from components.tts语音合成.cache import get_tts_cache, audio_cache_key
+from components.tts语音合成.utils import OPEN_BRACKETS, CLOSE_BRACKETS, filter_tts_text
+
+# 句子结束符
+SENTENCE_ENDINGS = '。！？!?；;…\n'
+# 过滤后少于该长度的句子与下一句合并，减少过短的合成请求
+MIN_SEGMENT_CHARS = int(os.getenv('TTS_PIPELINE_MIN_CHARS', '6'))
+# 同时合成的段数上限
+MAX_PARALLEL_SEGMENTS = int(os.getenv('TTS_PIPELINE_PARALLELISM', '2'))
+
+
+class SentenceSegmenter:
+    """
+    增量句子切分器
+
+    只在括号之外的句子结束符处切分：未闭合的括号可能在后续文本中闭合，
+    切开会导致过滤结果与整段过滤不一致。括号规则与 BRACKET_PATTERN 相同，
+    即左括号匹配同一行内第一个右括号，换行前未闭合的左括号按普通字符处理。
+    """
+
+    def __init__(self, min_chars=MIN_SEGMENT_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ''
+        self._scan_pos = 0
+        self._in_bracket = False
+        self._cut_pos = 0  # 缓冲区中最近一个可切分位置
+
+    def feed(self, text):
+        """
+        追加文本
+
+        Returns:
+            list: 新得到的完整句子（原始文本，未过滤）
+        """
+        self._buffer += text
+        segments = []
+        buffer = self._buffer
+        for i in range(self._scan_pos, len(buffer)):
+            ch = buffer[i]
+            if self._in_bracket:
+                if ch in CLOSE_BRACKETS or ch == '\n':
+                    self._in_bracket = False
+                if ch != '\n':
+                    continue
+            elif ch in OPEN_BRACKETS:
+                self._in_bracket = True
+                continue
+
+            if ch in SENTENCE_ENDINGS:
+                candidate = buffer[self._cut_pos:i + 1]
+                if len(filter_tts_text(candidate)) >= self.min_chars:
+                    segments.append(candidate)
+                    self._cut_pos = i + 1
+        self._scan_pos = len(buffer)
+
+        if self._cut_pos:
+            self._buffer = buffer[self._cut_pos:]
+            self._scan_pos -= self._cut_pos
+            self._cut_pos = 0
+        return segments
+
+    def flush(self):
+        """返回剩余文本"""
+        rest = self._buffer
+        self._buffer = ''
+        self._scan_pos = 0
+        self._in_bracket = False
+        self._cut_pos = 0
+        return rest
+
+
+class TTSPipeline:
+    """
+    一次回复的预合成流水线（feed/finish 由流式输出线程调用，不会阻塞）
+
+    Args:
+        service: TTS 服务（默认单例）
+        cache: 音频缓存（默认单例）
+        max_parallel: 同时合成的段数上限
+    """
+
+    def __init__(self, service=None, cache=None, max_parallel=MAX_PARALLEL_SEGMENTS):
+        self.service = service or get_tts_service()
+        self.cache = cache or get_tts_cache()
+        self.max_parallel = max(1, max_parallel)
+        self.segmenter = SentenceSegmenter()
+        self.full_text = ''
+        self._segments = []        # 每段的音频帧列表，按顺序
+        self._pending = deque()    # 待提交的 (段序号, 文本)
+        self._in_flight = 0
+        self._futures = set()      # 合成中的段（服务端截止时间到达后自动取消）
+        self._finished = False
+        self._failed = False
+        self._finalizing = False
+        self._done_event = threading.Event()
+        self._lock = threading.Lock()
+        self.output_file = None
+
+    def feed(self, text):
+        """追加一段流式输出的文本"""
+        if not text or self._failed:
+            return
+        self.full_text += text
+        for segment in self.segmenter.feed(text):
+            self._enqueue(segment)
+
+    def finish(self):
+        """回复结束：提交剩余文本，全部合成完成后在后台拼接写入缓存"""
+        rest = self.segmenter.flush()
+        if rest:
+            self._enqueue(rest)
+        with self._lock:
+            self._finished = True
+        self._maybe_finalize()
+
+    def abort(self):
+        """放弃本次预合成（例如流式输出中途出错），取消合成中的段并释放连接"""
+        with self._lock:
+            self._failed = True
+            self._pending.clear()
+            self._finished = True
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+        self._maybe_finalize()
+
+    def wait(self, timeout=None):
+        """等待流水线结束（主要用于测试和脚本）"""
+        return self._done_event.wait(timeout)
+
+    def _enqueue(self, raw_segment):
+        text = filter_tts_text(raw_segment)
+        if not text:
+            return
+        with self._lock:
+            if self._failed:
+                return
+            index = len(self._segments)
+            self._segments.append([])
+            self._pending.append((index, text))
+        self._dispatch()
+
+    def _dispatch(self):
+        """在并发上限内提交待合成的段"""
+        while True:
+            with self._lock:
+                if self._failed or not self._pending or self._in_flight >= self.max_parallel:
+                    return
+                index, text = self._pending.popleft()
+                self._in_flight += 1
+            chunks = self._segments[index]
+            try:
+                future = self.service.submit(text, chunks.append)
+            except Exception as e:
+                print(f"❌ [TTS预合成] 提交失败: {e}")
+                self._on_segment_done(failed=True)
+                return
+            with self._lock:
+                self._futures.add(future)
+                aborted = self._failed
+            future.add_done_callback(self._on_future_done)
+            if aborted:
+                # 提交期间流水线已放弃
+                future.cancel()
+
+    def _on_future_done(self, future):
+        with self._lock:
+            self._futures.discard(future)
+        self._on_segment_done(failed=future.cancelled() or future.exception() is not None)
+
+    def _on_segment_done(self, failed):
+        with self._lock:
+            self._in_flight -= 1
+            if failed:
+                self._failed = True
+                self._pending.clear()
+        self._dispatch()
+        self._maybe_finalize()
+
+    def _maybe_finalize(self):
+        with self._lock:
+            if not self._finished or self._in_flight or self._pending or self._finalizing:
+                return
+            # 标记开始收尾，保证只写入一次
+            self._finalizing = True
+            failed = self._failed
+
+        try:
+            if failed:
+                print("⚠️  [TTS预合成] 有分段合成失败，放弃本次预合成")
+            elif self._segments:
+                self._write_output()
+        finally:
+            self._done_event.set()
+
+    def _write_output(self):
+        """按顺序拼接各段音频帧，原子写入缓存文件"""
+        filtered_text = filter_tts_text(self.full_text)
+        if not filtered_text:
+            return
+        cache_key = audio_cache_key(filtered_text, self.service.config)
+        if self.cache.lookup(cache_key):
+            self.output_file = str(self.cache.path_for(cache_key))
+            return
+
+        output_file = self.cache.prepare_path(cache_key)
+        temp_file = f"{output_file}.{threading.get_ident()}.part"
+        try:
+            with open(temp_file, 'wb') as f:
+                for chunks in self._segments:
+                    for chunk in chunks:
+                        f.write(chunk)
+            os.replace(temp_file, output_file)
+            self.cache.add(cache_key, output_file)
+            self.output_file = str(output_file)
+            print(f"🔊 [TTS预合成] 已生成 {len(self._segments)} 段语音: {output_file.name}")
+        except OSError as e:
+            print(f"❌ [TTS预合成] 写入缓存失败: {e}")
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+TTS 语音合成服务
+在独立线程中运行常驻事件循环，复用已鉴权的 WebSocket 连接，
+为 Flask 等同步代码提供阻塞式调用接口
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+import websockets
+
+from components.tts语音合成 import src as tts_src
+
+# 连接池大小（同时进行的合成数量上限）
+TTS_POOL_SIZE = int(os.getenv("TTS_POOL_SIZE", "4"))
+# 空闲连接最长保留时间（秒），超过后关闭
+TTS_IDLE_TIMEOUT = float(os.getenv("TTS_IDLE_TIMEOUT", "60"))
+# 空闲超过该时间的连接在复用前先 ping 一次（秒）
+TTS_PING_AFTER = float(os.getenv("TTS_PING_AFTER", "15"))
+# 单次合成超时时间（秒）
+TTS_REQUEST_TIMEOUT = float(os.getenv("TTS_REQUEST_TIMEOUT", "60"))
+
+
+class TTSError(Exception):
+    """TTS 合成失败"""
+
+
+def _is_open(ws) -> bool:
+    """判断连接是否仍处于打开状态（兼容新旧版本 websockets）"""
+    state = getattr(ws, 'state', None)
+    return state is not None and getattr(state, 'name', '') == 'OPEN'
+
+
+def _is_error_frame(res) -> bool:
+    """判断服务器响应是否为错误消息"""
+    return isinstance(res, (bytes, bytearray)) and len(res) > 1 and (res[1] >> 4) == 0xf
+
+
+class _ChunkSink:
+    """parse_response 的写入目标，把音频帧转交给回调"""
+
+    def __init__(self, on_chunk):
+        self.on_chunk = on_chunk
+        self.size = 0
+
+    def write(self, data):
+        if data:
+            self.size += len(data)
+            self.on_chunk(bytes(data))
+
+
+class TTSConnectionPool:
+    """
+    WebSocket 连接池（只能在服务的事件循环线程中使用）
+
+    Args:
+        config: TTSConfig 配置
+        max_size: 最大连接数
+        idle_timeout: 空闲连接保留时间（秒）
+        ping_after: 空闲超过该时间的连接复用前进行 ping 检查（秒）
+    """
+
+    def __init__(self, config, max_size=TTS_POOL_SIZE, idle_timeout=TTS_IDLE_TIMEOUT, ping_after=TTS_PING_AFTER):
+        self.config = config
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self._connect_kwargs = tts_src.build_connect_kwargs(config)
+        self._idle = deque()  # [(ws, 最后使用时间)]
+        self._semaphore = None
+        self.stats = {'opened': 0, 'reused': 0, 'discarded': 0}
+
+    async def acquire(self):
+        """
+        获取一个可用连接
+
+        Returns:
+            tuple: (连接, 是否为复用的连接)
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_size)
+        await self._semaphore.acquire()
+        try:
+            while self._idle:
+                ws, last_used = self._idle.pop()
+                idle_for = time.monotonic() - last_used
+                if not _is_open(ws) or idle_for > self.idle_timeout:
+                    await self._discard(ws)
+                    continue
+                if idle_for > self.ping_after and not await self._ping(ws):
+                    await self._discard(ws)
+                    continue
+                self.stats['reused'] += 1
+                return ws, True
+
+            ws = await websockets.connect(self.config.api_url, **self._connect_kwargs)
+            self.stats['opened'] += 1
+            return ws, False
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    async def release(self, ws, reusable=True):
+        """归还连接，不可复用或已关闭的连接直接关闭"""
+        try:
+            if reusable and _is_open(ws):
+                self._idle.append((ws, time.monotonic()))
+            else:
+                await self._discard(ws)
+        finally:
+            self._semaphore.release()
+
+    async def evict_idle(self):
+        """关闭超过空闲时间的连接"""
+        now = time.monotonic()
+        keep = deque()
+        while self._idle:
+            ws, last_used = self._idle.popleft()
+            if _is_open(ws) and now - last_used <= self.idle_timeout:
+                keep.append((ws, last_used))
+            else:
+                await self._discard(ws)
+        self._idle = keep
+
+    async def close(self):
+        """关闭所有空闲连接"""
+        while self._idle:
+            ws, _ = self._idle.pop()
+            await self._discard(ws)
+
+    async def _ping(self, ws):
+        try:
+            pong_waiter = await ws.ping()
+            await asyncio.wait_for(pong_waiter, timeout=3)
+            return True
+        except Exception:
+            return False
+
+    async def _discard(self, ws):
+        self.stats['discarded'] += 1
+        try:
+            await ws.close()
+        except Exception:
+            pass
+
+
+class TTSService:
+    """
+    TTS 服务（线程安全，进程内单例使用）
+
+    Args:
+        config: TTSConfig 配置（默认从环境变量读取）
+        pool_size: 连接池大小
+        request_timeout: 单次合成的默认超时时间（秒）
+    """
+
+    def __init__(self, config=None, pool_size=TTS_POOL_SIZE, request_timeout=TTS_REQUEST_TIMEOUT):
+        self.config = config or tts_src.TTSConfig()
+        self.pool = TTSConnectionPool(self.config, max_size=pool_size)
+        self.request_timeout = request_timeout
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        """启动事件循环线程（首次调用时）"""
+        if self._loop is not None:
+            return self._loop
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.call_soon(self._schedule_eviction)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name='tts-service-loop', daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+                print(f"🔊 [TTS服务] 事件循环已启动，连接池大小: {self.pool.max_size}")
+        return self._loop
+
+    def _schedule_eviction(self):
+        """定期清理空闲连接（在事件循环线程中执行）"""
+        loop = asyncio.get_running_loop()
+        loop.create_task(self.pool.evict_idle())
+        loop.call_later(self.pool.idle_timeout / 2, self._schedule_eviction)
+
+    async def _synthesize(self, text, on_chunk):
+        """
+        合成语音，每收到一段音频就调用 on_chunk(bytes)
+
+        复用的连接可能已被服务端关闭，此时换新连接重试一次。
+
+        Returns:
+            int: 音频总字节数
+        """
+        request_bytes = tts_src.build_request_bytes(tts_src.build_request(self.config, text, "submit"))
+
+        for attempt in range(2):
+            ws, reused = await self.pool.acquire()
+            sink = _ChunkSink(on_chunk)
+            reusable = False
+            try:
+                await ws.send(request_bytes)
+                while True:
+                    res = await ws.recv()
+                    if _is_error_frame(res):
+                        tts_src.parse_response(res, sink)
+                        raise TTSError('语音合成服务返回错误')
+                    if tts_src.parse_response(res, sink):
+                        break
+                reusable = True
+                return sink.size
+            except websockets.exceptions.ConnectionClosed:
+                # 复用的旧连接失效且尚未收到音频：换新连接重试
+                if reused and sink.size == 0 and attempt == 0:
+                    print("⚠️  [TTS服务] 复用连接已失效，重新建立连接")
+                    continue
+                raise
+            finally:
+                await self.pool.release(ws, reusable=reusable)
+        raise TTSError('语音合成失败')
+
+    def submit(self, text, on_chunk, timeout=None):
+        """
+        在服务线程中异步合成（非阻塞）
+
+        超过截止时间仍未完成的合成会被取消并释放连接池名额，future 以 TimeoutError 结束，
+        上游无响应时不会一直占用连接。
+
+        Args:
+            text: 要合成的文本（已过滤）
+            on_chunk: 收到音频帧的回调
+            timeout: 截止时间（秒），默认 request_timeout
+
+        Returns:
+            concurrent.futures.Future: 结果为音频总字节数
+        """
+        if timeout is None:
+            timeout = self.request_timeout
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(
+            asyncio.wait_for(self._synthesize(text, on_chunk), timeout), loop
+        )
+
+    def synthesize(self, text, output_file, timeout=None):
+        """
+        合成语音并写入文件（阻塞，供 Flask 路由调用）
+
+        先写入临时文件，成功后再原子替换，失败不会留下空的缓存文件。
+
+        Args:
+            text: 要合成的文本（已过滤）
+            output_file: 输出文件路径
+            timeout: 超时时间（秒），默认 request_timeout
+
+        Returns:
+            str: 输出文件路径
+        """
+        if timeout is None:
+            timeout = self.request_timeout
+        output_file = str(output_file)
+        # 临时文件与目标文件在同一目录（os.replace 原子替换），每次调用唯一，超时后仍在运行的协程不会写到下一次调用的文件里
+        temp_file = f"{output_file}.{uuid.uuid4().hex}.part"
+        abandoned = threading.Event()
+        try:
+            with open(temp_file, 'wb') as f:
+                def write(chunk):
+                    # 调用方已放弃（超时）后收到的音频直接丢弃，并让协程以错误结束
+                    if abandoned.is_set():
+                        raise TTSError('合成已取消')
+                    f.write(chunk)
+
+                future = self.submit(text, write, timeout)
+                try:
+                    size = future.result(timeout)
+                except BaseException:
+                    # 取消会转交到事件循环线程中的协程（run_coroutine_threadsafe 的 future 与任务相互关联）
+                    abandoned.set()
+                    future.cancel()
+                    raise
+            if size == 0:
+                raise TTSError('语音合成结果为空')
+            os.replace(temp_file, output_file)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+        return output_file
+
+    def close(self):
+        """关闭连接池和事件循环"""
+        loop = self._loop
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.pool.close(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        self._loop = None
+
+
+# 服务单例
+_tts_service = None
+_tts_service_lock = threading.Lock()
+
+
+def get_tts_service() -> TTSService:
+    """获取 TTS 服务单例"""
+    global _tts_service
+    if _tts_service is None:
+        with _tts_service_lock:
+            if _tts_service is None:
+                _tts_service = TTSService()
+    return _tts_service
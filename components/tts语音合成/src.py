@@ -85,8 +85,8 @@ def build_request_bytes(request_json: dict) -> bytearray:
     return request_bytes
 
 
-async def send_request(config: TTSConfig, request_bytes: bytearray, output_file: str, wait_for_complete: bool = True):
-    """发送 WebSocket 请求并接收响应"""
+def build_connect_kwargs(config: TTSConfig) -> dict:
+    """构建 websockets.connect 的参数（鉴权头 + 关闭自动 ping）"""
     # websockets 14.0+ 使用 additional_headers，13.1及更早版本使用 extra_headers
     headers = [("Authorization", f"Bearer; {config.token}")]
     
@@ -108,27 +108,40 @@ async def send_request(config: TTSConfig, request_bytes: bytearray, output_file:
             # 如果无法检测版本，默认使用 extra_headers（更兼容旧版本）
             use_additional_headers = False
     
-    with open(output_file, "wb") as file:
-        # 根据版本选择正确的参数名
-        connect_kwargs = {"ping_interval": None}
-        if use_additional_headers:
-            connect_kwargs["additional_headers"] = headers
-        else:
-            connect_kwargs["extra_headers"] = headers
-        
-        async with websockets.connect(config.api_url, **connect_kwargs) as ws:
-            await ws.send(request_bytes)
-            
-            if wait_for_complete:
-                # submit 操作：等待所有音频数据
-                while True:
+    # 根据版本选择正确的参数名
+    connect_kwargs = {"ping_interval": None}
+    if use_additional_headers:
+        connect_kwargs["additional_headers"] = headers
+    else:
+        connect_kwargs["extra_headers"] = headers
+    return connect_kwargs
+
+
+async def send_request(config: TTSConfig, request_bytes: bytearray, output_file: str, wait_for_complete: bool = True):
+    """发送 WebSocket 请求并接收响应"""
+    connect_kwargs = build_connect_kwargs(config)
+    
+    # 先写入同目录下的临时文件，完整接收后再原子替换，中途失败或被取消不会留下残缺的音频文件
+    temp_file = f"{output_file}.{uuid.uuid4().hex}.part"
+    try:
+        with open(temp_file, "wb") as file:
+            async with websockets.connect(config.api_url, **connect_kwargs) as ws:
+                await ws.send(request_bytes)
+                
+                if wait_for_complete:
+                    # submit 操作：等待所有音频数据
+                    while True:
+                        res = await ws.recv()
+                        if parse_response(res, file):
+                            break
+                else:
+                    # query 操作：只接收一次响应
                     res = await ws.recv()
-                    if parse_response(res, file):
-                        break
-            else:
-                # query 操作：只接收一次响应
-                res = await ws.recv()
-                parse_response(res, file)
+                    parse_response(res, file)
+        os.replace(temp_file, output_file)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
     
     print("\n连接已关闭...")
 
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+流式 TTS
+合成过程中把收到的音频帧同时写入缓存文件并转发给 HTTP 响应，
+浏览器在收到第一帧后即可开始播放
+"""
+import os
+import threading
+import time
+import uuid
+
+from components.tts语音合成.service import get_tts_service, TTSError, TTS_REQUEST_TIMEOUT
+
+# 合成完成后流对象保留时间（秒），期间仍可从内存读取
+STREAM_TTL = 120
+
+
+class AudioStream:
+    """
+    一次流式合成：音频帧保存在内存中供多个读取方消费，同时写入临时文件，
+    合成成功后原子替换为缓存文件
+
+    Args:
+        stream_id: 流ID
+        output_file: 最终缓存文件路径
+        owner: 发起请求的用户（用于读取时校验，复用同一流的其他用户通过 add_owner 加入）
+        on_saved: 缓存文件写入成功后的回调，参数为文件路径
+    """
+
+    def __init__(self, stream_id, output_file, owner=None, on_saved=None):
+        self.stream_id = stream_id
+        self.output_file = str(output_file)
+        self.owners = {owner} if owner else set()
+        self.on_saved = on_saved
+        self.error = None
+        self.done = False
+        self.finished_at = None
+        self._chunks = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._future = None
+        self._temp_file = f"{self.output_file}.{stream_id}.part"
+        self._file = open(self._temp_file, 'wb')
+
+    def add_owner(self, owner):
+        """允许另一个用户读取该流"""
+        if owner:
+            with self._cond:
+                self.owners.add(owner)
+
+    def is_owner(self, user):
+        """判断用户是否可以读取该流"""
+        return user in self.owners
+
+    def feed(self, chunk):
+        """追加一段音频（在 TTS 服务线程中调用）"""
+        with self._cond:
+            if self.done:
+                return
+            self._file.write(chunk)
+            self._chunks.append(chunk)
+            self._size += len(chunk)
+            self._cond.notify_all()
+
+    def attach(self, future):
+        """关联合成任务的 future，流被取消时一并取消合成"""
+        self._future = future
+
+    def cancel(self, error=None):
+        """以错误结束流并取消合成"""
+        self.finish(error or TTSError('语音合成已取消'))
+        if self._future is not None:
+            self._future.cancel()
+
+    def finish(self, error=None):
+        """结束合成：成功则落盘为缓存文件，失败则删除临时文件"""
+        with self._cond:
+            if self.done:
+                return
+            try:
+                self._file.close()
+                if error is None and self._size > 0:
+                    os.replace(self._temp_file, self.output_file)
+                    # 在标记完成前登记缓存，读取方结束后立即重新请求也能命中
+                    if self.on_saved is not None:
+                        try:
+                            self.on_saved(self.output_file)
+                        except Exception as e:
+                            print(f"⚠️  [TTS流] 缓存登记失败: {e}")
+                else:
+                    self.error = error or TTSError('语音合成结果为空')
+            except OSError as e:
+                self.error = e
+            finally:
+                if os.path.exists(self._temp_file):
+                    os.remove(self._temp_file)
+                self.done = True
+                self.finished_at = time.monotonic()
+                self._cond.notify_all()
+
+    def iter_chunks(self, timeout=TTS_REQUEST_TIMEOUT):
+        """
+        按顺序产出音频帧，直到合成结束
+
+        等待超时时取消合成并结束流，注册表不会再把卡住的流交给后续请求。
+
+        Args:
+            timeout: 等待下一帧的最长时间（秒）
+        """
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self._chunks) and not self.done:
+                    if not self._cond.wait(timeout):
+                        print(f"⚠️  [TTS流] 等待音频超时: {self.stream_id}")
+                        self.cancel(TimeoutError('等待音频超时'))
+                        return
+                pending = self._chunks[index:]
+                index += len(pending)
+                finished = self.done and index >= len(self._chunks)
+            for chunk in pending:
+                yield chunk
+            if finished:
+                if self.error is not None:
+                    print(f"❌ [TTS流] 合成失败: {self.error}")
+                return
+
+
+class TTSStreamRegistry:
+    """
+    进程内流式合成注册表
+
+    同一个缓存文件正在合成时复用已有的流，避免重复合成。
+    """
+
+    def __init__(self, service=None):
+        self._service = service
+        self._streams = {}
+        self._by_output = {}
+        self._lock = threading.Lock()
+
+    @property
+    def service(self):
+        return self._service or get_tts_service()
+
+    def start(self, text, output_file, owner=None, on_saved=None):
+        """
+        开始（或复用）一次流式合成
+
+        Args:
+            text: 要合成的文本（已过滤）
+            output_file: 缓存文件路径
+            owner: 发起请求的用户
+            on_saved: 缓存文件写入成功后的回调
+
+        Returns:
+            AudioStream: 流对象
+        """
+        output_file = str(output_file)
+        with self._lock:
+            self._purge()
+            stream = self._by_output.get(output_file)
+            if stream is not None and not stream.done:
+                stream.add_owner(owner)
+                return stream
+
+            stream = AudioStream(uuid.uuid4().hex, output_file, owner=owner, on_saved=on_saved)
+            self._streams[stream.stream_id] = stream
+            self._by_output[output_file] = stream
+
+        try:
+            future = self.service.submit(text, stream.feed)
+        except Exception as e:
+            stream.finish(e)
+            raise
+
+        def on_done(f):
+            if f.cancelled():
+                stream.finish(TTSError('语音合成已取消'))
+                return
+            error = f.exception()
+            if isinstance(error, TimeoutError):
+                # 超过服务的截止时间，合成已被取消
+                error = TimeoutError('语音合成超时')
+            stream.finish(error)
+
+        stream.attach(future)
+        future.add_done_callback(on_done)
+        return stream
+
+    def get(self, stream_id):
+        """根据ID获取流对象，不存在时返回None"""
+        with self._lock:
+            return self._streams.get(stream_id)
+
+    def _purge(self):
+        """移除完成超过 STREAM_TTL 的流（调用方需持有锁）"""
+        now = time.monotonic()
+        expired = [
+            stream_id for stream_id, stream in self._streams.items()
+            if stream.done and now - stream.finished_at > STREAM_TTL
+        ]
+        for stream_id in expired:
+            stream = self._streams.pop(stream_id)
+            if self._by_output.get(stream.output_file) is stream:
+                del self._by_output[stream.output_file]
+
+
+# 注册表单例
+_stream_registry = None
+_stream_registry_lock = threading.Lock()
+
+
+def get_stream_registry() -> TTSStreamRegistry:
+    """获取流式合成注册表单例"""
+    global _stream_registry
+    if _stream_registry is None:
+        with _stream_registry_lock:
+            if _stream_registry is None:
+                _stream_registry = TTSStreamRegistry()
+    return _stream_registry
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+TTS 预合成流水线测试
+上游一直不返回音频时：
+    - 卡住的段在截止时间后被取消，流水线结束且不写入缓存
+    - abort() 立即取消合成中的段
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+root_dir = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from components.tts语音合成.service import TTSService
+from components.tts语音合成.pipeline import TTSPipeline
+
+
+class StalledService(TTSService):
+    """上游不响应的 TTS 服务，记录开始和被取消的合成次数（计数只在事件循环线程中修改）"""
+
+    def __init__(self, request_timeout):
+        super().__init__(request_timeout=request_timeout)
+        self.started = 0
+        self.cancelled = 0
+
+    async def _synthesize(self, text, on_chunk):
+        self.started += 1
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_stalled_segment_times_out():
+    service = StalledService(request_timeout=0.3)
+    try:
+        pipeline = TTSPipeline(service=service, cache=object(), max_parallel=1)
+        pipeline.feed('第一句话已经结束。第二句话也结束了。')
+        pipeline.finish()
+        assert pipeline.wait(5)
+        assert pipeline.output_file is None
+        assert wait_until(lambda: service.cancelled == 1)
+    finally:
+        service.close()
+
+
+def test_abort_cancels_in_flight_segments():
+    service = StalledService(request_timeout=30)
+    try:
+        pipeline = TTSPipeline(service=service, cache=object(), max_parallel=2)
+        pipeline.feed('第一句话已经结束。第二句话也结束了。第三句话还在等待。')
+        assert wait_until(lambda: service.started == 2)
+        pipeline.abort()
+        assert pipeline.wait(2)
+        assert pipeline.output_file is None
+        assert wait_until(lambda: service.cancelled == 2)
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    test_stalled_segment_times_out()
+    test_abort_cancels_in_flight_segments()
+    print("✅ TTS 预合成流水线测试通过")
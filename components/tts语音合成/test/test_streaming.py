@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+流式 TTS 测试
+上游一直不返回音频时：
+    - 合成在截止时间后被取消，释放连接池名额
+    - 流以 TimeoutError 结束，同一缓存文件的下一次请求重新合成，不会复用卡住的流
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# 添加项目根目录到路径
+root_dir = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from components.tts语音合成.service import TTSService
+from components.tts语音合成.streaming import TTSStreamRegistry
+
+
+class StalledService(TTSService):
+    """收到第一帧后上游不再响应的 TTS 服务"""
+
+    def __init__(self, request_timeout):
+        super().__init__(request_timeout=request_timeout)
+        self.cancelled = threading.Event()
+
+    async def _synthesize(self, text, on_chunk):
+        try:
+            on_chunk(b'audio')
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+
+
+def test_stalled_synthesis_times_out():
+    service = StalledService(request_timeout=0.3)
+    registry = TTSStreamRegistry(service)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            output_file = os.path.join(workdir, 'audio.mp3')
+            stream = registry.start('你好', output_file, owner='a@example.com')
+            assert list(stream.iter_chunks(timeout=5)) == [b'audio']
+            assert stream.done
+            assert isinstance(stream.error, TimeoutError)
+            assert service.cancelled.wait(2)
+            assert not os.path.exists(output_file)
+            assert os.listdir(workdir) == []
+
+            service.cancelled.clear()
+            retry = registry.start('你好', output_file, owner='a@example.com')
+            assert retry is not stream
+            retry.cancel()
+            assert service.cancelled.wait(2)
+    finally:
+        service.close()
+
+
+def test_reader_timeout_cancels_synthesis():
+    service = StalledService(request_timeout=30)
+    registry = TTSStreamRegistry(service)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            output_file = os.path.join(workdir, 'audio.mp3')
+            stream = registry.start('你好', output_file)
+            assert list(stream.iter_chunks(timeout=0.3)) == [b'audio']
+            assert stream.done
+            assert isinstance(stream.error, TimeoutError)
+            assert service.cancelled.wait(2)
+            service.cancelled.clear()
+            retry = registry.start('你好', output_file)
+            assert retry is not stream
+            retry.cancel()
+            assert service.cancelled.wait(2)
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    test_stalled_synthesis_times_out()
+    test_reader_timeout_cancels_synthesis()
+    print("✅ 流式 TTS 测试通过")
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+TTS 公共工具：文本过滤、文本哈希
+/tts 接口、历史记录音频匹配和预合成流水线共用，保证三者的过滤规则和哈希一致
+"""
+import hashlib
+import re
+from werkzeug.utils import secure_filename
+
+# 括号内的内容（角色扮演动作描述），匹配中文括号、英文括号、方括号等
+BRACKET_PATTERN = re.compile(r'[（(【\[].*?[）)\]\】]')
+# 星号
+ASTERISK_PATTERN = re.compile(r'\*+')
+
+# 左右括号字符（与 BRACKET_PATTERN 保持一致）
+OPEN_BRACKETS = '（(【['
+CLOSE_BRACKETS = '）)]】'
+
+
+def filter_tts_text(text: str) -> str:
+    """过滤掉括号内的内容和星号，返回去除首尾空白后的文本"""
+    filtered_text = BRACKET_PATTERN.sub('', text)
+    filtered_text = ASTERISK_PATTERN.sub('', filtered_text)
+    return filtered_text.strip()
+
+
+def tts_text_hash(filtered_text: str) -> str:
+    """基于过滤后的文本生成哈希（旧版按用户保存的音频文件名使用）"""
+    return hashlib.md5(filtered_text.encode('utf-8')).hexdigest()[:16]
+
+
+def get_safe_email(email: str) -> str:
+    """将邮箱转换为可用作目录名的字符串"""
+    return secure_filename(email.replace('@', '_at_').replace('.', '_'))
+
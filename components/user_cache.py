@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+用户资料缓存
+按用户ID缓存 user_profile 中的资料和角色（不含密码），权限检查和资料接口不再每次查询数据库，
+也不再依赖登录时写入 session 的角色（申请创作者、管理员在数据库管理页面修改角色后会过期）。
+
+    - 缓存 USER_CACHE_TTL 秒，多进程部署时其他进程的修改最多延迟这么久生效
+    - 本进程内所有写 user_profile 的地方修改后调用 invalidate_user_profile()，立即生效
+    - 不存在的用户也会缓存（返回None），避免已删除用户的会话反复查询
+
+用法：
+    role = get_current_role()          # 当前登录用户的角色，未登录为 0
+    user = get_user_profile(user_id)   # {'id', 'username', 'email', 'role', 'created_at'} 或 None
+"""
+import os
+import threading
+import time
+
+from flask import session
+
+from database import get_db_connection
+
+# 缓存时间（秒）
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '60'))
+
+# 缓存的字段（不缓存密码）
+_FIELDS = ('id', 'username', 'email', 'role', 'created_at')
+
+
+class UserProfileCache:
+    """
+    用户资料缓存（线程安全）
+
+    Args:
+        ttl: 缓存时间（秒）
+    """
+
+    def __init__(self, ttl=USER_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        # 每次失效递增；查询数据库期间发生失效时不写入缓存，避免把旧数据放回去
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, user_id):
+        """获取用户资料，不存在时返回None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._stats['hits'] += 1
+                return entry[0]
+            self._stats['misses'] += 1
+            generation = self._generation
+
+        profile = self._load(user_id)
+        with self._lock:
+            if self._generation == generation:
+                self._entries[user_id] = (profile, now + self.ttl)
+        return profile
+
+    def _load(self, user_id):
+        conn = get_db_connection()
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(_FIELDS)} FROM user_profile WHERE id = ?", (user_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return {field: row[field] for field in _FIELDS} if row else None
+
+    def invalidate(self, user_id=None):
+        """使某个用户（默认所有用户）的缓存失效"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+            self._generation += 1
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        stats['ttl'] = self.ttl
+        return stats
+
+
+_cache = UserProfileCache()
+
+
+def get_user_profile(user_id):
+    """
+    获取用户资料（缓存）
+
+    Returns:
+        dict: {'id', 'username', 'email', 'role', 'created_at'}，用户不存在时返回None
+    """
+    if user_id is None:
+        return None
+    return _cache.get(int(user_id))
+
+
+def invalidate_user_profile(user_id=None):
+    """修改 user_profile 后调用，使该用户（默认所有用户）的缓存失效"""
+    _cache.invalidate(int(user_id) if user_id is not None else None)
+
+
+def get_current_user():
+    """当前登录用户的资料，未登录或用户已不存在时返回None"""
+    return get_user_profile(session.get('user_id'))
+
+
+def get_current_role():
+    """当前登录用户的角色（0 普通用户 / 1 创作者 / 2 管理员），未登录或用户已不存在时为 0"""
+    user = get_current_user()
+    return user['role'] if user and user['role'] is not None else 0
+
+
+def get_user_cache_stats():
+    """缓存命中统计"""
+    return _cache.stats()
+
+
+__all__ = [
+    'USER_CACHE_TTL',
+    'UserProfileCache',
+    'get_user_profile',
+    'invalidate_user_profile',
+    'get_current_user',
+    'get_current_role',
+    'get_user_cache_stats'
+]
@@ -46,7 +46,7 @@ def llm_stream(messages, session_id, mode='normal', location=None, email=None):
         生成器，产生流式响应
     """
     agent = get_agent(mode)
-    return agent.stream_response(messages, session_id, location, email)
+    return agent.stream_response_with_tts(messages, session_id, location, email)
 
 
 def llm_stream_normal(messages, session_id, location=None):
@@ -3,8 +3,10 @@
 Agent 基类接口
 定义所有 Agent 必须实现的公共接口
 """
+import json
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional, Generator
+from config.llm.base.settings import TTS_PIPELINE_ENABLED
 
 
 class BaseAgent(ABC):
@@ -69,6 +71,47 @@ class BaseAgent(ABC):
         """
         pass
     
+    def stream_response_with_tts(
+        self,
+        messages: List[Dict[str, Any]],
+        session_id: str,
+        location: Optional[Dict[str, float]] = None,
+        email: Optional[str] = None
+    ) -> Generator[str, None, None]:
+        """
+        流式生成响应，并在开启 TTS_PIPELINE_ENABLED 时挂载语音预合成阶段
+        
+        预合成只读取输出的文本内容，不改变 stream_response 产生的数据。
+        
+        Yields:
+            str: SSE格式的流式响应数据
+        """
+        stream = self.stream_response(messages, session_id, location, email)
+        if not TTS_PIPELINE_ENABLED or not email:
+            yield from stream
+            return
+        
+        from components.tts语音合成.pipeline import TTSPipeline
+        pipeline = TTSPipeline()
+        completed = False
+        try:
+            for item in stream:
+                if not completed and isinstance(item, str) and item.startswith('data: '):
+                    try:
+                        event = json.loads(item[len('data: '):])
+                    except ValueError:
+                        event = None
+                    if isinstance(event, dict) and 'type' not in event:
+                        if event.get('done'):
+                            pipeline.finish()
+                            completed = True
+                        elif event.get('content'):
+                            pipeline.feed(event['content'])
+                yield item
+        finally:
+            if not completed:
+                pipeline.abort()
+    
     @abstractmethod
     def execute_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
         """
@@ -299,6 +299,53 @@ def save_message(email, role, content, session_id=None, current_file=None, tool_
     return current_file
 
 
+def save_command_result(email, command_type, prompt, command_info, session_id=None, current_file=None):
+    """
+    保存指令（/image、/video）的执行结果
+    
+    如果会话中已有该指令的用户消息，则把 command_info 写入最后一条匹配的消息；
+    否则新建一条用户消息。
+    
+    Args:
+        email: 用户邮箱
+        command_type: 指令类型（image/video）
+        prompt: 提示词
+        command_info: 指令调用信息
+        session_id: 会话ID（保留参数以兼容现有代码）
+        current_file: 会话文件名
+    
+    Returns:
+        str: 当前会话文件名
+    """
+    command_prefix = f"/{command_type} {prompt}"
+    
+    if current_file:
+        file_path = _get_user_dir(email) / current_file
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+            if isinstance(history, list):
+                # 找到并更新最后一条匹配的用户消息
+                for msg in reversed(history):
+                    if msg.get("role") == "user" and msg.get("content", "").startswith(command_prefix):
+                        msg["command_info"] = command_info
+                        with open(file_path, 'w', encoding='utf-8') as f:
+                            json.dump(history, f, ensure_ascii=False, indent=2)
+                        return current_file
+        except (json.JSONDecodeError, IOError) as e:
+            print(f'更新历史记录失败: {e}')
+    
+    # 如果没有找到，创建新消息
+    return save_message(
+        email,
+        "user",
+        command_prefix,
+        session_id,
+        current_file,
+        command_info=command_info
+    )
+
+
 def clear_history(email, session_id=None):
     """
     清空历史记录（创建新的会话文件）
@@ -346,6 +393,7 @@ def create_history_file(email):
 __all__ = [
     'get_conversation_history',
     'save_message',
+    'save_command_result',
     'clear_history',
     'create_history_file',
     'set_current_file',
@@ -3,17 +3,29 @@
 豆包图像识别功能封装
 """
 import os
+import threading
 from openai import OpenAI
 from dotenv import load_dotenv
 from typing import Optional, Dict
 
 load_dotenv()
 
-# 初始化OpenAI客户端
-client = OpenAI(
-    base_url="https://ark.cn-beijing.volces.com/api/v3",
-    api_key=os.environ.get("ARK_API_KEY"),
-)
+# OpenAI客户端（首次调用时创建）
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OpenAI:
+    """获取OpenAI客户端（线程安全，只创建一次）"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI(
+                    base_url="https://ark.cn-beijing.volces.com/api/v3",
+                    api_key=os.environ.get("ARK_API_KEY"),
+                )
+    return _client
 
 
 def recognize_image(
@@ -76,7 +88,7 @@ def recognize_image(
     else:
         raise ValueError("必须提供 image_url、image_path 或 image_base64 之一")
     
-    completion = client.chat.completions.create(
+    completion = get_client().chat.completions.create(
         model=model,
         messages=[
             {
@@ -3,55 +3,53 @@
 豆包视频生成功能封装 (Seedance模型)
 """
 import os
+import threading
 import time
-import requests
 from datetime import datetime
 from pathlib import Path
 from tqdm import tqdm
 from dotenv import load_dotenv
 from typing import Optional
-# 通过 pip install 'volcengine-python-sdk[ark]' 安装方舟SDK
-from volcenginesdkarkruntime import Ark
+from components.media import ingest_url
 
 load_dotenv()
 
-# 初始化Ark客户端
-client = Ark(
-    base_url="https://ark.cn-beijing.volces.com/api/v3",
-    api_key=os.environ.get("ARK_API_KEY"),
-)
+# Ark客户端（首次调用时创建，方舟SDK导入较慢，也推迟到首次调用）
+_client = None
+_client_lock = threading.Lock()
 
 
-def generate_video(
+def get_client():
+    """获取Ark客户端（线程安全，只创建一次）"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # 通过 pip install 'volcengine-python-sdk[ark]' 安装方舟SDK
+                from volcenginesdkarkruntime import Ark
+                _client = Ark(
+                    base_url="https://ark.cn-beijing.volces.com/api/v3",
+                    api_key=os.environ.get("ARK_API_KEY"),
+                )
+    return _client
+
+
+def create_video_task(
     prompt: str,
     model: str = "doubao-seedance-1-5-pro-251215",
-    image_url: Optional[str] = None,
-    save_dir: Optional[str] = None,
-    polling_interval: int = 3
+    image_url: Optional[str] = None
 ) -> str:
     """
-    使用Seedance模型生成视频并下载保存
+    创建视频生成任务（立即返回，不等待生成完成）
     
     Args:
         prompt: 视频生成提示词（可包含参数如 --duration 5 --camerafixed false --watermark false）
-        model: 使用的模型ID，默认为 "doubao-seedance-1-5-pro-251215"
+        model: 使用的模型ID
         image_url: 首帧图片URL（可选，用于图片转视频）
-        save_dir: 保存目录路径，如果为None则保存到当前文件所在目录的multi_test/video文件夹
-        polling_interval: 轮询任务状态的间隔时间（秒），默认为3秒
     
     Returns:
-        保存的视频文件路径
+        任务ID
     """
-    # 输出传入参数
-    print("=" * 50)
-    print("调用 generate_video 函数")
-    print(f"参数: prompt={prompt}")
-    print(f"参数: model={model}")
-    print(f"参数: image_url={image_url}")
-    print(f"参数: save_dir={save_dir}")
-    print(f"参数: polling_interval={polling_interval}")
-    print("=" * 50)
-    
     # 构建内容列表
     content = [
         {
@@ -71,84 +69,137 @@ def generate_video(
     
     # 创建视频生成任务
     print("正在创建视频生成任务...")
-    create_result = client.content_generation.tasks.create(
+    create_result = get_client().content_generation.tasks.create(
         model=model,
         content=content
     )
     print(f"任务已创建，任务ID: {create_result.id}")
+    return create_result.id
+
+
+def _extract_video_url(get_result) -> Optional[str]:
+    """从任务查询结果中提取视频URL"""
+    video_url = None
+    if hasattr(get_result, 'content') and get_result.content:
+        if hasattr(get_result.content, 'video_url') and get_result.content.video_url:
+            video_url = get_result.content.video_url
+        elif hasattr(get_result.content, 'url') and get_result.content.url:
+            video_url = get_result.content.url
+    elif hasattr(get_result, 'output') and get_result.output:
+        if isinstance(get_result.output, dict):
+            video_url = get_result.output.get('video_url') or get_result.output.get('url')
+        elif isinstance(get_result.output, str):
+            video_url = get_result.output
+    elif hasattr(get_result, 'video_url'):
+        video_url = get_result.video_url
+    elif hasattr(get_result, 'url'):
+        video_url = get_result.url
+    return video_url
+
+
+def get_video_task(task_id: str) -> dict:
+    """
+    查询一次视频生成任务状态（不等待）
+    
+    Args:
+        task_id: 任务ID
+    
+    Returns:
+        dict: {'status': 任务状态, 'video_url': 成功时的视频URL, 'error': 失败原因}
+    """
+    get_result = get_client().content_generation.tasks.get(task_id=task_id)
+    status = get_result.status
+    result = {'status': status, 'video_url': None, 'error': None}
+    
+    if status == "succeeded":
+        video_url = _extract_video_url(get_result)
+        if not video_url:
+            raise ValueError("未找到视频URL，请检查API响应结构")
+        result['video_url'] = video_url
+    elif status == "failed":
+        result['error'] = getattr(get_result, 'error', '未知错误')
+    return result
+
+
+def download_video(video_url: str, save_dir, prefix: Optional[str] = None) -> str:
+    """
+    下载视频到指定目录（一次流式下载，识别格式后以不冲突的文件名保存）
+    
+    Args:
+        video_url: 视频URL
+        save_dir: 保存目录
+        prefix: 文件名前缀，默认使用当前时间
+    
+    Returns:
+        保存的视频文件路径
+    """
+    if prefix is None:
+        prefix = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    print(f"正在下载视频: {video_url}")
+    with tqdm(unit='B', unit_scale=True, unit_divisor=1024, desc="下载进度") as pbar:
+        def on_progress(written, total):
+            if total and pbar.total != total:
+                pbar.total = total
+            pbar.update(written - pbar.n)
+        
+        file_path = ingest_url(video_url, save_dir, prefix, default_ext='mp4', numbered=False, on_progress=on_progress)
+    
+    print(f"视频已保存到: {file_path}")
+    return str(file_path)
+
+
+def generate_video(
+    prompt: str,
+    model: str = "doubao-seedance-1-5-pro-251215",
+    image_url: Optional[str] = None,
+    save_dir: Optional[str] = None,
+    polling_interval: int = 3
+) -> str:
+    """
+    使用Seedance模型生成视频并下载保存（阻塞直到生成完成，适合脚本使用；
+    Web 接口请使用 create_video_task / get_video_task 配合后台任务）
+    
+    Args:
+        prompt: 视频生成提示词（可包含参数如 --duration 5 --camerafixed false --watermark false）
+        model: 使用的模型ID，默认为 "doubao-seedance-1-5-pro-251215"
+        image_url: 首帧图片URL（可选，用于图片转视频）
+        save_dir: 保存目录路径，如果为None则保存到当前文件所在目录的multi_test/video文件夹
+        polling_interval: 轮询任务状态的间隔时间（秒），默认为3秒
+    
+    Returns:
+        保存的视频文件路径
+    """
+    # 输出传入参数
+    print("=" * 50)
+    print("调用 generate_video 函数")
+    print(f"参数: prompt={prompt}")
+    print(f"参数: model={model}")
+    print(f"参数: image_url={image_url}")
+    print(f"参数: save_dir={save_dir}")
+    print(f"参数: polling_interval={polling_interval}")
+    print("=" * 50)
+    
+    task_id = create_video_task(prompt, model=model, image_url=image_url)
     
     # 轮询查询任务状态
     print("正在轮询任务状态...")
-    task_id = create_result.id
     while True:
-        get_result = client.content_generation.tasks.get(task_id=task_id)
-        status = get_result.status
+        task = get_video_task(task_id)
+        status = task['status']
         
         if status == "succeeded":
             print("任务执行成功")
             
-            # 从响应对象中提取视频URL
-            video_url = None
-            if hasattr(get_result, 'content') and get_result.content:
-                if hasattr(get_result.content, 'video_url') and get_result.content.video_url:
-                    video_url = get_result.content.video_url
-                elif hasattr(get_result.content, 'url') and get_result.content.url:
-                    video_url = get_result.content.url
-            elif hasattr(get_result, 'output') and get_result.output:
-                if isinstance(get_result.output, dict):
-                    video_url = get_result.output.get('video_url') or get_result.output.get('url')
-                elif isinstance(get_result.output, str):
-                    video_url = get_result.output
-            elif hasattr(get_result, 'video_url'):
-                video_url = get_result.video_url
-            elif hasattr(get_result, 'url'):
-                video_url = get_result.url
-            
-            if not video_url:
-                raise ValueError("未找到视频URL，请检查API响应结构")
-            
             # 确定保存目录
             if save_dir:
                 video_dir = Path(save_dir)
             else:
                 video_dir = Path(__file__).parent / "multi_test" / "video"
-            video_dir.mkdir(parents=True, exist_ok=True)
-            
-            # 生成文件名
-            current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{current_time}.mp4"
-            file_path = video_dir / filename
-            
-            # 下载视频
-            print(f"正在下载视频: {video_url}")
-            response = requests.get(video_url, stream=True)
-            response.raise_for_status()
-            
-            # 获取文件总大小（如果可用）
-            total_size = int(response.headers.get('content-length', 0))
-            
-            # 保存视频文件，显示下载进度
-            with open(file_path, 'wb') as f:
-                if total_size > 0:
-                    with tqdm(total=total_size, unit='B', unit_scale=True, unit_divisor=1024, desc="下载进度") as pbar:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
-                                pbar.update(len(chunk))
-                else:
-                    with tqdm(unit='B', unit_scale=True, unit_divisor=1024, desc="下载进度") as pbar:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
-                                pbar.update(len(chunk))
-            
-            print(f"视频已保存到: {file_path}")
-            return str(file_path)
+            return download_video(task['video_url'], video_dir)
             
         elif status == "failed":
-            error_msg = getattr(get_result, 'error', '未知错误')
-            raise RuntimeError(f"任务执行失败: {error_msg}")
+            raise RuntimeError(f"任务执行失败: {task['error']}")
         else:
             print(f"当前状态: {status}，{polling_interval}秒后重试...")
             time.sleep(polling_interval)
-
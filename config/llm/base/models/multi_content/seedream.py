@@ -3,20 +3,62 @@
 豆包图像生成功能封装 (Seedream模型)
 """
 import os
-import requests
+import threading
 from datetime import datetime
 from pathlib import Path
 from openai import OpenAI
 from dotenv import load_dotenv
 from typing import Optional
+from components.media import ingest_url
 
 load_dotenv()
 
-# 初始化OpenAI客户端
-client = OpenAI(
-    base_url="https://ark.cn-beijing.volces.com/api/v3",
-    api_key=os.environ.get("ARK_API_KEY"),
-)
+# OpenAI客户端（首次调用时创建）
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OpenAI:
+    """获取OpenAI客户端（线程安全，只创建一次）"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI(
+                    base_url="https://ark.cn-beijing.volces.com/api/v3",
+                    api_key=os.environ.get("ARK_API_KEY"),
+                )
+    return _client
+
+
+def create_image(
+    prompt: str,
+    size: str = "4K",
+    model: str = "doubao-seedream-4-5-251128",
+    watermark: bool = True
+) -> str:
+    """
+    调用Seedream模型生成图片，返回云端图片URL（不下载）
+    
+    Args:
+        prompt: 图片生成提示词
+        size: 图片尺寸，默认为 "4K"
+        model: 使用的模型ID，默认为 "doubao-seedream-4-5-251128"
+        watermark: 是否添加水印，默认为 True
+    
+    Returns:
+        图片URL
+    """
+    images_response = get_client().images.generate(
+        model=model,
+        prompt=prompt,
+        size=size,
+        response_format="url",
+        extra_body={
+            "watermark": watermark,
+        },
+    )
+    return images_response.data[0].url
 
 
 def generate_image(
@@ -51,18 +93,7 @@ def generate_image(
     
     # 生成图片
     print("正在生成图片...")
-    images_response = client.images.generate(
-        model=model,
-        prompt=prompt,
-        size=size,
-        response_format="url",
-        extra_body={
-            "watermark": watermark,
-        },
-    )
-    
-    # 获取图片URL
-    image_url = images_response.data[0].url
+    image_url = create_image(prompt, size=size, model=model, watermark=watermark)
     print(f"图片生成成功，URL: {image_url}")
     
     # 确定保存目录
@@ -70,24 +101,11 @@ def generate_image(
         photo_dir = Path(save_dir)
     else:
         photo_dir = Path(__file__).parent / "multi_test" / "photo"
-    photo_dir.mkdir(parents=True, exist_ok=True)
     
-    # 生成文件名
-    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{current_time}.jpg"
-    file_path = photo_dir / filename
-    
-    # 下载图片
+    # 下载图片（一次流式下载，根据文件头确定扩展名）
     print(f"正在下载图片: {image_url}")
-    response = requests.get(image_url, stream=True)
-    response.raise_for_status()
-    
-    # 保存图片文件
-    with open(file_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                f.write(chunk)
+    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+    file_path = ingest_url(image_url, photo_dir, current_time, default_ext='jpg', numbered=False)
     
     print(f"图片已保存到: {file_path}")
     return str(file_path)
-
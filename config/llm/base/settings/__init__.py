@@ -43,11 +43,16 @@ DEFAULT_MODE = os.getenv('DEFAULT_MODE', 'normal')
 MAX_HISTORY_LENGTH = int(os.getenv('MAX_HISTORY_LENGTH', '50'))
 TEMPERATURE = float(os.getenv('TEMPERATURE', '0.7'))
 
+# ==================== TTS 预合成配置 ====================
+# 开启后在流式输出的同时按句预合成语音，回复结束时语音基本已就绪
+TTS_PIPELINE_ENABLED = os.getenv('TTS_PIPELINE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
 __all__ = [
     'OPENROUTER_API_KEY', 'OPENROUTER_BASE_URL', 'OPENROUTER_MODEL',
     'DEEPSEEK_API_KEY', 'DEEPSEEK_BASE_URL', 'DEEPSEEK_MODEL',
     'DOUBAO_API_KEY', 'DOUBAO_BASE_URL', 'DOUBAO_MODEL',
     'MINIMAX_API_KEY', 'MINIMAX_BASE_URL', 'MINIMAX_MODEL',
     'GEMINI_API_KEY', 'GEMINI_MODEL',
-    'DEFAULT_MODE', 'MAX_HISTORY_LENGTH', 'TEMPERATURE'
+    'DEFAULT_MODE', 'MAX_HISTORY_LENGTH', 'TEMPERATURE',
+    'TTS_PIPELINE_ENABLED'
 ]
@@ -2,7 +2,7 @@
 """
 数据库模块
 """
-from .db_init import init_database, get_db_connection
-
-__all__ = ['init_database', 'get_db_connection']
+from .db_init import init_database
+from .connection import get_db_connection, transaction, get_db, init_app, get_pool_stats
 
+__all__ = ['init_database', 'get_db_connection', 'transaction', 'get_db', 'init_app', 'get_pool_stats']
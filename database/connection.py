@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+数据库连接管理
+以前每次 get_db_connection() 都新建一个 sqlite3 连接（默认回滚日志、没有忙等待），
+写请求（点赞、打卡识别）会阻塞同时进行的读请求，并发写入直接报 database is locked。
+
+现在连接来自按数据库文件划分的小连接池：
+    - 连接创建时开启 WAL（读写互不阻塞）、synchronous=NORMAL、busy_timeout、
+      foreign_keys=ON，并调大页缓存
+    - conn.close() 把连接归还连接池（未提交的事务会回滚），调用方式保持不变
+    - transaction() 上下文管理器：BEGIN IMMEDIATE 开始写事务，正常退出提交，异常回滚
+    - get_db() 在 Flask 应用上下文中复用同一个连接，init_app() 注册请求结束时的归还
+
+用法：
+    conn = get_db_connection()
+    try:
+        ...
+    finally:
+        conn.close()
+
+    with transaction() as conn:
+        conn.execute('INSERT ...')
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from flask import g
+
+# 忙等待超时（毫秒）：写锁被占用时等待而不是立即报错
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+# 每个连接的页缓存大小（KB）
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '16384'))
+# 每个数据库文件保留的空闲连接数（超出的连接归还时直接关闭）
+SQLITE_POOL_SIZE = int(os.getenv('SQLITE_POOL_SIZE', '8'))
+
+
+def _configure(conn):
+    """新连接的 PRAGMA 设置"""
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f'PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute(f'PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}')
+    conn.execute('PRAGMA temp_store = MEMORY')
+
+
+class PooledConnection:
+    """
+    连接池中的连接
+
+    除 close() 外的属性和方法都转发给 sqlite3.Connection；
+    close() 回滚未提交的事务并把连接归还连接池，重复调用无影响。
+    """
+
+    __slots__ = ('_conn', '_pool')
+
+    def __init__(self, conn, pool):
+        self._conn = conn
+        self._pool = pool
+
+    def __getattr__(self, name):
+        conn = self._conn
+        if conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        if name in PooledConnection.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._conn, name, value)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._conn.__exit__(*exc_info)
+
+    @property
+    def closed(self):
+        return self._conn is None
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+
+class ConnectionPool:
+    """
+    单个数据库文件的连接池（线程安全）
+
+    连接在取出期间只由一个线程使用，归还后可被其他线程复用（check_same_thread=False）。
+
+    Args:
+        path: 数据库文件路径
+        size: 保留的空闲连接数
+    """
+
+    def __init__(self, path, size=SQLITE_POOL_SIZE):
+        self.path = str(path)
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self._stats = {
+            'created': 0,   # 新建的连接数
+            'reused': 0,    # 复用空闲连接的次数
+            'discarded': 0  # 归还时因连接池已满或连接异常而关闭的连接数
+        }
+
+    def acquire(self) -> PooledConnection:
+        """取出一个连接（没有空闲连接时新建）"""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            self._stats['reused' if conn is not None else 'created'] += 1
+        if conn is None:
+            conn = self._connect()
+        return PooledConnection(conn, self)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+        conn.row_factory = sqlite3.Row  # 使查询结果可以通过列名访问
+        _configure(conn)
+        return conn
+
+    def release(self, conn):
+        """归还连接：回滚未提交的事务，连接池已满时关闭"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            conn.close()
+            with self._lock:
+                self._stats['discarded'] += 1
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+            self._stats['discarded'] += 1
+        conn.close()
+
+    def close_all(self):
+        """关闭所有空闲连接（取出中的连接归还时照常处理）"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+        stats['size'] = self.size
+        return stats
+
+
+# 数据库文件路径 -> 连接池
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path) -> ConnectionPool:
+    """获取（或创建）数据库文件对应的连接池"""
+    key = str(Path(path).resolve())
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(key)
+                _pools[key] = pool
+    return pool
+
+
+def close_all_pools():
+    """关闭所有连接池的空闲连接（例如删除或替换数据库文件之前）"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
+
+
+def get_pool_stats():
+    """所有连接池的统计信息"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.path: pool.stats() for pool in pools}
+
+
+def get_db_connection():
+    """
+    获取数据库连接
+
+    Returns:
+        PooledConnection: 用法与 sqlite3.Connection 相同，close() 时归还连接池
+    """
+    # DB_FILE 在调用时读取（基准测试等会临时替换数据库文件）
+    from .db_init import DB_FILE
+    return get_pool(DB_FILE).acquire()
+
+
+@contextmanager
+def transaction(conn=None, immediate=True):
+    """
+    写事务
+
+    Args:
+        conn: 使用已有连接（默认从连接池取出一个，结束后归还）
+        immediate: 以 BEGIN IMMEDIATE 开始，在事务开头就取得写锁，
+            避免先读后写的事务在升级写锁时与其他写事务冲突
+
+    已有连接处于事务中时，以 SAVEPOINT 嵌套，只回滚本段修改。
+    """
+    owned = conn is None
+    if owned:
+        conn = get_db_connection()
+    try:
+        if conn.in_transaction:
+            conn.execute('SAVEPOINT nested_transaction')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK TO nested_transaction')
+                conn.execute('RELEASE nested_transaction')
+                raise
+            conn.execute('RELEASE nested_transaction')
+            return
+
+        conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+    finally:
+        if owned:
+            conn.close()
+
+
+def get_db():
+    """
+    当前 Flask 应用上下文中的数据库连接
+
+    同一个请求内多次调用返回同一个连接，请求结束时由 init_app() 注册的回调归还；
+    不在应用上下文中时抛出 RuntimeError。
+    """
+    conn = g.get('_db_conn')
+    if conn is None or conn.closed:
+        conn = g._db_conn = get_db_connection()
+    return conn
+
+
+def close_db(exc=None):
+    """归还当前应用上下文中的连接"""
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        conn.close()
+
+
+def init_app(app):
+    """在 Flask 应用上注册应用上下文结束时归还连接"""
+    app.teardown_appcontext(close_db)
+
+
+__all__ = [
+    'PooledConnection',
+    'ConnectionPool',
+    'get_pool',
+    'close_all_pools',
+    'get_pool_stats',
+    'get_db_connection',
+    'transaction',
+    'get_db',
+    'close_db',
+    'init_app'
+]
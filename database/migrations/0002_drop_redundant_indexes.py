@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+删除冗余索引
+以下索引的列是同表另一个索引（UNIQUE 约束自带的索引或联合索引）的前缀，
+查询都能用覆盖它的索引，每次写入却要多维护一棵 B 树。
+"""
+
+# 冗余索引 -> 覆盖它的索引
+REDUNDANT_INDEXES = {
+    'idx_username': 'UNIQUE(username)',
+    'idx_email': 'UNIQUE(email)',
+    'idx_album_category_key': 'UNIQUE(category_key)',
+    'idx_album_image_category': 'UNIQUE(category_key, image_path)',
+    'idx_album_permission_user': 'UNIQUE(user_id, category_key, image_path)',
+    'idx_project_likes_user': 'idx_project_likes_user_date(user_id, like_date)',
+    'idx_check_record_user': 'UNIQUE(user_id, check_list_id, check_date)'
+}
+
+
+def upgrade(conn):
+    for index_name in REDUNDANT_INDEXES:
+        conn.execute(f'DROP INDEX IF EXISTS {index_name}')
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+打卡清单按 (user_id, is_active) 建索引
+查询某个用户的有效清单（WHERE user_id = ? AND is_active = 1）时，查询规划器会选用
+只有两种取值的 idx_check_list_active，扫描所有用户的有效清单项，用户越多越慢。
+改为联合索引，并删除被它覆盖的 idx_check_list_user 和区分度过低的 idx_check_list_active。
+"""
+
+
+def upgrade(conn):
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_check_list_user_active ON check_list(user_id, is_active)')
+    conn.execute('DROP INDEX IF EXISTS idx_check_list_user')
+    conn.execute('DROP INDEX IF EXISTS idx_check_list_active')
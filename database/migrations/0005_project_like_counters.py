@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+项目点赞计数表
+点赞总数和每人每日点赞数以前每次都对 project_likes 做 COUNT(*)，点赞越多越慢。
+新增两张计数表，由 project_likes 上的触发器在同一事务中维护（包括删除用户时的级联删除）：
+    - project_like_totals：只有一行（id = 1）的总点赞数
+    - project_like_daily：(user_id, like_date) -> 当日点赞数
+并用现有点赞记录回填。
+"""
+
+
+def upgrade(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS project_like_totals (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS project_like_daily (
+            user_id INTEGER NOT NULL,
+            like_date DATE NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, like_date)
+        ) WITHOUT ROWID
+    ''')
+
+    # 回填
+    conn.execute('''
+        INSERT OR REPLACE INTO project_like_totals (id, total)
+        SELECT 1, COUNT(*) FROM project_likes
+    ''')
+    conn.execute('DELETE FROM project_like_daily')
+    conn.execute('''
+        INSERT INTO project_like_daily (user_id, like_date, count)
+        SELECT user_id, like_date, COUNT(*) FROM project_likes GROUP BY user_id, like_date
+    ''')
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_project_likes_insert AFTER INSERT ON project_likes
+        BEGIN
+            UPDATE project_like_totals SET total = total + 1 WHERE id = 1;
+            INSERT INTO project_like_daily (user_id, like_date, count) VALUES (NEW.user_id, NEW.like_date, 1)
+            ON CONFLICT (user_id, like_date) DO UPDATE SET count = count + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_project_likes_delete AFTER DELETE ON project_likes
+        BEGIN
+            UPDATE project_like_totals SET total = total - 1 WHERE id = 1;
+            UPDATE project_like_daily SET count = count - 1
+            WHERE user_id = OLD.user_id AND like_date = OLD.like_date;
+        END
+    ''')
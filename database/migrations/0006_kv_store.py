@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+短期键值存储
+验证码、发送限流计数等有有效期的数据（components.kv_store 的 SQLite 后端），
+多个工作进程共享；expires_at 索引用于批量删除过期的键。
+"""
+
+
+def upgrade(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS kv_store (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (namespace, key)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_kv_store_expires ON kv_store(expires_at)
+    ''')
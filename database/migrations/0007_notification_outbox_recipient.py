@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""
+通知收件人
+验证码、用户反馈等邮件作为通知投递器的 email 渠道发送，
+notification_outbox 增加收件人字段 recipient（其他渠道为空）。
+"""
+
+
+def upgrade(conn):
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(notification_outbox)')}
+    if 'recipient' not in columns:
+        conn.execute('ALTER TABLE notification_outbox ADD COLUMN recipient TEXT')
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""
+生成任务的执行租约
+worker_id 记录执行任务的工作进程，lease_expires_at 为租约到期时间：
+执行中的任务定期续约，只有租约已过期（进程已退出）的任务才会在启动时放回队列，
+避免另一个进程（例如 Flask 重载时的父子进程）把正在执行的任务重复执行。
+"""
+
+
+def upgrade(conn):
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(generation_jobs)')}
+    if 'worker_id' not in columns:
+        conn.execute('ALTER TABLE generation_jobs ADD COLUMN worker_id TEXT')
+    if 'lease_expires_at' not in columns:
+        conn.execute('ALTER TABLE generation_jobs ADD COLUMN lease_expires_at REAL')
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""
+通知发件箱的发送租约
+worker_id 记录正在发送通知的投递进程，lease_expires_at 为租约到期时间：
+只有租约已过期（投递进程已退出）的发送中通知才会在启动时放回待发送，
+避免另一个进程（例如 Flask 重载时的父子进程）把正在发送的通知重复发送。
+"""
+
+
+def upgrade(conn):
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(notification_outbox)')}
+    if 'worker_id' not in columns:
+        conn.execute('ALTER TABLE notification_outbox ADD COLUMN worker_id TEXT')
+    if 'lease_expires_at' not in columns:
+        conn.execute('ALTER TABLE notification_outbox ADD COLUMN lease_expires_at REAL')
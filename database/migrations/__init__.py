@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+数据库迁移
+表结构的变更按编号写成迁移脚本（本目录下的 NNNN_名称.py，提供 upgrade(conn)），
+已应用的最大编号记录在 schema_version 表中。
+
+启动时只查询一次 schema_version：已是最新版本时直接返回，不再执行建表语句、
+PRAGMA table_info 探测和全表 UPDATE；有未应用的迁移时按编号逐个在事务中执行。
+
+新增表结构变更：在本目录新建下一个编号的脚本，不要修改已发布的迁移。
+"""
+import importlib
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+from ..connection import transaction
+
+# 迁移脚本目录
+MIGRATIONS_DIR = Path(__file__).parent
+# 迁移脚本文件名：0001_initial.py
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    """
+    列出迁移脚本（不导入）
+
+    Returns:
+        list: [(版本号, 模块名)]，按版本号排序
+    """
+    migrations = []
+    for path in Path(directory).iterdir():
+        match = MIGRATION_FILE_PATTERN.match(path.name)
+        if match:
+            migrations.append((int(match.group(1)), path.stem))
+    migrations.sort()
+    versions = [version for version, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f'迁移脚本版本号重复: {versions}')
+    return migrations
+
+
+# 模块导入时确定迁移列表，启动时不再重复列目录
+MIGRATIONS = discover_migrations()
+LATEST_VERSION = MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def current_version(conn):
+    """数据库当前的表结构版本（没有 schema_version 表时为 0）"""
+    try:
+        row = conn.execute('SELECT MAX(version) AS version FROM schema_version').fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row['version'] or 0
+
+
+def _load(module_name):
+    return importlib.import_module(f'{__name__}.{module_name}')
+
+
+def migrate(conn, migrations=None):
+    """
+    应用未执行的迁移
+
+    每个迁移在单独的写事务中执行，并在事务内重新确认版本，
+    多个进程同时启动时同一个迁移只会执行一次。
+
+    Returns:
+        list: 本次应用的迁移 [(版本号, 模块名)]
+    """
+    migrations = MIGRATIONS if migrations is None else migrations
+    latest = migrations[-1][0] if migrations else 0
+    # 快速路径：已是最新版本时只有这一次查询
+    if current_version(conn) >= latest:
+        return []
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at REAL NOT NULL
+        )
+    ''')
+    conn.commit()
+
+    applied = []
+    for version, module_name in migrations:
+        with transaction(conn):
+            if current_version(conn) >= version:
+                continue
+            _load(module_name).upgrade(conn)
+            conn.execute('''
+                INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)
+            ''', (version, module_name, time.time()))
+        applied.append((version, module_name))
+        print(f"🗃️  [数据库迁移] 已应用 {module_name}")
+    return applied
+
+
+def _index_columns(conn, index_name):
+    return tuple(row['name'] for row in conn.execute(f'PRAGMA index_info("{index_name}")'))
+
+
+def find_redundant_indexes(conn):
+    """
+    查找冗余索引：手动创建的普通索引，其列是同表另一个索引的前缀
+
+    例如 UNIQUE(username) 约束自带索引时，idx_username(username) 是冗余的；
+    有 (user_id, like_date) 索引时，(user_id) 索引也是冗余的。
+    只报告 CREATE INDEX 创建的非唯一、非部分索引（约束自带的索引无法删除）。
+
+    Returns:
+        list: [(索引名, 表名, 覆盖它的索引名)]
+    """
+    redundant = []
+    tables = [row['name'] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    )]
+    for table in tables:
+        indexes = []
+        for row in conn.execute(f'PRAGMA index_list("{table}")'):
+            indexes.append({
+                'name': row['name'],
+                'unique': bool(row['unique']),
+                'origin': row['origin'],
+                'partial': bool(row['partial']),
+                'columns': _index_columns(conn, row['name'])
+            })
+        for index in indexes:
+            if index['origin'] != 'c' or index['unique'] or index['partial'] or None in index['columns']:
+                continue
+            for other in indexes:
+                if other is index or other['partial']:
+                    continue
+                columns = index['columns']
+                if other['columns'][:len(columns)] != columns:
+                    continue
+                # 列完全相同的两个手动索引只报告其中一个
+                if other['columns'] == columns and other['origin'] == 'c' and not other['unique'] \
+                        and other['name'] > index['name']:
+                    continue
+                redundant.append((index['name'], table, other['name']))
+                break
+    return redundant
+
+
+__all__ = [
+    'MIGRATIONS',
+    'LATEST_VERSION',
+    'discover_migrations',
+    'current_version',
+    'migrate',
+    'find_redundant_indexes'
+]
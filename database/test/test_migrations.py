@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+数据库迁移测试
+从引入迁移之前的表结构（init_database() 直接建表的版本，带历史数据）升级到最新版本：
+    - 版本号为 LATEST_VERSION，表结构与新建的数据库一致
+    - 数据修正和回填：role = 9 改为 2，点赞计数表按已有点赞记录回填
+    - 冗余索引已删除
+    - 邮件使用通知发件箱（recipient 字段），没有单独的邮件发件箱表
+    - 再次执行迁移不做任何事
+"""
+import sqlite3
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database import db_init, get_db_connection
+from database.migrations import LATEST_VERSION, current_version, find_redundant_indexes, migrate
+
+# 引入迁移之前 init_database() 创建的表结构
+BASELINE_SCHEMA = '''
+CREATE TABLE user_profile (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL,
+    email TEXT NOT NULL UNIQUE,
+    role INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_username ON user_profile(username);
+CREATE INDEX idx_email ON user_profile(email);
+
+CREATE TABLE album_category_config (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    category_key TEXT NOT NULL UNIQUE,
+    display_name TEXT NOT NULL,
+    is_visible INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE album_image_config (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    category_key TEXT NOT NULL,
+    image_path TEXT NOT NULL,
+    display_name TEXT,
+    is_visible INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(category_key, image_path)
+);
+CREATE TABLE album_user_permission (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    category_key TEXT NOT NULL,
+    image_path TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES user_profile(id) ON DELETE CASCADE,
+    UNIQUE(user_id, category_key, image_path)
+);
+CREATE INDEX idx_album_category_key ON album_category_config(category_key);
+CREATE INDEX idx_album_image_category ON album_image_config(category_key);
+CREATE INDEX idx_album_image_path ON album_image_config(image_path);
+CREATE INDEX idx_album_permission_user ON album_user_permission(user_id);
+CREATE INDEX idx_album_permission_category ON album_user_permission(category_key);
+CREATE INDEX idx_album_category_visible ON album_category_config(is_visible);
+CREATE INDEX idx_album_image_visible ON album_image_config(is_visible);
+
+CREATE TABLE project_likes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    like_date DATE NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES user_profile(id) ON DELETE CASCADE
+);
+CREATE INDEX idx_project_likes_user ON project_likes(user_id);
+CREATE INDEX idx_project_likes_date ON project_likes(like_date);
+CREATE INDEX idx_project_likes_user_date ON project_likes(user_id, like_date);
+
+CREATE TABLE check_list (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    app_name TEXT NOT NULL,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES user_profile(id) ON DELETE CASCADE
+);
+CREATE TABLE check_record (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    check_list_id INTEGER NOT NULL,
+    check_date DATE NOT NULL,
+    check_status TEXT NOT NULL DEFAULT 'pending',
+    app_name TEXT,
+    check_in_date TEXT,
+    details TEXT,
+    confidence TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES user_profile(id) ON DELETE CASCADE,
+    FOREIGN KEY (check_list_id) REFERENCES check_list(id) ON DELETE CASCADE,
+    UNIQUE(user_id, check_list_id, check_date)
+);
+CREATE INDEX idx_check_list_user ON check_list(user_id);
+CREATE INDEX idx_check_list_active ON check_list(is_active);
+CREATE INDEX idx_check_record_user ON check_record(user_id);
+CREATE INDEX idx_check_record_list ON check_record(check_list_id);
+CREATE INDEX idx_check_record_date ON check_record(check_date);
+CREATE INDEX idx_check_record_user_date ON check_record(user_id, check_date);
+'''
+
+# 历史数据
+BASELINE_DATA = '''
+INSERT INTO user_profile (id, username, password, email, role) VALUES
+    (1, 'admin', 'x', 'admin@example.com', 9),
+    (2, 'alice', 'x', 'alice@example.com', 0),
+    (3, 'bob', 'x', 'bob@example.com', 1);
+INSERT INTO album_category_config (category_key, display_name, is_visible) VALUES
+    ('anime', '动漫', 1), ('photo', '照片', 1), ('wallpaper', '壁纸', 1), ('scene', '场景', 1);
+INSERT INTO project_likes (user_id, like_date) VALUES
+    (2, '2026-01-01'), (2, '2026-01-01'), (2, '2026-01-02'), (3, '2026-01-01');
+INSERT INTO check_list (id, user_id, app_name, is_active) VALUES (1, 2, '米游社', 1), (2, 2, '旧应用', 0);
+INSERT INTO check_record (user_id, check_list_id, check_date, check_status) VALUES (2, 1, '2026-01-01', 'success');
+'''
+
+
+@contextmanager
+def temp_database(name='app.db'):
+    """临时数据库文件"""
+    with tempfile.TemporaryDirectory() as workdir:
+        db_file = Path(workdir) / name
+        with mock.patch.object(db_init, 'DB_FILE', db_file):
+            yield db_file
+
+
+def create_baseline(db_file):
+    conn = sqlite3.connect(db_file)
+    try:
+        conn.executescript(BASELINE_SCHEMA)
+        conn.executescript(BASELINE_DATA)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def schema_of(conn):
+    """表、索引、触发器及各表的字段（用于比较两个数据库的表结构）"""
+    objects = {}
+    for row in conn.execute("SELECT type, name, tbl_name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"):
+        columns = None
+        if row['type'] == 'table':
+            columns = tuple(
+                (col['name'], col['type'], col['notnull'], col['pk'])
+                for col in conn.execute(f'PRAGMA table_info("{row["name"]}")')
+            )
+        objects[(row['type'], row['name'])] = (row['tbl_name'], columns)
+    return objects
+
+
+def test_upgrade_from_baseline():
+    """旧数据库升级到最新版本"""
+    with temp_database() as db_file:
+        create_baseline(db_file)
+        db_init.init_database()
+
+        conn = get_db_connection()
+        try:
+            assert current_version(conn) == LATEST_VERSION
+
+            # role = 9 改为 2，其他角色不变
+            roles = dict(conn.execute('SELECT username, role FROM user_profile').fetchall())
+            assert roles == {'admin': 2, 'alice': 0, 'bob': 1}
+
+            # 点赞计数回填
+            assert conn.execute('SELECT total FROM project_like_totals WHERE id = 1').fetchone()[0] == 4
+            daily = {(row['user_id'], row['like_date']): row['count']
+                     for row in conn.execute('SELECT * FROM project_like_daily')}
+            assert daily == {(2, '2026-01-01'): 2, (2, '2026-01-02'): 1, (3, '2026-01-01'): 1}
+
+            # 原有数据保留
+            assert conn.execute('SELECT COUNT(*) FROM check_record').fetchone()[0] == 1
+            assert conn.execute('SELECT COUNT(*) FROM album_category_config').fetchone()[0] == 4
+
+            # 冗余索引已删除
+            assert find_redundant_indexes(conn) == []
+            indexes = {row['name'] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            assert not indexes & {'idx_username', 'idx_email', 'idx_check_list_active', 'idx_project_likes_user'}
+            assert 'idx_check_list_user_active' in indexes
+
+            # 邮件通过通知发件箱发送
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(notification_outbox)')}
+            assert {'recipient', 'worker_id', 'lease_expires_at'} <= columns
+            tables = {row['name'] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            assert 'email_outbox' not in tables
+
+            # 触发器维护计数
+            conn.execute("INSERT INTO project_likes (user_id, like_date) VALUES (3, '2026-01-02')")
+            conn.commit()
+            assert conn.execute('SELECT total FROM project_like_totals WHERE id = 1').fetchone()[0] == 5
+
+            upgraded = schema_of(conn)
+        finally:
+            conn.close()
+
+    # 与新建的数据库表结构一致
+    with temp_database('fresh.db'):
+        db_init.init_database()
+        conn = get_db_connection()
+        try:
+            fresh = schema_of(conn)
+        finally:
+            conn.close()
+    assert upgraded == fresh
+
+
+def test_migrate_is_noop_when_latest():
+    """已是最新版本时再次执行迁移不做任何事"""
+    with temp_database() as db_file:
+        create_baseline(db_file)
+        db_init.init_database()
+
+        conn = get_db_connection()
+        try:
+            before = schema_of(conn)
+            versions = conn.execute('SELECT COUNT(*) FROM schema_version').fetchone()[0]
+            assert migrate(conn) == []
+            assert schema_of(conn) == before
+            assert conn.execute('SELECT COUNT(*) FROM schema_version').fetchone()[0] == versions
+            assert conn.execute('SELECT total FROM project_like_totals WHERE id = 1').fetchone()[0] == 4
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    test_upgrade_from_baseline()
+    test_migrate_is_noop_when_latest()
+    print("✅ 数据库迁移测试通过")
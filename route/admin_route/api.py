@@ -4,10 +4,15 @@
 """
 import ast
 import os
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, jsonify, session, stream_with_context
 from pathlib import Path
 from database import get_db_connection
+from components.user_cache import get_current_role, invalidate_user_profile
+from components.project_likes import clear_total_cache
 from route.album_route.utils import CATEGORY_MAP, get_base_dir
+from .db_browser import (
+    MAX_PER_PAGE, is_valid_table_name, get_table_info, get_row_count, adjust_row_count, fetch_page, iter_export
+)
 
 admin_api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -17,7 +22,8 @@ def check_admin_api():
     if 'user_id' not in session:
         return jsonify({'success': False, 'message': '未登录'}), 401
     
-    if session.get('role') != 2:
+    # 角色从用户资料缓存读取（session 中的角色在修改后会过期）
+    if get_current_role() != 2:
         return jsonify({'success': False, 'message': '无权限访问'}), 403
     
     return None
@@ -141,87 +147,123 @@ def get_table_schema(table_name):
         return result
     
     # 验证表名（只允许字母、数字、下划线）
-    if not all(c.isalnum() or c == '_' for c in table_name):
+    if not is_valid_table_name(table_name):
         return jsonify({'success': False, 'message': '无效的表名'}), 400
     
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # 获取表结构（PRAGMA不支持参数化，但我们已经验证了表名）
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = []
-        for row in cursor.fetchall():
-            columns.append({
-                'cid': row[0],
-                'name': row[1],
-                'type': row[2],
-                'notnull': bool(row[3]),
-                'default_value': row[4],
-                'pk': bool(row[5])
-            })
+        try:
+            info = get_table_info(conn, table_name)
+        finally:
+            conn.close()
         
-        conn.close()
+        if info is None:
+            return jsonify({'success': False, 'message': '表不存在'}), 404
         
-        return jsonify({'success': True, 'columns': columns})
+        return jsonify({'success': True, 'columns': info['columns']})
     except Exception as e:
         return jsonify({'success': False, 'message': f'获取表结构失败: {str(e)}'}), 500
 
 
+def _optional_int(name):
+    value = request.args.get(name)
+    return int(value) if value not in (None, '') else None
+
+
 @admin_api_bp.route('/database/table/<table_name>/data', methods=['GET'])
 def get_table_data(table_name):
-    """获取表数据（分页）"""
+    """
+    获取表数据（分页）
+    
+    参数：per_page；after / before（rowid 游标，下一页 / 上一页）、last=1（最后一页），
+    不带游标时按 page 读取。total 为缓存的行数，total_approximate 表示缓存已过期、正在后台重新统计。
+    """
     result = check_admin_api()
     if result:
         return result
     
     # 验证表名（只允许字母、数字、下划线）
-    if not all(c.isalnum() or c == '_' for c in table_name):
+    if not is_valid_table_name(table_name):
         return jsonify({'success': False, 'message': '无效的表名'}), 400
     
     try:
         page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
-        offset = (page - 1) * per_page
-        
+        per_page = min(max(int(request.args.get('per_page', 20)), 1), MAX_PER_PAGE)
+        after = _optional_int('after')
+        before = _optional_int('before')
+        last = request.args.get('last') == '1'
+    except ValueError:
+        return jsonify({'success': False, 'message': '无效的分页参数'}), 400
+    
+    try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # 获取总数
-        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-        total = cursor.fetchone()[0]
-        
-        # 获取分页数据
-        cursor.execute(f"SELECT * FROM {table_name} LIMIT ? OFFSET ?", (per_page, offset))
-        rows = []
-        from tools.time_tools import convert_row_datetime_fields
-        for row in cursor.fetchall():
-            row_dict = {}
-            for key in row.keys():
-                row_dict[key] = row[key]
-            # 转换时间字段从UTC到本地时间（UTC+8）
-            row_dict = convert_row_datetime_fields(row_dict)
-            rows.append(row_dict)
-        
-        # 获取列名
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = [row[1] for row in cursor.fetchall()]
+        try:
+            info = get_table_info(conn, table_name)
+            if info is None:
+                return jsonify({'success': False, 'message': '表不存在'}), 404
+            
+            total, approximate = get_row_count(conn, table_name)
+            page_data = fetch_page(conn, table_name, info, per_page, after=after, before=before, last=last, page=page)
+        finally:
+            conn.close()
         
-        conn.close()
+        total_pages = max(1, (total + per_page - 1) // per_page)
+        if last:
+            page = total_pages
         
         return jsonify({
             'success': True,
-            'data': rows,
-            'columns': columns,
+            'data': page_data['rows'],
+            'columns': info['column_names'],
             'total': total,
+            'total_approximate': approximate,
             'page': page,
             'per_page': per_page,
-            'total_pages': (total + per_page - 1) // per_page
+            'total_pages': total_pages,
+            'next_cursor': page_data['next_cursor'],
+            'prev_cursor': page_data['prev_cursor'],
+            'has_next': page_data['has_next'],
+            'has_prev': page_data['has_prev']
         })
     except Exception as e:
         return jsonify({'success': False, 'message': f'获取数据失败: {str(e)}'}), 500
 
 
+@admin_api_bp.route('/database/table/<table_name>/export', methods=['GET'])
+def export_table(table_name):
+    """导出整张表（format=csv 或 ndjson），边读边输出"""
+    result = check_admin_api()
+    if result:
+        return result
+    
+    # 验证表名（只允许字母、数字、下划线）
+    if not is_valid_table_name(table_name):
+        return jsonify({'success': False, 'message': '无效的表名'}), 400
+    
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'success': False, 'message': '导出格式只支持 csv 或 ndjson'}), 400
+    
+    try:
+        conn = get_db_connection()
+        try:
+            info = get_table_info(conn, table_name)
+        finally:
+            conn.close()
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'导出失败: {str(e)}'}), 500
+    
+    if info is None:
+        return jsonify({'success': False, 'message': '表不存在'}), 404
+    
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(iter_export(table_name, info, fmt)),
+        mimetype=f'{mimetype}; charset=utf-8',
+        headers={'Content-Disposition': f'attachment; filename={table_name}.{fmt}'}
+    )
+
+
 @admin_api_bp.route('/database/table/<table_name>/row', methods=['POST'])
 def create_row(table_name):
     """创建新行"""
@@ -230,7 +272,7 @@ def create_row(table_name):
         return result
     
     # 验证表名（只允许字母、数字、下划线）
-    if not all(c.isalnum() or c == '_' for c in table_name):
+    if not is_valid_table_name(table_name):
         return jsonify({'success': False, 'message': '无效的表名'}), 400
     
     try:
@@ -238,10 +280,12 @@ def create_row(table_name):
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # 获取列名（PRAGMA不支持参数化，但我们已经验证了表名）
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        column_info = cursor.fetchall()
-        columns = [row[1] for row in column_info if not row[5]]  # 排除主键
+        # 获取列名（表结构缓存）
+        info = get_table_info(conn, table_name)
+        if info is None:
+            conn.close()
+            return jsonify({'success': False, 'message': '表不存在'}), 404
+        columns = [column['name'] for column in info['columns'] if not column['pk']]  # 排除主键
         
         # 构建插入语句
         values = []
@@ -262,6 +306,12 @@ def create_row(table_name):
         conn.commit()
         row_id = cursor.lastrowid
         conn.close()
+        adjust_row_count(table_name, 1)
+        if table_name == 'user_profile':
+            invalidate_user_profile(row_id)
+        if table_name in ('project_likes', 'project_like_totals'):
+            # 直接修改点赞记录后总数缓存立即失效
+            clear_total_cache()
         
         return jsonify({'success': True, 'message': '创建成功', 'id': row_id})
     except Exception as e:
@@ -276,7 +326,7 @@ def update_row(table_name):
         return result
     
     # 验证表名（只允许字母、数字、下划线）
-    if not all(c.isalnum() or c == '_' for c in table_name):
+    if not is_valid_table_name(table_name):
         return jsonify({'success': False, 'message': '无效的表名'}), 400
     
     try:
@@ -289,13 +339,9 @@ def update_row(table_name):
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # 获取主键列名（PRAGMA不支持参数化，但我们已经验证了表名）
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        pk_column = None
-        for row in cursor.fetchall():
-            if row[5]:  # pk
-                pk_column = row[1]
-                break
+        # 获取主键列名（表结构缓存）
+        info = get_table_info(conn, table_name)
+        pk_column = info['pk_column'] if info else None
         
         if not pk_column:
             conn.close()
@@ -319,6 +365,11 @@ def update_row(table_name):
         cursor.execute(sql, values)
         conn.commit()
         conn.close()
+        if table_name == 'user_profile':
+            # 修改角色等资料后立即生效
+            invalidate_user_profile(row_id)
+        if table_name in ('project_likes', 'project_like_totals'):
+            clear_total_cache()
         
         return jsonify({'success': True, 'message': '更新成功'})
     except Exception as e:
@@ -333,7 +384,7 @@ def delete_row(table_name):
         return result
     
     # 验证表名（只允许字母、数字、下划线）
-    if not all(c.isalnum() or c == '_' for c in table_name):
+    if not is_valid_table_name(table_name):
         return jsonify({'success': False, 'message': '无效的表名'}), 400
     
     try:
@@ -346,13 +397,9 @@ def delete_row(table_name):
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # 获取主键列名（PRAGMA不支持参数化，但我们已经验证了表名）
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        pk_column = None
-        for row in cursor.fetchall():
-            if row[5]:  # pk
-                pk_column = row[1]
-                break
+        # 获取主键列名（表结构缓存）
+        info = get_table_info(conn, table_name)
+        pk_column = info['pk_column'] if info else None
         
         if not pk_column:
             conn.close()
@@ -361,8 +408,14 @@ def delete_row(table_name):
         # 注意：表名和列名不能参数化，但我们已经验证了表名，列名来自数据库元数据
         sql = f"DELETE FROM {table_name} WHERE {pk_column} = ?"
         cursor.execute(sql, (row_id,))
+        deleted = cursor.rowcount
         conn.commit()
         conn.close()
+        adjust_row_count(table_name, -deleted)
+        if table_name == 'user_profile':
+            invalidate_user_profile(row_id)
+        if table_name in ('project_likes', 'project_like_totals'):
+            clear_total_cache()
         
         return jsonify({'success': True, 'message': '删除成功'})
     except Exception as e:
@@ -438,4 +491,135 @@ def set_agent_status_admin():
             'status': '在线' if current_status else '离线'
         })
     except Exception as e:
-        return jsonify({'success': False, 'message': f'设置状态失败: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'message': f'设置状态失败: {str(e)}'}), 500
+
+# ==================== 运行指标API ====================
+
+@admin_api_bp.route('/metrics/single-flight', methods=['GET'])
+def get_single_flight_metrics():
+    """获取请求合并（single-flight）统计（管理员）"""
+    result = check_admin_api()
+    if result:
+        return result
+    
+    try:
+        from components.single_flight import get_single_flight_stats
+        
+        return jsonify({
+            'success': True,
+            'groups': get_single_flight_stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取统计失败: {str(e)}'}), 500
+
+
+@admin_api_bp.route('/metrics/jobs', methods=['GET'])
+def get_job_metrics():
+    """获取后台生成任务队列统计：排队深度、等待时间、并发与配额（管理员）"""
+    result = check_admin_api()
+    if result:
+        return result
+    
+    try:
+        from components.jobs import get_job_queue
+        
+        return jsonify({
+            'success': True,
+            'queue': get_job_queue().stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取统计失败: {str(e)}'}), 500
+
+
+@admin_api_bp.route('/metrics/db-pool', methods=['GET'])
+def get_db_pool_metrics():
+    """获取数据库连接池统计：新建/复用/丢弃的连接数和空闲连接数（管理员）"""
+    result = check_admin_api()
+    if result:
+        return result
+    
+    try:
+        from database import get_pool_stats
+        
+        return jsonify({
+            'success': True,
+            'pools': get_pool_stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取统计失败: {str(e)}'}), 500
+
+
+@admin_api_bp.route('/metrics/notifications', methods=['GET'])
+def get_notification_metrics():
+    """获取通知投递统计：待发送数量、投递延迟、发送耗时和重试/失败计数（管理员）"""
+    result = check_admin_api()
+    if result:
+        return result
+    
+    try:
+        from components.notify import get_dispatcher
+        
+        return jsonify({
+            'success': True,
+            'notifications': get_dispatcher().stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取统计失败: {str(e)}'}), 500
+
+
+@admin_api_bp.route('/metrics/user-cache', methods=['GET'])
+def get_user_cache_metrics():
+    """获取用户资料缓存的命中统计（管理员）"""
+    result = check_admin_api()
+    if result:
+        return result
+    
+    try:
+        from components.user_cache import get_user_cache_stats
+        
+        return jsonify({
+            'success': True,
+            'cache': get_user_cache_stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取统计失败: {str(e)}'}), 500
+
+
+@admin_api_bp.route('/metrics/kv-store', methods=['GET'])
+def get_kv_store_metrics():
+    """获取短期键值存储的键数和过期清理统计（管理员）"""
+    result = check_admin_api()
+    if result:
+        return result
+    
+    try:
+        from components.kv_store import get_kv_store_stats
+        
+        return jsonify({
+            'success': True,
+            'stores': get_kv_store_stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取统计失败: {str(e)}'}), 500
+
+
+@admin_api_bp.route('/metrics/vision-cache', methods=['GET'])
+def get_vision_cache_metrics():
+    """获取图片识别结果缓存的命中统计（管理员）"""
+    result = check_admin_api()
+    if result:
+        return result
+    
+    try:
+        from components.media import get_vision_cache, get_vision_cache_stats
+        from components.media.vision_cache import NEAR_DISTANCES
+        
+        # 确保未使用过的识别类型也出现在统计中
+        for kind in NEAR_DISTANCES:
+            get_vision_cache(kind)
+        return jsonify({
+            'success': True,
+            'caches': get_vision_cache_stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取统计失败: {str(e)}'}), 500
@@ -6,7 +6,9 @@ import os
 from flask import Blueprint, request, jsonify, session
 from pathlib import Path
 from database import get_db_connection
+from components.user_cache import get_current_role
 from route.album_route.utils import CATEGORY_MAP, get_base_dir, ALLOWED_EXTENSIONS
+from route.album_route.index import get_category_index
 
 content_api_bp = Blueprint('content_api', __name__, url_prefix='/api/content')
 
@@ -16,7 +18,8 @@ def check_admin_api():
     if 'user_id' not in session:
         return jsonify({'success': False, 'message': '未登录'}), 401
     
-    if session.get('role') != 2:
+    # 角色从用户资料缓存读取（session 中的角色在修改后会过期）
+    if get_current_role() != 2:
         return jsonify({'success': False, 'message': '无权限访问'}), 403
     
     return None
@@ -242,6 +245,7 @@ def rename_image(category_key):
         
         # 更新数据库中的路径
         new_rel_path = os.path.relpath(new_file, base_dir).replace('\\', '/')
+        get_category_index(category_key, base_dir).rename(old_path, new_rel_path)
         conn = get_db_connection()
         cursor = conn.cursor()
         
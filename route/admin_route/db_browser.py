@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+数据库管理页面的查询
+以前每翻一页都执行 COUNT(*)、LIMIT/OFFSET 和 PRAGMA table_info，越往后翻越慢。现在：
+    - 表结构按表缓存，PRAGMA schema_version 变化（建表、改表）时重新读取
+    - 行数缓存 COUNT_CACHE_TTL 秒，过期后先返回旧值并在后台线程重新统计；
+      管理页面增删行时同步调整缓存
+    - 有 rowid 的表按 rowid 键集分页（after/before 游标），翻到第几页耗时都一样；
+      WITHOUT ROWID 表和直接跳页时仍使用 OFFSET
+    - 导出按批次读取并逐行生成 CSV / NDJSON，不在内存中组装整张表
+"""
+import csv
+import io
+import json
+import threading
+import time
+
+from database import db_init, get_db_connection
+from database.connection import get_pool
+from tools.time_tools import convert_utc_to_local, is_datetime_field
+
+# 行数缓存时间（秒）
+COUNT_CACHE_TTL = 60
+# 每页最多行数
+MAX_PER_PAGE = 500
+# 导出时每批读取的行数
+EXPORT_BATCH_SIZE = 1000
+# 查询结果中 rowid 的别名（不与表的列名冲突）
+ROWID_ALIAS = '_browser_rowid'
+
+# (数据库文件, 表名) -> 表结构
+_table_info = {}
+# 数据库文件 -> 表结构缓存对应的 schema_version
+_schema_versions = {}
+# (数据库文件, 表名) -> [行数, 统计时间]
+_row_counts = {}
+# 正在后台统计行数的 (数据库文件, 表名)
+_refreshing = set()
+_lock = threading.Lock()
+
+
+def is_valid_table_name(table_name):
+    """表名只允许字母、数字、下划线"""
+    return bool(table_name) and all(c.isalnum() or c == '_' for c in table_name)
+
+
+def _db_key():
+    return str(db_init.DB_FILE)
+
+
+def _load_table_info(conn, table_name):
+    columns = []
+    for row in conn.execute(f"PRAGMA table_info({table_name})"):
+        columns.append({
+            'cid': row[0],
+            'name': row[1],
+            'type': row[2],
+            'notnull': bool(row[3]),
+            'default_value': row[4],
+            'pk': bool(row[5])
+        })
+    if not columns:
+        return None
+
+    try:
+        conn.execute(f"SELECT rowid FROM {table_name} LIMIT 0")
+        has_rowid = True
+    except Exception:
+        # WITHOUT ROWID 表
+        has_rowid = False
+
+    return {
+        'columns': columns,
+        'column_names': [column['name'] for column in columns],
+        'pk_column': next((column['name'] for column in columns if column['pk']), None),
+        'has_rowid': has_rowid,
+        # 时间字段（显示时从UTC转换为本地时间）
+        'datetime_columns': [column['name'] for column in columns if is_datetime_field(column['name'])]
+    }
+
+
+def get_table_info(conn, table_name):
+    """
+    表结构（缓存）
+
+    Returns:
+        dict: {'columns', 'column_names', 'pk_column', 'has_rowid', 'datetime_columns'}，表不存在时返回None
+    """
+    db_key = _db_key()
+    schema_version = conn.execute('PRAGMA schema_version').fetchone()[0]
+    with _lock:
+        if _schema_versions.get(db_key) != schema_version:
+            # 表结构有变化，清空这个数据库的缓存
+            for key in [key for key in _table_info if key[0] == db_key]:
+                del _table_info[key]
+            _schema_versions[db_key] = schema_version
+        info = _table_info.get((db_key, table_name))
+    if info is None:
+        info = _load_table_info(conn, table_name)
+        if info is not None:
+            with _lock:
+                if _schema_versions.get(db_key) == schema_version:
+                    _table_info[(db_key, table_name)] = info
+    return info
+
+
+def _refresh_count(db_file, table_name):
+    """后台重新统计行数"""
+    key = (str(db_file), table_name)
+    try:
+        conn = get_pool(db_file).acquire()
+        try:
+            count = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+        finally:
+            conn.close()
+        with _lock:
+            _row_counts[key] = [count, time.time()]
+    except Exception as e:
+        print(f"⚠️  [数据库管理] 统计表 {table_name} 行数失败: {e}")
+    finally:
+        with _lock:
+            _refreshing.discard(key)
+
+
+def get_row_count(conn, table_name):
+    """
+    表的行数（缓存）
+
+    第一次查询时同步统计；缓存过期后先返回旧值，并在后台线程重新统计。
+
+    Returns:
+        tuple: (行数, 是否为过期的近似值)
+    """
+    db_key = _db_key()
+    key = (db_key, table_name)
+    with _lock:
+        cached = _row_counts.get(key)
+        stale = cached is not None and time.time() - cached[1] > COUNT_CACHE_TTL
+        start_refresh = stale and key not in _refreshing
+        if start_refresh:
+            _refreshing.add(key)
+    if cached is None:
+        count = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+        with _lock:
+            _row_counts[key] = [count, time.time()]
+        return count, False
+    if start_refresh:
+        # 在这里确定数据库文件，后台线程不再读取 DB_FILE
+        threading.Thread(target=_refresh_count, args=(db_init.DB_FILE, table_name), daemon=True).start()
+    return cached[0], stale
+
+
+def adjust_row_count(table_name, delta):
+    """管理页面增删行后调整缓存的行数"""
+    with _lock:
+        cached = _row_counts.get((_db_key(), table_name))
+        if cached is not None:
+            cached[0] = max(0, cached[0] + delta)
+
+
+def _convert_row(row, info):
+    row_dict = dict(row)
+    # 只转换时间字段（UTC -> 本地时间），不再逐行判断每个字段名
+    for name in info['datetime_columns']:
+        value = row_dict.get(name)
+        if isinstance(value, str):
+            row_dict[name] = convert_utc_to_local(value)
+    return row_dict
+
+
+def fetch_page(conn, table_name, info, per_page, after=None, before=None, last=False, page=None):
+    """
+    读取一页数据
+
+    Args:
+        after: 返回 rowid 大于该值的下一页
+        before: 返回 rowid 小于该值的上一页
+        last: 返回最后一页
+        page: 不使用游标时按页码（OFFSET）读取
+
+    Returns:
+        dict: {'rows', 'next_cursor', 'prev_cursor', 'has_next', 'has_prev'}
+    """
+    if info['has_rowid'] and (after is not None or before is not None or last or not page or page <= 1):
+        select = f"SELECT rowid AS {ROWID_ALIAS}, * FROM {table_name}"
+        # 多取一行判断该方向上是否还有数据
+        if after is not None:
+            rows = conn.execute(f"{select} WHERE rowid > ? ORDER BY rowid LIMIT ?", (after, per_page + 1)).fetchall()
+            has_more, rows = len(rows) > per_page, rows[:per_page]
+            has_next, has_prev = has_more, True
+        elif before is not None or last:
+            if before is not None:
+                rows = conn.execute(f"{select} WHERE rowid < ? ORDER BY rowid DESC LIMIT ?",
+                                    (before, per_page + 1)).fetchall()
+            else:
+                rows = conn.execute(f"{select} ORDER BY rowid DESC LIMIT ?", (per_page + 1,)).fetchall()
+            has_more, rows = len(rows) > per_page, rows[:per_page][::-1]
+            has_next, has_prev = before is not None, has_more
+        else:
+            rows = conn.execute(f"{select} ORDER BY rowid LIMIT ?", (per_page + 1,)).fetchall()
+            has_more, rows = len(rows) > per_page, rows[:per_page]
+            has_next, has_prev = has_more, False
+
+        data = []
+        for row in rows:
+            row_dict = _convert_row(row, info)
+            del row_dict[ROWID_ALIAS]
+            data.append(row_dict)
+        return {
+            'rows': data,
+            'next_cursor': rows[-1][ROWID_ALIAS] if rows else None,
+            'prev_cursor': rows[0][ROWID_ALIAS] if rows else None,
+            'has_next': has_next,
+            'has_prev': has_prev
+        }
+
+    page = max(1, page or 1)
+    # 与键集分页的顺序一致
+    order = ' ORDER BY rowid' if info['has_rowid'] else ''
+    rows = conn.execute(
+        f"SELECT * FROM {table_name}{order} LIMIT ? OFFSET ?",
+        (per_page + 1, (page - 1) * per_page)
+    ).fetchall()
+    return {
+        'rows': [_convert_row(row, info) for row in rows[:per_page]],
+        'next_cursor': None,
+        'prev_cursor': None,
+        'has_next': len(rows) > per_page,
+        'has_prev': page > 1
+    }
+
+
+def _export_value(value):
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+def _iter_rows(table_name, info):
+    """按批次读取整张表（导出原始值，不做时间转换）"""
+    conn = get_db_connection()
+    try:
+        if info['has_rowid']:
+            # 每批一个短查询，不长时间占用读事务
+            last_rowid = None
+            select = f"SELECT rowid AS {ROWID_ALIAS}, * FROM {table_name}"
+            while True:
+                if last_rowid is None:
+                    rows = conn.execute(f"{select} ORDER BY rowid LIMIT ?", (EXPORT_BATCH_SIZE,)).fetchall()
+                else:
+                    rows = conn.execute(f"{select} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                                        (last_rowid, EXPORT_BATCH_SIZE)).fetchall()
+                if not rows:
+                    return
+                last_rowid = rows[-1][ROWID_ALIAS]
+                for row in rows:
+                    yield [_export_value(row[name]) for name in info['column_names']]
+        else:
+            cursor = conn.execute(f"SELECT * FROM {table_name}")
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    return
+                for row in rows:
+                    yield [_export_value(value) for value in row]
+    finally:
+        conn.close()
+
+
+def iter_export(table_name, info, fmt):
+    """
+    逐块生成导出内容
+
+    Args:
+        fmt: csv 或 ndjson
+    """
+    columns = info['column_names']
+    if fmt == 'ndjson':
+        lines = []
+        for values in _iter_rows(table_name, info):
+            lines.append(json.dumps(dict(zip(columns, values)), ensure_ascii=False))
+            if len(lines) >= EXPORT_BATCH_SIZE:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # UTF-8 BOM，Excel 打开时不乱码
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    for index, values in enumerate(_iter_rows(table_name, info), 1):
+        writer.writerow(values)
+        if index % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+__all__ = [
+    'COUNT_CACHE_TTL',
+    'MAX_PER_PAGE',
+    'is_valid_table_name',
+    'get_table_info',
+    'get_row_count',
+    'adjust_row_count',
+    'fetch_page',
+    'iter_export'
+]
@@ -3,6 +3,7 @@
 管理员页面路由
 """
 from flask import Blueprint, render_template, session, redirect, url_for
+from components.user_cache import get_current_role
 
 admin_pages_bp = Blueprint('pages', __name__)
 
@@ -12,7 +13,8 @@ def check_admin():
     if 'user_id' not in session:
         return redirect(url_for('login.pages.login_page'))
     
-    if session.get('role') != 2:
+    # 角色从用户资料缓存读取（session 中的角色在修改后会过期）
+    if get_current_role() != 2:
         return redirect(url_for('login.account.account_page'))
     
     return None
@@ -15,7 +15,13 @@ from route.album_route.utils import (
     get_base_dir,
     check_image_permission
 )
+from route.album_route.index import get_category_index
 from database import get_db_connection
+from components.user_cache import get_current_role
+
+# 图片列表默认每页数量和最大每页数量
+DEFAULT_PAGE_SIZE = 12
+MAX_PAGE_SIZE = 100
 
 
 def is_category_visible(category_key):
@@ -91,67 +97,45 @@ def get_images(category):
     # 获取登录状态和角色
     user_id = session.get('user_id')
     is_logged_in = user_id is not None
-    user_role = session.get('role', 0) if is_logged_in else 0
+    user_role = get_current_role() if is_logged_in else 0
     is_admin = user_role == 2
     
-    # 获取图片目录路径
-    base_dir = get_base_dir(category)
-    
-    images = []
-    
-    # 遍历目录，查找所有图片文件
-    if base_dir and base_dir.exists():
-        for root, dirs, files in os.walk(base_dir):
-            for file in files:
-                # 支持的图片格式
-                if file.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')):
-                    # 获取文件的完整路径
-                    file_path = os.path.join(root, file)
-                    # 获取相对路径
-                    rel_path = os.path.relpath(file_path, base_dir)
-                    # 获取文件修改时间
-                    mtime = os.path.getmtime(file_path)
-                    
-                    # 判断图片类型：normal、abnormal 或其他
-                    path_parts = rel_path.replace('\\', '/').split('/')
-                    image_type = 'other'  # 默认类型
-                    
-                    if 'normal' in path_parts:
-                        image_type = 'normal'
-                    elif 'abnormal' in path_parts:
-                        image_type = 'abnormal'
-                    
-                    # 权限检查：决定是否包含该图片以及是否需要模糊
-                    should_include, needs_blur = check_image_permission(
-                        category, image_type, is_logged_in, is_admin
-                    )
-                    
-                    # 如果应该包含，添加到列表
-                    if should_include:
-                        # 转换为URL路径（使用正斜杠）
-                        url_path = f"/static/imgs/album/{CATEGORY_MAP[category]}/{rel_path}".replace('\\', '/')
-                        images.append({
-                            "url": url_path,
-                            "name": file,
-                            "path": rel_path,
-                            "type": image_type,  # 添加类型标记
-                            "needs_blur": needs_blur,  # 标记是否需要模糊
-                            "mtime": mtime  # 添加修改时间用于排序
-                        })
-    
-    # 按修改时间排序（最新的在前）
-    images.sort(key=lambda x: x['mtime'], reverse=True)
+    # 分页参数：limit 每页数量（默认12），offset 偏移，cursor 上一页返回的 next_cursor（优先于 offset）
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "message": "无效的分页参数",
+            "data": []
+        }), 400
+    cursor = request.args.get('cursor') or None
     
-    # 限制最多返回12张图片
-    images = images[:12]
+    # 从预先排好序的索引中取一页
+    index = get_category_index(category, get_base_dir(category))
+    try:
+        images, total, next_cursor = index.page(is_logged_in, is_admin, limit, offset=offset, cursor=cursor)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e),
+            "data": []
+        }), 400
     
     # 移除mtime字段（不需要返回给前端）
-    for img in images:
-        img.pop('mtime', None)
+    data = [{key: value for key, value in image.items() if key != 'mtime'} for image in images]
     
     return jsonify({
         "success": True,
-        "data": images
+        "data": data,
+        "pagination": {
+            "total": total,
+            "limit": limit,
+            "offset": None if cursor else offset,
+            "has_more": next_cursor is not None,
+            "next_cursor": next_cursor
+        }
     })
 
 
@@ -166,7 +150,7 @@ def upload_image():
             "message": "请先登录"
         }), 401
     
-    user_role = session.get('role', 0)
+    user_role = get_current_role()
     if user_role != 2:
         return jsonify({
             "success": False,
@@ -263,6 +247,9 @@ def upload_image():
         # 保存文件
         file.save(str(file_path))
         
+        # 新图片加入索引（最新的排在最前）
+        get_category_index(category, base_dir).add(str(file_path.relative_to(base_dir)).replace('\\', '/'))
+        
         return jsonify({
             "success": True,
             "message": "上传成功",
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+相册图片索引
+每个分类目录一份索引，图片按修改时间从新到旧预先排好序，并按访问者身份（未登录 / 登录 / 管理员）
+预先过滤好权限，图片列表接口只需按偏移或游标切出一页。
+
+索引的更新：
+    - 启动时在后台线程建立所有分类的索引
+    - 上传、重命名接口直接更新索引
+    - 其他方式（手动复制、删除文件）改动目录后，最多 ALBUM_INDEX_CHECK_INTERVAL 秒内
+      通过比较各子目录的修改时间发现并重建（目录中增删、重命名文件会改变目录的修改时间）
+"""
+import base64
+import bisect
+import json
+import os
+import threading
+import time
+
+from route.album_route.utils import ALLOWED_EXTENSIONS, CATEGORY_MAP, check_image_permission, get_base_dir
+
+# 检查目录是否有改动的最短间隔（秒）
+ALBUM_INDEX_CHECK_INTERVAL = float(os.getenv('ALBUM_INDEX_CHECK_INTERVAL', '5'))
+
+
+def _image_type(rel_path):
+    """判断图片类型：normal、abnormal 或其他"""
+    path_parts = rel_path.split('/')
+    if 'normal' in path_parts:
+        return 'normal'
+    if 'abnormal' in path_parts:
+        return 'abnormal'
+    return 'other'
+
+
+def _sort_key(image):
+    # 最新的在前，修改时间相同时按路径排序，保证游标分页的顺序稳定
+    return (-image['mtime'], image['path'])
+
+
+def encode_cursor(image):
+    """把一页最后一张图片编码为游标"""
+    raw = json.dumps([image['mtime'], image['path']], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    解析游标
+
+    Raises:
+        ValueError: 游标无效
+    """
+    try:
+        mtime, path = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        return (-float(mtime), str(path))
+    except Exception:
+        raise ValueError('无效的游标')
+
+
+class CategoryIndex:
+    """
+    一个分类目录的图片索引（线程安全）
+
+    Args:
+        category: 分类
+        base_dir: 分类目录
+    """
+
+    def __init__(self, category, base_dir):
+        self.category = category
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+        # 按 _sort_key 排序的图片记录
+        self._images = []
+        # 目录（相对路径）-> 修改时间
+        self._dir_mtimes = {}
+        # 访问者身份 -> (过滤后的图片, 对应的排序键)
+        self._views = {}
+        self._built = False
+        self._last_check = 0.0
+        self.builds = 0
+
+    def __len__(self):
+        return len(self._images)
+
+    # ------------------------------------------------------------------
+    # 建立与检查
+    # ------------------------------------------------------------------
+
+    def _scan(self):
+        """遍历目录，返回 (按时间排序的图片, 各目录修改时间)"""
+        images = []
+        dir_mtimes = {}
+        if not self.base_dir.exists():
+            return images, dir_mtimes
+        for root, dirs, files in os.walk(self.base_dir):
+            rel_root = os.path.relpath(root, self.base_dir).replace('\\', '/')
+            dir_mtimes[rel_root] = os.stat(root).st_mtime
+            for file in files:
+                if os.path.splitext(file)[1].lower() not in ALLOWED_EXTENSIONS:
+                    continue
+                try:
+                    mtime = os.stat(os.path.join(root, file)).st_mtime
+                except FileNotFoundError:
+                    continue
+                rel_path = file if rel_root == '.' else f'{rel_root}/{file}'
+                images.append(self._record(rel_path, mtime))
+        images.sort(key=_sort_key)
+        return images, dir_mtimes
+
+    def _record(self, rel_path, mtime):
+        return {
+            'url': f"/static/imgs/album/{CATEGORY_MAP[self.category]}/{rel_path}",
+            'name': rel_path.rsplit('/', 1)[-1],
+            'path': rel_path,
+            'type': _image_type(rel_path),
+            'mtime': mtime
+        }
+
+    def rebuild(self):
+        """重新遍历目录建立索引"""
+        images, dir_mtimes = self._scan()
+        with self._lock:
+            self._images = images
+            self._dir_mtimes = dir_mtimes
+            self._views = {}
+            self._built = True
+            self._last_check = time.monotonic()
+            self.builds += 1
+
+    def _changed(self):
+        """目录树中是否有目录的修改时间变化（或目录被增删）"""
+        with self._lock:
+            dir_mtimes = dict(self._dir_mtimes)
+        if not dir_mtimes:
+            return self.base_dir.exists()
+        for rel_root, mtime in dir_mtimes.items():
+            try:
+                if os.stat(self.base_dir / rel_root).st_mtime != mtime:
+                    return True
+            except FileNotFoundError:
+                return True
+        return False
+
+    def ensure_fresh(self):
+        """首次使用时建立索引，之后每隔 ALBUM_INDEX_CHECK_INTERVAL 秒检查一次目录改动"""
+        if not self._built:
+            self.rebuild()
+            return
+        now = time.monotonic()
+        if now - self._last_check < ALBUM_INDEX_CHECK_INTERVAL:
+            return
+        self._last_check = now
+        if self._changed():
+            self.rebuild()
+
+    # ------------------------------------------------------------------
+    # 上传、重命名后更新
+    # ------------------------------------------------------------------
+
+    def _remember_dir(self, rel_path):
+        """记录文件所在目录的新修改时间（本次改动已经反映在索引中，不需要重建）"""
+        rel_root = rel_path.rsplit('/', 1)[0] if '/' in rel_path else '.'
+        try:
+            self._dir_mtimes[rel_root] = os.stat(self.base_dir / rel_root).st_mtime
+        except FileNotFoundError:
+            self._dir_mtimes.pop(rel_root, None)
+
+    def add(self, rel_path):
+        """新增图片（上传后调用）"""
+        if not self._built:
+            return
+        try:
+            mtime = os.stat(self.base_dir / rel_path).st_mtime
+        except FileNotFoundError:
+            return
+        record = self._record(rel_path, mtime)
+        with self._lock:
+            self._images = [image for image in self._images if image['path'] != rel_path]
+            bisect.insort(self._images, record, key=_sort_key)
+            self._remember_dir(rel_path)
+            self._views = {}
+
+    def rename(self, old_path, new_path):
+        """图片改名（修改时间不变，排序位置按新路径调整）"""
+        if not self._built:
+            return
+        with self._lock:
+            old = next((image for image in self._images if image['path'] == old_path), None)
+            if old is None:
+                return
+            images = [image for image in self._images if image['path'] != old_path]
+            bisect.insort(images, self._record(new_path, old['mtime']), key=_sort_key)
+            self._images = images
+            self._remember_dir(new_path)
+            self._views = {}
+
+    # ------------------------------------------------------------------
+    # 分页
+    # ------------------------------------------------------------------
+
+    def _view(self, is_logged_in, is_admin):
+        """访问者可见的图片（已按权限过滤并标记模糊），结果缓存到索引下次变化"""
+        viewer = (is_logged_in, is_admin)
+        with self._lock:
+            view = self._views.get(viewer)
+            if view is not None:
+                return view
+            images = []
+            for image in self._images:
+                should_include, needs_blur = check_image_permission(
+                    self.category, image['type'], is_logged_in, is_admin
+                )
+                if should_include:
+                    images.append(dict(image, needs_blur=needs_blur))
+            view = (images, [_sort_key(image) for image in images])
+            self._views[viewer] = view
+            return view
+
+    def page(self, is_logged_in, is_admin, limit, offset=0, cursor=None):
+        """
+        取一页图片
+
+        Args:
+            limit: 每页数量
+            offset: 偏移（cursor 为空时使用）
+            cursor: 上一页返回的 next_cursor
+
+        Returns:
+            tuple: (图片列表, 可见图片总数, 下一页游标或None)
+
+        Raises:
+            ValueError: 游标无效
+        """
+        self.ensure_fresh()
+        images, keys = self._view(is_logged_in, is_admin)
+        start = bisect.bisect_right(keys, decode_cursor(cursor)) if cursor else offset
+        end = start + limit
+        items = images[start:end]
+        next_cursor = encode_cursor(items[-1]) if items and end < len(images) else None
+        return items, len(images), next_cursor
+
+
+# 分类目录 -> 索引
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_category_index(category, base_dir=None):
+    """
+    获取分类的图片索引（按目录缓存）
+
+    Args:
+        category: 分类
+        base_dir: 分类目录（默认 get_base_dir(category)）
+    """
+    base_dir = base_dir or get_base_dir(category)
+    key = str(base_dir)
+    index = _indexes.get(key)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(key)
+            if index is None:
+                index = CategoryIndex(category, base_dir)
+                _indexes[key] = index
+    return index
+
+
+def build_album_indexes():
+    """在后台线程建立所有分类的索引（应用启动时调用）"""
+    def build():
+        start = time.time()
+        total = 0
+        for category in CATEGORY_MAP:
+            index = get_category_index(category)
+            index.rebuild()
+            total += len(index)
+        print(f"🖼️  [相册] 图片索引已建立: {len(CATEGORY_MAP)} 个分类, {total} 张图片, 耗时 {time.time() - start:.2f} 秒")
+
+    threading.Thread(target=build, name='album-index-build', daemon=True).start()
@@ -6,13 +6,15 @@
 import json
 import re
 import time
-from pathlib import Path
 from flask import Blueprint, request, jsonify, Response, stream_with_context, session, url_for
-from werkzeug.utils import secure_filename
 from config.llm.base.history import get_conversation_history, save_message, clear_history, set_current_file
 from config.llm.base.history.cleanup import cleanup_empty_json_files
 from config.llm import llm_stream  # 向后兼容
 from config.llm.agent_config import is_agent_online
+from components.tts语音合成.utils import filter_tts_text, tts_text_hash
+from components.tts语音合成.cache import get_tts_cache
+from components.tts语音合成.service import get_tts_service
+from components.media.uploads import user_upload_dir, user_upload_key, UPLOAD_URL_PREFIX
 
 # 创建蓝图
 chat_api_bp = Blueprint('chat_api', __name__)
@@ -159,25 +161,21 @@ def get_history(session_id):
     
     # 处理历史记录，为包含图片描述的消息添加图片URL
     processed_history = []
-    upload_dir = Path('static') / 'users' / 'chat_upload'
-    safe_email = user_email.replace('@', '_at_').replace('.', '_')
-    safe_email = secure_filename(safe_email)
+    # 只列出当前用户的上传目录
+    upload_dir = user_upload_dir(user_email)
+    upload_key = user_upload_key(user_email)
     
-    # 创建图片文件名到URL的映射
+    # 创建图片文件名到URL的映射，同时为向后兼容准备按修改时间排序的图片列表（用于旧数据）
     image_map = {}
-    if upload_dir.exists():
-        for img_file in upload_dir.glob(f"{safe_email}_*"):
-            if img_file.is_file():
-                image_map[img_file.name] = url_for('static', filename=f"users/chat_upload/{img_file.name}")
-    
-    # 为向后兼容准备：获取所有图片按修改时间排序（用于旧数据）
     user_images_sorted = []
     if upload_dir.exists():
-        for img_file in upload_dir.glob(f"{safe_email}_*"):
+        for img_file in upload_dir.iterdir():
             if img_file.is_file():
+                url = url_for('static', filename=f"{UPLOAD_URL_PREFIX}/{upload_key}/{img_file.name}")
+                image_map[img_file.name] = url
                 user_images_sorted.append({
                     'filename': img_file.name,
-                    'url': url_for('static', filename=f"users/chat_upload/{img_file.name}"),
+                    'url': url,
                     'mtime': img_file.stat().st_mtime
                 })
         user_images_sorted.sort(key=lambda x: x['mtime'])
@@ -185,9 +183,9 @@ def get_history(session_id):
     # 用于向后兼容的索引（仅在没有文件名时使用）
     legacy_image_index = 0
     
-    # 查找音频文件目录，基于文本内容匹配
-    audio_dir = Path('static') / 'audio' / 'response_audio' / safe_email
-    import hashlib
+    # 音频缓存索引（全局内容寻址缓存 + 旧版按用户保存的音频）
+    tts_cache = get_tts_cache()
+    tts_config = get_tts_service().config
     
     # 为每个 assistant 消息查找对应的音频文件
     def find_audio_for_message(msg_content):
@@ -196,29 +194,18 @@ def get_history(session_id):
             return None
         
         # 过滤括号内容和星号（与TTS生成时保持一致）
-        filtered_text = re.sub(r'[（(【\[].*?[）)\]\】]', '', msg_content)
-        # 过滤掉星号
-        filtered_text = re.sub(r'\*+', '', filtered_text)
-        filtered_text = filtered_text.strip()
+        filtered_text = filter_tts_text(msg_content)
         
         if not filtered_text:
             return None
         
-        # 生成文本哈希
-        text_hash = hashlib.md5(filtered_text.encode('utf-8')).hexdigest()[:16]
-        
-        # 查找匹配的音频文件（支持两种格式：tts_{message_id}_{hash}.mp3 或 tts_{hash}.mp3）
-        if audio_dir.exists():
-            # 先查找带 message_id 的文件
-            for audio_file in audio_dir.glob(f'tts_*_{text_hash}.mp3'):
-                audio_url = url_for('static', filename=f"audio/response_audio/{safe_email}/{audio_file.name}")
-                return audio_url
-            
-            # 再查找只有 hash 的文件
-            hash_file = audio_dir / f'tts_{text_hash}.mp3'
-            if hash_file.exists():
-                audio_url = url_for('static', filename=f"audio/response_audio/{safe_email}/{hash_file.name}")
-                return audio_url
+        # 在缓存索引中查找（字典查询，不扫描目录）；只读展示不刷新访问时间，已被淘汰的文件视为没有音频
+        audio_path = tts_cache.lookup_text(
+            filtered_text, tts_config, email=user_email, text_hash=tts_text_hash(filtered_text),
+            verify=True, touch=False
+        )
+        if audio_path:
+            return url_for('static', filename=audio_path)
         
         return None
     
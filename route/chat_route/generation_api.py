@@ -1,19 +1,17 @@
 # -*- coding: utf-8 -*-
 """
 生成API路由
-处理图片和视频生成功能
+处理图片和视频生成功能（都作为后台任务执行）
 """
-import os
 import json
-import tempfile
-import requests
-from pathlib import Path
-from flask import Blueprint, request, jsonify, session, url_for
-from openai import OpenAI
+from flask import Blueprint, request, jsonify, session, url_for, Response, stream_with_context
 from dotenv import load_dotenv
-from config.llm.base.history import get_conversation_history, save_message, set_current_file, HISTORY_DIR
+from config.llm.base.history import get_conversation_history, set_current_file
 from config.llm.agent_config import is_agent_online
-from route.chat_route.utils import generate_video
+from components.jobs import (
+    get_job_queue, QuotaExceeded, STATUS_QUEUED, STATUS_SUCCEEDED, STATUS_FAILED, FINISHED_STATUSES
+)
+from route.chat_route.generation_jobs import IMAGE_JOB, VIDEO_JOB
 
 # 加载环境变量
 load_dotenv()
@@ -21,10 +19,13 @@ load_dotenv()
 # 创建蓝图
 generation_api_bp = Blueprint('generation_api', __name__)
 
+# SSE 心跳间隔（秒）
+JOB_STREAM_HEARTBEAT = 15
+
 
 @generation_api_bp.route('/generate-image', methods=['POST'])
 def generate_image_api():
-    """生成图片API"""
+    """生成图片API（提交后台任务，立即返回任务ID）"""
     try:
         # 检查是否登录
         user_email = session.get('email')
@@ -44,141 +45,24 @@ def generate_image_api():
         if not prompt:
             return jsonify({'error': '提示词不能为空'}), 400
         
-        # 直接调用API获取图片URL（不下载到临时文件）
-        image_client = OpenAI(
-            base_url="https://ark.cn-beijing.volces.com/api/v3",
-            api_key=os.environ.get("ARK_API_KEY"),
-        )
-        
-        images_response = image_client.images.generate(
-            model="doubao-seedream-4-5-251128",
-            prompt=prompt,
-            size="4K",
-            response_format="url",
-            extra_body={
-                "watermark": False,
-            },
-        )
-        
-        # 获取图片URL
-        cloud_image_url = images_response.data[0].url
-        
-        # 确定保存目录（保存到static/imgs/user_chat）
-        save_dir = Path('static') / 'imgs' / 'user_chat'
-        save_dir.mkdir(parents=True, exist_ok=True)
-        
-        # 生成文件名：用户邮箱_对话id_x.jpg/png
-        safe_email = user_email.replace('@', '_at_').replace('.', '_')
-        # 获取该用户在该session中已存在的文件数量
-        existing_files = list(save_dir.glob(f"{safe_email}_{session_id}_*"))
-        file_num = len(existing_files) + 1
-        
-        # 从URL下载文件并确定文件扩展名
-        response = requests.get(cloud_image_url, stream=True)
-        response.raise_for_status()
-        
-        # 确定文件扩展名（通过下载少量内容判断文件类型）
-        first_chunk = next(response.iter_content(chunk_size=4), b'')
-        response.close()  # 关闭第一个response
-        
-        # 重新创建response用于完整下载
-        response = requests.get(cloud_image_url, stream=True)
-        response.raise_for_status()
-        
-        if first_chunk[:4] == b'\x89PNG' or '.png' in cloud_image_url.lower():
-            ext = 'png'
-        elif first_chunk[:2] == b'\xff\xd8' or '.jpg' in cloud_image_url.lower() or '.jpeg' in cloud_image_url.lower():
-            ext = 'jpg'
-        else:
-            ext = 'jpg'  # 默认jpg
-        
-        filename = f"{safe_email}_{session_id}_{file_num}.{ext}"
-        file_path = save_dir / filename
-        
-        # 保存文件
-        with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-        
-        # 生成访问URL
-        relative_path = f"imgs/user_chat/{filename}"
-        image_url = url_for('static', filename=relative_path)
-        
-        # 获取当前会话文件名
+        # 获取当前会话文件名（任务完成后写入该会话）
         current_file = session.get('current_history_file')
-        history, current_file = get_conversation_history(user_email, session_id, current_file)
+        _, current_file = get_conversation_history(user_email, session_id, current_file)
         if current_file:
             session['current_history_file'] = current_file
             set_current_file(user_email, current_file)
         
-        # 检查历史记录中是否已有该指令的用户消息，如果有则更新，否则创建新消息
-        # 查找最后一条用户消息，看是否是该指令
-        user_command_message = None
-        for msg in reversed(history):
-            if msg.get("role") == "user" and msg.get("content", "").startswith(f"/image {prompt}"):
-                user_command_message = msg
-                break
-        
-        # 保存指令执行结果到历史记录
-        command_info = {
-            "type": "image",
-            "prompt": prompt,
-            "result": {
-                "image_url": image_url,
-                "file_path": str(file_path),
-                "filename": filename
-            },
-            "success": True
-        }
-        
-        # 如果找到了用户消息，更新它；否则创建新消息
-        if user_command_message:
-            # 更新现有消息，添加command_info
-            # 需要重新读取历史记录文件并更新
-            # 构建用户目录路径
-            safe_email = user_email.replace('@', '_at_').replace('.', '_')
-            user_dir = HISTORY_DIR / safe_email
-            file_path_history = user_dir / current_file
-            try:
-                with open(file_path_history, 'r', encoding='utf-8') as f:
-                    history_list = json.load(f)
-                # 找到并更新最后一条匹配的用户消息
-                for msg in reversed(history_list):
-                    if msg.get("role") == "user" and msg.get("content", "").startswith(f"/image {prompt}"):
-                        msg["command_info"] = command_info
-                        break
-                # 保存更新后的历史记录
-                with open(file_path_history, 'w', encoding='utf-8') as f:
-                    json.dump(history_list, f, ensure_ascii=False, indent=2)
-            except Exception as e:
-                print(f'更新历史记录失败: {e}')
-                # 如果更新失败，创建新消息
-                save_message(
-                    user_email, 
-                    "user", 
-                    f"/image {prompt}", 
-                    session_id, 
-                    current_file,
-                    command_info=command_info
-                )
-        else:
-            # 如果没有找到，创建新消息
-            save_message(
-                user_email, 
-                "user", 
-                f"/image {prompt}", 
-                session_id, 
-                current_file,
-                command_info=command_info
-            )
-        
-        return jsonify({
-            'success': True,
-            'image_url': image_url,
-            'file_path': str(file_path)
+        # 提交后台任务（图片任务优先调度，受全局并发上限和用户配额约束）
+        job_id = get_job_queue().enqueue(IMAGE_JOB, user_email, {
+            'prompt': prompt,
+            'session_id': session_id,
+            'current_file': current_file
         })
         
+        return _job_accepted(job_id)
+        
+    except QuotaExceeded as e:
+        return jsonify({'error': str(e)}), 429
     except Exception as e:
         print(f'生成图片错误: {e}')
         import traceback
@@ -188,7 +72,7 @@ def generate_image_api():
 
 @generation_api_bp.route('/generate-video', methods=['POST'])
 def generate_video_api():
-    """生成视频API"""
+    """生成视频API（提交后台任务，立即返回任务ID）"""
     try:
         # 检查是否登录
         user_email = session.get('email')
@@ -213,128 +97,126 @@ def generate_video_api():
         # 构建完整的prompt，包含参数
         full_prompt = f"{prompt} --duration {duration} --watermark {'true' if watermark else 'false'}"
         
-        # 调用生成视频函数获取云端URL（需要修改seedance.py来获取URL）
-        # 暂时使用临时目录，然后从返回的文件中读取
-        temp_dir = tempfile.mkdtemp()
-        file_path = generate_video(
-            prompt=full_prompt,
-            save_dir=temp_dir
-        )
-        
-        # 由于seedance已经下载了文件，我们需要重新调用API获取URL
-        # 或者修改seedance.py，这里我们直接读取文件然后移动
-        # 为了获取URL，我们需要重新调用API（这里简化处理，直接使用已下载的文件）
-        
-        # 读取临时文件内容
-        with open(file_path, 'rb') as f:
-            file_content = f.read()
-        
-        # 删除临时文件
-        try:
-            os.remove(file_path)
-            os.rmdir(temp_dir)
-        except:
-            pass
-        
-        # 确定保存目录（保存到static/video/user_chat）
-        save_dir = Path('static') / 'video' / 'user_chat'
-        save_dir.mkdir(parents=True, exist_ok=True)
-        
-        # 生成文件名：用户邮箱_对话id_x.mp4
-        safe_email = user_email.replace('@', '_at_').replace('.', '_')
-        # 获取该用户在该session中已存在的文件数量
-        existing_files = list(save_dir.glob(f"{safe_email}_{session_id}_*"))
-        file_num = len(existing_files) + 1
-        
-        filename = f"{safe_email}_{session_id}_{file_num}.mp4"
-        file_path = save_dir / filename
-        
-        # 保存文件
-        with open(file_path, 'wb') as f:
-            f.write(file_content)
-        
-        # 生成访问URL
-        relative_path = f"video/user_chat/{filename}"
-        video_url = url_for('static', filename=relative_path)
-        
-        # 获取当前会话文件名
+        # 获取当前会话文件名（任务完成后写入该会话）
         current_file = session.get('current_history_file')
-        history, current_file = get_conversation_history(user_email, session_id, current_file)
+        _, current_file = get_conversation_history(user_email, session_id, current_file)
         if current_file:
             session['current_history_file'] = current_file
             set_current_file(user_email, current_file)
         
-        # 检查历史记录中是否已有该指令的用户消息，如果有则更新，否则创建新消息
-        # 查找最后一条用户消息，看是否是该指令
-        user_command_message = None
-        for msg in reversed(history):
-            if msg.get("role") == "user" and msg.get("content", "").startswith(f"/video {prompt}"):
-                user_command_message = msg
-                break
-        
-        # 保存指令执行结果到历史记录
-        command_info = {
-            "type": "video",
-            "prompt": prompt,
-            "result": {
-                "video_url": video_url,
-                "file_path": str(file_path),
-                "filename": filename,
-                "duration": duration,
-                "watermark": watermark
-            },
-            "success": True
-        }
-        
-        # 如果找到了用户消息，更新它；否则创建新消息
-        if user_command_message:
-            # 更新现有消息，添加command_info
-            # 需要重新读取历史记录文件并更新
-            safe_email = user_email.replace('@', '_at_').replace('.', '_')
-            user_dir = HISTORY_DIR / safe_email
-            file_path_history = user_dir / current_file
-            try:
-                with open(file_path_history, 'r', encoding='utf-8') as f:
-                    history_list = json.load(f)
-                # 找到并更新最后一条匹配的用户消息
-                for msg in reversed(history_list):
-                    if msg.get("role") == "user" and msg.get("content", "").startswith(f"/video {prompt}"):
-                        msg["command_info"] = command_info
-                        break
-                # 保存更新后的历史记录
-                with open(file_path_history, 'w', encoding='utf-8') as f:
-                    json.dump(history_list, f, ensure_ascii=False, indent=2)
-            except Exception as e:
-                print(f'更新历史记录失败: {e}')
-                # 如果更新失败，创建新消息
-                save_message(
-                    user_email, 
-                    "user", 
-                    f"/video {prompt}", 
-                    session_id, 
-                    current_file,
-                    command_info=command_info
-                )
-        else:
-            # 如果没有找到，创建新消息
-            save_message(
-                user_email, 
-                "user", 
-                f"/video {prompt}", 
-                session_id, 
-                current_file,
-                command_info=command_info
-            )
-        
-        return jsonify({
-            'success': True,
-            'video_url': video_url,
-            'file_path': str(file_path)
+        job_id = get_job_queue().enqueue(VIDEO_JOB, user_email, {
+            'prompt': prompt,
+            'full_prompt': full_prompt,
+            'session_id': session_id,
+            'current_file': current_file,
+            'duration': duration,
+            'watermark': watermark
         })
         
+        return _job_accepted(job_id)
+        
+    except QuotaExceeded as e:
+        return jsonify({'error': str(e)}), 429
     except Exception as e:
         print(f'生成视频错误: {e}')
         import traceback
         traceback.print_exc()
         return jsonify({'error': f'生成视频失败: {str(e)}'}), 500
 
+
+def _job_accepted(job_id):
+    """任务已提交的响应（202）"""
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': STATUS_QUEUED,
+        'status_url': url_for('.generate_job_status', job_id=job_id),
+        'stream_url': url_for('.generate_job_stream', job_id=job_id)
+    }), 202
+
+
+def _get_user_job(job_id):
+    """
+    获取当前用户的任务
+    
+    Returns:
+        tuple: (任务 dict, 错误响应)
+    """
+    user_email = session.get('email')
+    if not user_email:
+        return None, (jsonify({'error': '未登录'}), 401)
+    
+    job = get_job_queue().get(job_id)
+    if job is None or job['user_email'] != user_email:
+        return None, (jsonify({'error': '任务不存在'}), 404)
+    return job, None
+
+
+def _job_status(job):
+    """任务状态的对外表示"""
+    status = {
+        'success': True,
+        'job_id': job['id'],
+        'type': job['job_type'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'attempts': job['attempts'],
+        'done': job['status'] in FINISHED_STATUSES
+    }
+    if job['status'] == STATUS_QUEUED:
+        status['queue_position'] = get_job_queue().queue_position(job)
+    if job['status'] == STATUS_SUCCEEDED and job['result']:
+        status.update(job['result'])
+    elif job['status'] == STATUS_FAILED:
+        status['error'] = job['error'] or '生成失败'
+    return status
+
+
+@generation_api_bp.route('/generate-video/status/<job_id>', methods=['GET'])
+@generation_api_bp.route('/generate/status/<job_id>', methods=['GET'])
+def generate_job_status(job_id):
+    """查询生成任务状态"""
+    job, error = _get_user_job(job_id)
+    if error:
+        return error
+    return jsonify(_job_status(job))
+
+
+@generation_api_bp.route('/generate-video/stream/<job_id>', methods=['GET'])
+@generation_api_bp.route('/generate/stream/<job_id>', methods=['GET'])
+def generate_job_stream(job_id):
+    """以 SSE 推送生成任务进度，任务结束后关闭"""
+    job, error = _get_user_job(job_id)
+    if error:
+        return error
+    
+    job_queue = get_job_queue()
+    
+    def generate():
+        last_sent = None
+        current = job
+        version = job_queue.version
+        while True:
+            status = _job_status(current)
+            if status != last_sent:
+                yield f"data: {json.dumps(status, ensure_ascii=False)}\n\n"
+                last_sent = status
+            if status['done']:
+                return
+            new_version = job_queue.wait_for_update(version, JOB_STREAM_HEARTBEAT)
+            if new_version == version:
+                # 心跳，防止代理断开空闲连接
+                yield ": ping\n\n"
+            version = new_version
+            current = job_queue.get(job_id)
+            if current is None:
+                return
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+生成类后台任务
+图片和视频生成都由任务队列在后台执行，受全局并发上限和用户配额约束：
+    - 图片：调用生成接口 -> 记录图片地址 -> 下载 -> 写入历史记录（耗时短，优先调度）
+    - 视频：创建上游任务 -> 定时查询状态 -> 下载 -> 写入历史记录（耗时数分钟）
+"""
+import os
+from pathlib import Path
+from werkzeug.utils import secure_filename
+from components.jobs import get_job_queue, JobPending
+from components.media import ingest_url
+from config.llm.base.history import save_command_result
+from route.chat_route.utils import create_image, create_video_task, get_video_task
+
+# 任务类型
+IMAGE_JOB = 'image'
+VIDEO_JOB = 'video'
+
+# 任务优先级（数值越小越优先）：图片生成几秒完成，不应排在视频任务后面
+IMAGE_JOB_PRIORITY = 0
+VIDEO_JOB_PRIORITY = 10
+
+# 查询上游视频任务状态的间隔（秒）
+VIDEO_POLL_INTERVAL = float(os.getenv('VIDEO_POLL_INTERVAL', '3'))
+
+
+def _file_prefix(user_email, session_id):
+    """文件名前缀：用户邮箱_对话id"""
+    safe_email = user_email.replace('@', '_at_').replace('.', '_')
+    return f"{safe_email}_{secure_filename(str(session_id))}"
+
+
+def run_image_job(ctx):
+    """
+    图片生成任务
+
+    payload: prompt, session_id, current_file, cloud_image_url（生成后写入）
+    """
+    payload = ctx.payload
+
+    # 生成结果的地址持久化后再下载：下载或保存失败重试时只重新下载，不重复调用（付费的）生成接口
+    cloud_image_url = payload.get('cloud_image_url')
+    if not cloud_image_url:
+        ctx.set_progress('图片生成中')
+        cloud_image_url = create_image(payload['prompt'], size="4K", watermark=False)
+        ctx.update_payload(cloud_image_url=cloud_image_url)
+
+    ctx.set_progress('正在保存图片')
+
+    # 确定保存目录（保存到static/imgs/user_chat）
+    save_dir = Path('static') / 'imgs' / 'user_chat'
+
+    # 文件名：用户邮箱_对话id_x.jpg/png（一次流式下载，根据文件头确定扩展名）
+    file_path = ingest_url(cloud_image_url, save_dir, _file_prefix(ctx.user_email, payload['session_id']),
+                           default_ext='jpg')
+    filename = file_path.name
+    image_url = f"/static/imgs/user_chat/{filename}"
+
+    # 保存指令执行结果到历史记录（已有该指令的用户消息则更新，否则创建新消息）
+    command_info = {
+        "type": "image",
+        "prompt": payload['prompt'],
+        "result": {
+            "image_url": image_url,
+            "file_path": str(file_path),
+            "filename": filename
+        },
+        "success": True
+    }
+    save_command_result(
+        ctx.user_email,
+        'image',
+        payload['prompt'],
+        command_info,
+        session_id=payload['session_id'],
+        current_file=payload.get('current_file')
+    )
+
+    return {
+        'image_url': image_url,
+        'file_path': str(file_path)
+    }
+
+
+def run_video_job(ctx):
+    """
+    视频生成任务
+
+    payload: prompt, full_prompt, session_id, current_file, duration, watermark, task_id（运行中写入）
+    """
+    payload = ctx.payload
+
+    # 第一次执行（或上游任务失败后重试）时创建上游任务，任务ID持久化，进程重启后继续查询
+    task_id = payload.get('task_id')
+    if not task_id:
+        task_id = create_video_task(payload['full_prompt'])
+        ctx.update_payload(task_id=task_id)
+        raise JobPending(VIDEO_POLL_INTERVAL, '任务已提交，等待生成')
+
+    task = get_video_task(task_id)
+    status = task['status']
+    if status == 'failed':
+        # 清除任务ID，按重试策略重新创建上游任务
+        ctx.update_payload(task_id=None)
+        raise RuntimeError(f"任务执行失败: {task['error']}")
+    if status != 'succeeded':
+        raise JobPending(VIDEO_POLL_INTERVAL, f'视频生成中（{status}）')
+
+    ctx.set_progress('正在下载视频')
+
+    # 确定保存目录（保存到static/video/user_chat）
+    save_dir = Path('static') / 'video' / 'user_chat'
+
+    # 文件名：用户邮箱_对话id_x.mp4（一次流式下载，以不冲突的序号保存）
+    file_path = ingest_url(task['video_url'], save_dir, _file_prefix(ctx.user_email, payload['session_id']),
+                           default_ext='mp4')
+
+    # 生成访问URL（后台线程中没有请求上下文，直接拼接静态路径）
+    filename = file_path.name
+    video_url = f"/static/video/user_chat/{filename}"
+
+    # 保存指令执行结果到历史记录
+    command_info = {
+        "type": "video",
+        "prompt": payload['prompt'],
+        "result": {
+            "video_url": video_url,
+            "file_path": str(file_path),
+            "filename": filename,
+            "duration": payload['duration'],
+            "watermark": payload['watermark']
+        },
+        "success": True
+    }
+    save_command_result(
+        ctx.user_email,
+        'video',
+        payload['prompt'],
+        command_info,
+        session_id=payload['session_id'],
+        current_file=payload.get('current_file')
+    )
+
+    return {
+        'video_url': video_url,
+        'file_path': str(file_path)
+    }
+
+
+def register_generation_jobs():
+    """注册生成类任务处理函数"""
+    job_queue = get_job_queue()
+    job_queue.register_handler(IMAGE_JOB, run_image_job, max_attempts=2, priority=IMAGE_JOB_PRIORITY)
+    job_queue.register_handler(VIDEO_JOB, run_video_job, priority=VIDEO_JOB_PRIORITY)
+
+
+register_generation_jobs()
@@ -2,19 +2,69 @@
 """
 TTS 语音合成API路由
 """
-import os
-import re
-import hashlib
-import asyncio
-import importlib.util
-from pathlib import Path
-from flask import Blueprint, request, jsonify, session, url_for
-from werkzeug.utils import secure_filename
+from flask import Blueprint, request, jsonify, session, url_for, Response, stream_with_context
+from components.tts语音合成.service import get_tts_service
+from components.tts语音合成.streaming import get_stream_registry
+from components.tts语音合成.cache import get_tts_cache, audio_cache_key
+from components.tts语音合成.utils import filter_tts_text, tts_text_hash
+from components.single_flight import get_single_flight
 
 # 创建蓝图
 tts_api_bp = Blueprint('tts_api', __name__)
 
 
+def _prepare_tts_request(user_email, data):
+    """
+    解析 TTS 请求：过滤文本并在缓存索引中查找
+
+    Returns:
+        tuple: (请求信息 dict, 错误响应)，请求信息包含 text/cache_key/output_file/filename/audio_url/cached，
+               出错时请求信息为None
+    """
+    text = (data.get('text') or '').strip()
+
+    if not text:
+        return None, (jsonify({'error': '文本不能为空'}), 400)
+
+    # 过滤掉括号内的内容（角色扮演动作描述）和星号
+    filtered_text = filter_tts_text(text)
+
+    if not filtered_text:
+        return None, (jsonify({'error': '过滤后文本为空'}), 400)
+
+    # 音频按内容寻址，所有用户共用（message_id 不再影响文件名）
+    tts_cache = get_tts_cache()
+    config = get_tts_service().config
+    cache_key = audio_cache_key(filtered_text, config)
+    # 文件可能已被淘汰或手动删除：索引项随之移除，按未命中处理重新合成
+    cached_path = tts_cache.lookup_text(
+        filtered_text, config, email=user_email, text_hash=tts_text_hash(filtered_text), verify=True
+    )
+
+    if cached_path:
+        output_file = tts_cache.static_dir / cached_path
+        static_path = cached_path
+    else:
+        output_file = tts_cache.prepare_path(cache_key)
+        static_path = output_file.relative_to(tts_cache.static_dir).as_posix()
+
+    return {
+        'text': filtered_text,
+        'cache_key': cache_key,
+        'output_file': output_file,
+        'filename': output_file.name,
+        'audio_url': url_for('static', filename=static_path),
+        'cached': bool(cached_path)
+    }, None
+
+
+def _synthesize_to_cache(tts_request):
+    """合成语音并登记到音频缓存"""
+    output_file = tts_request['output_file']
+    get_tts_service().synthesize(tts_request['text'], str(output_file))
+    get_tts_cache().add(tts_request['cache_key'], output_file)
+
+
 @tts_api_bp.route('/tts', methods=['POST'])
 def tts_api():
     """TTS 语音合成API"""
@@ -23,87 +73,111 @@ def tts_api():
         user_email = session.get('email')
         if not user_email:
             return jsonify({'error': '登录了吗，就想榨干我的Token(￣へ￣)'}), 401
-        
-        data = request.json
-        text = data.get('text', '').strip()
-        message_id = data.get('message_id', None)  # 可选的消息ID，用于缓存
-        
-        if not text:
-            return jsonify({'error': '文本不能为空'}), 400
-        
-        # 过滤掉括号内的内容（角色扮演动作描述）和星号
-        # 匹配中文括号、英文括号、方括号等
-        filtered_text = re.sub(r'[（(【\[].*?[）)\]\】]', '', text)
-        # 过滤掉星号
-        filtered_text = re.sub(r'\*+', '', filtered_text)
-        filtered_text = filtered_text.strip()
-        
-        if not filtered_text:
-            return jsonify({'error': '过滤后文本为空'}), 400
-        
-        # 导入 TTS 模块
-        tts_module_path = Path(__file__).parent.parent.parent / 'components' / 'tts语音合成' / 'src.py'
-        spec = importlib.util.spec_from_file_location("tts_src", str(tts_module_path))
-        tts_src = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(tts_src)
-        
-        # 创建配置
-        config = tts_src.TTSConfig()
-        
-        # 确保音频目录存在
-        safe_email = user_email.replace('@', '_at_').replace('.', '_')
-        safe_email = secure_filename(safe_email)
-        audio_dir = Path('static') / 'audio' / 'response_audio' / safe_email
-        audio_dir.mkdir(parents=True, exist_ok=True)
-        
-        # 基于文本内容生成唯一ID（用于缓存）
-        text_hash = hashlib.md5(filtered_text.encode('utf-8')).hexdigest()[:16]
-        
-        # 如果提供了 message_id，优先使用 message_id 作为文件名
-        if message_id:
-            filename = f"tts_{message_id}_{text_hash}.mp3"
-        else:
-            filename = f"tts_{text_hash}.mp3"
-        
-        output_file = audio_dir / filename
-        
-        # 检查文件是否已存在（缓存）
-        if output_file.exists():
-            relative_path = f"audio/response_audio/{safe_email}/{filename}"
-            audio_url = url_for('static', filename=relative_path)
+
+        tts_request, error = _prepare_tts_request(user_email, request.json or {})
+        if error:
+            return error
+        output_file = tts_request['output_file']
+        filename = tts_request['filename']
+        audio_url = tts_request['audio_url']
+
+        # 检查缓存
+        if tts_request['cached']:
             return jsonify({
                 'success': True,
                 'audio_url': audio_url,
                 'filename': filename,
                 'cached': True
             })
-        
-        # 调用 TTS 生成语音
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            loop.run_until_complete(tts_src.submit_text(config, filtered_text, str(output_file)))
-        finally:
-            loop.close()
-        
+
+        # 调用 TTS 服务生成语音（复用常驻事件循环和 WebSocket 连接），
+        # 同一段文本的并发请求（重复点击、多个标签页）共享一次合成
+        get_single_flight('tts').do(tts_request['cache_key'], _synthesize_to_cache, tts_request)
+
         # 检查文件是否生成成功
         if not output_file.exists():
             return jsonify({'error': '语音生成失败'}), 500
-        
-        # 生成访问URL
-        relative_path = f"audio/response_audio/{safe_email}/{filename}"
-        audio_url = url_for('static', filename=relative_path)
-        
+
         return jsonify({
             'success': True,
             'audio_url': audio_url,
             'filename': filename,
             'cached': False
         })
-        
+
     except Exception as e:
         print(f'TTS 生成错误: {e}')
         import traceback
         traceback.print_exc()
         return jsonify({'error': f'语音生成失败: {str(e)}'}), 500
 
+
+@tts_api_bp.route('/tts/stream', methods=['POST'])
+def tts_stream_api():
+    """
+    流式 TTS：立即开始合成并返回流地址
+
+    已缓存时直接返回 audio_url；否则返回 stream_url，浏览器请求该地址即可边合成边播放，
+    合成完成后音频同时保存到 audio_url 对应的缓存文件。
+    """
+    try:
+        user_email = session.get('email')
+        if not user_email:
+            return jsonify({'error': '登录了吗，就想榨干我的Token(￣へ￣)'}), 401
+
+        tts_request, error = _prepare_tts_request(user_email, request.json or {})
+        if error:
+            return error
+        output_file = tts_request['output_file']
+        filename = tts_request['filename']
+        audio_url = tts_request['audio_url']
+
+        if tts_request['cached']:
+            return jsonify({
+                'success': True,
+                'audio_url': audio_url,
+                'filename': filename,
+                'cached': True
+            })
+
+        cache_key = tts_request['cache_key']
+        stream = get_stream_registry().start(
+            tts_request['text'],
+            output_file,
+            owner=user_email,
+            on_saved=lambda path: get_tts_cache().add(cache_key, path)
+        )
+        return jsonify({
+            'success': True,
+            'stream_url': url_for('.tts_stream_audio', stream_id=stream.stream_id),
+            'audio_url': audio_url,
+            'filename': filename,
+            'cached': False
+        })
+
+    except Exception as e:
+        print(f'TTS 流式生成错误: {e}')
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'语音生成失败: {str(e)}'}), 500
+
+
+@tts_api_bp.route('/tts/stream/<stream_id>', methods=['GET'])
+def tts_stream_audio(stream_id):
+    """以分块 audio/mpeg 的形式转发正在合成的音频"""
+    user_email = session.get('email')
+    if not user_email:
+        return jsonify({'error': '未登录'}), 401
+
+    stream = get_stream_registry().get(stream_id)
+    if stream is None or not stream.is_owner(user_email):
+        return jsonify({'error': '音频流不存在或已过期'}), 404
+
+    return Response(
+        stream_with_context(stream.iter_chunks()),
+        mimetype='audio/mpeg',
+        headers={
+            'Cache-Control': 'no-store',
+            'X-Accel-Buffering': 'no'  # 关闭反向代理缓冲，保证首帧尽快到达
+        }
+    )
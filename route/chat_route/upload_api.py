@@ -5,13 +5,22 @@
 """
 import os
 from flask import Blueprint, request, jsonify, session, url_for
-from werkzeug.utils import secure_filename
 from route.chat_route.utils import recognize_image
+from components.media import vision_data_url, get_vision_cache, save_upload
 
 # 创建蓝图
 upload_api_bp = Blueprint('upload_api', __name__)
 
 
+def recognize_uploaded_image(image_bytes, filename):
+    """识别上传的图片（磁盘上保留原图，发送缩小压缩后的副本）"""
+    return recognize_image(image_base64=vision_data_url(image_bytes, filename=filename))
+
+
+def _has_description(result):
+    return bool(result and result.get('description'))
+
+
 @upload_api_bp.route('/chat/upload-image', methods=['POST'])
 def upload_image():
     """上传图片并识别"""
@@ -35,50 +44,24 @@ def upload_image():
         if file_ext not in allowed_extensions:
             return jsonify({'error': f'不支持的文件格式，仅支持: {", ".join(allowed_extensions)}'}), 400
         
-        # 确保上传目录存在
-        upload_dir = os.path.join('static', 'users', 'chat_upload')
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # 生成文件名：邮箱_序号.扩展名
-        safe_email = user_email.replace('@', '_at_').replace('.', '_')
-        safe_email = secure_filename(safe_email)
-        
-        # 查找已存在的文件，确定序号
-        existing_files = [f for f in os.listdir(upload_dir) if f.startswith(safe_email + '_')]
-        if existing_files:
-            # 提取最大序号
-            max_num = 0
-            for f in existing_files:
-                try:
-                    # 文件名格式：邮箱_序号.扩展名
-                    parts = f.rsplit('.', 1)
-                    if len(parts) == 2:
-                        num_part = parts[0].rsplit('_', 1)[-1]
-                        num = int(num_part)
-                        if num > max_num:
-                            max_num = num
-                except:
-                    pass
-            file_num = max_num + 1
-        else:
-            file_num = 1
+        # 保存到用户上传目录，文件名：邮箱_序号.扩展名（序号由计数器原子分配）
+        filename, file_path, static_path = save_upload(file, user_email, file_ext)
         
-        filename = f"{safe_email}_{file_num}{file_ext}"
-        file_path = os.path.join(upload_dir, filename)
-        
-        # 保存文件
-        file.save(file_path)
-        
-        # 调用图片识别（使用本地文件路径，自动转换为 base64）
+        # 调用图片识别（预处理后转换为 base64）：重复上传的图片直接使用缓存的识别结果，
+        # 同一张图片的并发上传共享一次识别
         try:
-            result = recognize_image(image_path=file_path)
+            with open(file_path, 'rb') as f:
+                image_bytes = f.read()
+            result = get_vision_cache('recognize_image').get_or_compute(
+                image_bytes, recognize_uploaded_image, image_bytes, filename, cacheable=_has_description
+            )
             description = result.get('description', '无法识别图片内容')
         except Exception as e:
             print(f'图片识别失败: {e}')
             description = '图片识别失败，但已成功上传'
         
         # 生成图片URL
-        image_url = url_for('static', filename=f"users/chat_upload/{filename}")
+        image_url = url_for('static', filename=static_path)
         
         return jsonify({
             'success': True,
@@ -115,42 +98,11 @@ def upload_video():
         if file_ext not in allowed_extensions:
             return jsonify({'error': f'不支持的文件格式，仅支持: {", ".join(allowed_extensions)}'}), 400
         
-        # 确保上传目录存在
-        upload_dir = os.path.join('static', 'users', 'chat_upload')
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # 生成文件名：邮箱_序号.扩展名
-        safe_email = user_email.replace('@', '_at_').replace('.', '_')
-        safe_email = secure_filename(safe_email)
-        
-        # 查找已存在的文件，确定序号
-        existing_files = [f for f in os.listdir(upload_dir) if f.startswith(safe_email + '_')]
-        if existing_files:
-            # 提取最大序号
-            max_num = 0
-            for f in existing_files:
-                try:
-                    # 文件名格式：邮箱_序号.扩展名
-                    parts = f.rsplit('.', 1)
-                    if len(parts) == 2:
-                        num_part = parts[0].rsplit('_', 1)[-1]
-                        num = int(num_part)
-                        if num > max_num:
-                            max_num = num
-                except:
-                    pass
-            file_num = max_num + 1
-        else:
-            file_num = 1
-        
-        filename = f"{safe_email}_{file_num}{file_ext}"
-        file_path = os.path.join(upload_dir, filename)
-        
-        # 保存文件
-        file.save(file_path)
+        # 保存到用户上传目录，文件名：邮箱_序号.扩展名（与图片共用序号）
+        filename, file_path, static_path = save_upload(file, user_email, file_ext)
         
         # 生成访问URL
-        video_url = url_for('static', filename=f'users/chat_upload/{filename}')
+        video_url = url_for('static', filename=static_path)
         
         return jsonify({
             'success': True,
@@ -1,29 +1,122 @@
 # -*- coding: utf-8 -*-
 """
 聊天路由工具函数
+多模态模型（图像识别 seed1.8、图像生成 seedream、视频生成 seedance）按需加载：
+模块在第一次调用对应功能时才执行（文件名包含点号，通过 importlib 按路径加载），
+各模块中的客户端也在第一次请求时才创建，应用启动时不再执行这些模块。
 """
 import importlib.util
+import threading
+import time
 from pathlib import Path
 
-# 导入 seed1.8.py 模块（文件名包含点号，需要特殊处理）
-seed_module_path = Path(__file__).parent.parent.parent / 'config' / 'llm' / 'base' / 'models' / 'multi_content' / 'seed1.8.py'
-spec = importlib.util.spec_from_file_location("seed1_8", str(seed_module_path))
-seed1_8 = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(seed1_8)
-recognize_image = seed1_8.recognize_image
+# 多模态模型模块所在目录
+MODELS_DIR = Path(__file__).parent.parent.parent / 'config' / 'llm' / 'base' / 'models' / 'multi_content'
 
-# 导入 seedream.py 和 seedance.py 模块
-seedream_module_path = Path(__file__).parent.parent.parent / 'config' / 'llm' / 'base' / 'models' / 'multi_content' / 'seedream.py'
-spec_seedream = importlib.util.spec_from_file_location("seedream", str(seedream_module_path))
-seedream = importlib.util.module_from_spec(spec_seedream)
-spec_seedream.loader.exec_module(seedream)
-generate_image = seedream.generate_image
+# 提供方名称 -> (模块名, 文件名)
+PROVIDERS = {
+    'recognition': ('seed1_8', 'seed1.8.py'),
+    'image': ('seedream', 'seedream.py'),
+    'video': ('seedance', 'seedance.py')
+}
 
-seedance_module_path = Path(__file__).parent.parent.parent / 'config' / 'llm' / 'base' / 'models' / 'multi_content' / 'seedance.py'
-spec_seedance = importlib.util.spec_from_file_location("seedance", str(seedance_module_path))
-seedance = importlib.util.module_from_spec(spec_seedance)
-spec_seedance.loader.exec_module(seedance)
-generate_video = seedance.generate_video
 
-__all__ = ['recognize_image', 'generate_image', 'generate_video']
+class ProviderRegistry:
+    """
+    多模态模型模块的延迟加载注册表（线程安全）
 
+    每个提供方只加载一次；不同提供方各自加锁，加载视频模块不会阻塞图像识别。
+    加载失败时不缓存，下次调用重新加载。
+
+    Args:
+        providers: 提供方名称 -> (模块名, 文件名)
+        models_dir: 模块所在目录
+    """
+
+    def __init__(self, providers=PROVIDERS, models_dir=MODELS_DIR):
+        self.providers = dict(providers)
+        self.models_dir = Path(models_dir)
+        self._modules = {}
+        self._load_times = {}
+        self._locks = {name: threading.Lock() for name in self.providers}
+
+    def get(self, name):
+        """获取提供方模块，首次调用时加载"""
+        module = self._modules.get(name)
+        if module is not None:
+            return module
+        if name not in self.providers:
+            raise KeyError(f'未知的多模态模型提供方: {name}')
+
+        with self._locks[name]:
+            module = self._modules.get(name)
+            if module is None:
+                module_name, filename = self.providers[name]
+                start = time.perf_counter()
+                spec = importlib.util.spec_from_file_location(module_name, str(self.models_dir / filename))
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                self._load_times[name] = (time.perf_counter() - start) * 1000
+                self._modules[name] = module
+                print(f"📦 [多模态模型] 已加载 {filename}，耗时 {self._load_times[name]:.0f} ms")
+        return module
+
+    def loaded(self):
+        """已加载的提供方及加载耗时（毫秒）"""
+        return {name: round(ms, 1) for name, ms in self._load_times.items()}
+
+
+_registry = ProviderRegistry()
+
+
+def get_provider(name):
+    """获取多模态模型模块：recognition / image / video"""
+    return _registry.get(name)
+
+
+def recognize_image(*args, **kwargs):
+    """图像识别（seed1.8），参数见 seed1.8.recognize_image"""
+    return get_provider('recognition').recognize_image(*args, **kwargs)
+
+
+def generate_image(*args, **kwargs):
+    """生成图片并下载（seedream），参数见 seedream.generate_image"""
+    return get_provider('image').generate_image(*args, **kwargs)
+
+
+def create_image(*args, **kwargs):
+    """生成图片并返回云端URL（seedream），参数见 seedream.create_image"""
+    return get_provider('image').create_image(*args, **kwargs)
+
+
+def generate_video(*args, **kwargs):
+    """生成视频并下载（seedance），参数见 seedance.generate_video"""
+    return get_provider('video').generate_video(*args, **kwargs)
+
+
+def create_video_task(*args, **kwargs):
+    """创建视频生成任务（seedance），参数见 seedance.create_video_task"""
+    return get_provider('video').create_video_task(*args, **kwargs)
+
+
+def get_video_task(*args, **kwargs):
+    """查询视频生成任务（seedance），参数见 seedance.get_video_task"""
+    return get_provider('video').get_video_task(*args, **kwargs)
+
+
+def download_video(*args, **kwargs):
+    """下载视频（seedance），参数见 seedance.download_video"""
+    return get_provider('video').download_video(*args, **kwargs)
+
+
+__all__ = [
+    'ProviderRegistry',
+    'get_provider',
+    'recognize_image',
+    'generate_image',
+    'create_image',
+    'generate_video',
+    'create_video_task',
+    'get_video_task',
+    'download_video'
+]
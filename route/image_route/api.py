@@ -5,7 +5,7 @@
 """
 from flask import Blueprint, request, jsonify, session
 from tools.send_pics.emoji_manager import (
-    load_emoji_database,
+    get_emoji_snapshot,
     get_emoji_info,
     get_emoji_url,
     find_matching_emojis
@@ -34,15 +34,15 @@ def generate_image():
 def get_emojis():
     """获取所有表情包列表"""
     try:
-        database = load_emoji_database()
+        snapshot = get_emoji_snapshot()
         # 只返回基本信息，不包含完整路径
         emojis = []
-        for emoji in database:
+        for emoji in snapshot.database:
             emojis.append({
                 'id': emoji.get('id'),
                 'category': emoji.get('category'),
                 'description': emoji.get('description'),
-                'url': get_emoji_url(emoji.get('id'))
+                'url': snapshot.urls.get(emoji.get('id')) or get_emoji_url(emoji.get('id'))
             })
         return jsonify({
             'success': True,
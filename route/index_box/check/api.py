@@ -3,13 +3,13 @@
 打卡功能API路由
 处理打卡截图识别和微信推送功能
 """
-import os
-import base64
 from datetime import datetime, date
 from flask import Blueprint, request, jsonify, session
 from werkzeug.utils import secure_filename
 from components.check.recognition import analyze_check_in_screenshot
+from components.media import vision_data_url, get_vision_cache
 from components.check.message_wechat_push import push_wechat_message
+from components.check.check_store import get_items_with_today_status
 from database import get_db_connection
 
 # 创建蓝图
@@ -24,6 +24,15 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in [ext.lstrip('.') for ext in ALLOWED_EXTENSIONS]
 
 
+def analyze_screenshot_bytes(file_bytes, filename):
+    """预处理截图并识别"""
+    return analyze_check_in_screenshot(image_base64=vision_data_url(file_bytes, filename=filename))
+
+
+def _is_recognized(result):
+    return bool(result and result.get('success'))
+
+
 @check_api_bp.route('/check/analyze', methods=['POST'])
 def analyze_check_in():
     """分析打卡截图"""
@@ -57,24 +66,14 @@ def analyze_check_in():
                 'error': f'不支持的文件格式，仅支持: {", ".join(ALLOWED_EXTENSIONS)}'
             }), 400
         
-        # 读取文件并转换为 base64
+        # 读取文件（识别前缩小压缩后再转换为 base64）
         file_bytes = file.read()
-        file_base64 = base64.b64encode(file_bytes).decode('utf-8')
-        
-        # 根据文件扩展名确定 MIME 类型
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        mime_types = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.webp': 'image/webp'
-        }
-        mime_type = mime_types.get(file_ext, 'image/jpeg')
-        image_base64 = f"data:{mime_type};base64,{file_base64}"
         
-        # 调用识别函数
-        result = analyze_check_in_screenshot(image_base64=image_base64)
+        # 调用识别函数：重复上传的截图直接使用缓存的识别结果（只缓存识别成功的结果），
+        # 同一张截图的并发请求共享一次识别
+        result = get_vision_cache('check_recognition').get_or_compute(
+            file_bytes, analyze_screenshot_bytes, file_bytes, file.filename, cacheable=_is_recognized
+        )
         
         # 如果识别成功，尝试更新打卡状态
         if result.get('success') and result.get('app_name') != 'unknown':
@@ -204,57 +203,13 @@ def get_check_list():
                 'error': '请先登录'
             }), 401
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        # 有效打卡项及今日状态（一条 JOIN 查询）
+        items = get_items_with_today_status(user_id)
         
-        try:
-            # 获取今日日期
-            today = date.today().isoformat()
-            
-            # 获取用户的打卡清单
-            cursor.execute('''
-                SELECT id, app_name, is_active, created_at, updated_at
-                FROM check_list
-                WHERE user_id = ? AND is_active = 1
-                ORDER BY created_at ASC
-            ''', (user_id,))
-            
-            items = []
-            for row in cursor.fetchall():
-                item_id = row['id']
-                app_name = row['app_name']
-                
-                # 查询今日打卡状态
-                cursor.execute('''
-                    SELECT check_status, check_in_date, details, confidence
-                    FROM check_record
-                    WHERE user_id = ? AND check_list_id = ? AND check_date = ?
-                ''', (user_id, item_id, today))
-                
-                record = cursor.fetchone()
-                status = record['check_status'] if record else 'pending'
-                check_in_date = record['check_in_date'] if record else None
-                details = record['details'] if record else None
-                confidence = record['confidence'] if record else None
-                
-                items.append({
-                    'id': item_id,
-                    'app_name': app_name,
-                    'status': status,
-                    'check_in_date': check_in_date,
-                    'details': details,
-                    'confidence': confidence,
-                    'created_at': row['created_at'],
-                    'updated_at': row['updated_at']
-                })
-            
-            return jsonify({
-                'success': True,
-                'data': items
-            })
-            
-        finally:
-            conn.close()
+        return jsonify({
+            'success': True,
+            'data': items
+        })
             
     except Exception as e:
         return jsonify({
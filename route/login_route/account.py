@@ -1,5 +1,7 @@
 from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
-from database import get_db_connection
+from database import get_db_connection, get_db
+from components.user_cache import get_user_profile, invalidate_user_profile
+from components.project_likes import DAILY_LIKE_LIMIT, get_total_likes, get_today_like_count, add_like
 from components.cloudfare.turnstile import verify_turnstile_token, get_turnstile_site_key
 from components.gd_location import reverse_geocode
 import os
@@ -23,32 +25,19 @@ def account_profile():
     if not user_id:
         return jsonify({'success': False, 'message': '未登录'}), 401
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            '''
-            SELECT id, username, email, created_at
-            FROM user_profile
-            WHERE id = ?
-            ''',
-            (user_id,)
-        )
-        user = cursor.fetchone()
-
-        if not user:
-            return jsonify({'success': False, 'message': '用户不存在'}), 404
-
-        # 仅返回必要字段，避免暴露密码
-        profile = {
-            'id': user['id'],
-            'username': user['username'],
-            'email': user['email'],
-            'created_at': user['created_at']
-        }
-        return jsonify({'success': True, 'data': profile})
-    finally:
-        conn.close()
+    # 用户资料缓存（不含密码）
+    user = get_user_profile(user_id)
+    if not user:
+        return jsonify({'success': False, 'message': '用户不存在'}), 404
+
+    # 仅返回必要字段，避免暴露密码
+    profile = {
+        'id': user['id'],
+        'username': user['username'],
+        'email': user['email'],
+        'created_at': user['created_at']
+    }
+    return jsonify({'success': True, 'data': profile})
 
 
 @account_bp.route('/api/account/apply-creator', methods=['POST'])
@@ -76,6 +65,7 @@ def apply_creator():
     try:
         cursor.execute('UPDATE user_profile SET role = ? WHERE id = ?', (new_role, user_id))
         conn.commit()
+        invalidate_user_profile(user_id)
         session['role'] = new_role
         role_label = '创作者' if new_role == 1 else '管理员' if new_role == 2 else '用户'
         return jsonify({'success': True, 'message': f'身份已更新为：{role_label}', 'role': new_role, 'role_label': role_label})
@@ -124,6 +114,7 @@ def change_password():
         # 更新密码
         cursor.execute('UPDATE user_profile SET password = ? WHERE id = ?', (new_password, user_id))
         conn.commit()
+        invalidate_user_profile(user_id)
         
         return jsonify({'success': True, 'message': '密码修改成功'})
     finally:
@@ -161,6 +152,7 @@ def change_password_by_username():
         # 更新密码
         cursor.execute('UPDATE user_profile SET password = ? WHERE id = ?', (new_password, user['id']))
         conn.commit()
+        invalidate_user_profile(user['id'])
         
         return jsonify({'success': True, 'message': '密码修改成功'})
     finally:
@@ -195,23 +187,16 @@ def verify_admin():
         # 配置了 Turnstile 但没有提供 token
         return jsonify({'success': False, 'message': '人机验证token缺失'}), 400
     
-    # 验证管理员身份
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('SELECT role FROM user_profile WHERE id = ?', (user_id,))
-        user = cursor.fetchone()
-        
-        if not user:
-            return jsonify({'success': False, 'message': '用户不存在'}), 404
-        
-        # role 为 2 表示管理员
-        if user['role'] != 2:
-            return jsonify({'success': False, 'message': '您不是管理员，无权限访问'}), 403
-        
-        return jsonify({'success': True, 'message': '管理员验证通过'})
-    finally:
-        conn.close()
+    # 验证管理员身份（用户资料缓存）
+    user = get_user_profile(user_id)
+    if not user:
+        return jsonify({'success': False, 'message': '用户不存在'}), 404
+    
+    # role 为 2 表示管理员
+    if user['role'] != 2:
+        return jsonify({'success': False, 'message': '您不是管理员，无权限访问'}), 403
+    
+    return jsonify({'success': True, 'message': '管理员验证通过'})
 
 
 @account_bp.route('/api/account/turnstile-site-key', methods=['GET'])
@@ -477,20 +462,12 @@ def get_location_info():
 
 @account_bp.route('/api/account/project-likes/count', methods=['GET'])
 def get_project_likes_count():
-    """获取项目总点赞数"""
+    """获取项目总点赞数（读取计数表，短时间缓存）"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute('SELECT COUNT(*) as total FROM project_likes')
-            result = cursor.fetchone()
-            total_likes = result['total'] if result else 0
-            return jsonify({
-                'success': True,
-                'count': total_likes
-            })
-        finally:
-            conn.close()
+        return jsonify({
+            'success': True,
+            'count': get_total_likes()
+        })
     except Exception as e:
         return jsonify({
             'success': False,
@@ -506,23 +483,10 @@ def get_today_likes_count():
         return jsonify({'success': False, 'message': '未登录'}), 401
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        try:
-            from datetime import date
-            today = date.today().isoformat()
-            cursor.execute(
-                'SELECT COUNT(*) as count FROM project_likes WHERE user_id = ? AND like_date = ?',
-                (user_id, today)
-            )
-            result = cursor.fetchone()
-            today_count = result['count'] if result else 0
-            return jsonify({
-                'success': True,
-                'count': today_count
-            })
-        finally:
-            conn.close()
+        return jsonify({
+            'success': True,
+            'count': get_today_like_count(user_id)
+        })
     except Exception as e:
         return jsonify({
             'success': False,
@@ -538,46 +502,20 @@ def like_project():
         return jsonify({'success': False, 'message': '未登录'}), 401
     
     try:
-        from datetime import date
-        today = date.today().isoformat()
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        try:
-            # 检查今日已点赞数
-            cursor.execute(
-                'SELECT COUNT(*) as count FROM project_likes WHERE user_id = ? AND like_date = ?',
-                (user_id, today)
-            )
-            result = cursor.fetchone()
-            today_count = result['count'] if result else 0
-            
-            if today_count >= 10:
-                return jsonify({
-                    'success': False,
-                    'message': '今日点赞次数已达上限（10次）'
-                }), 400
-            
-            # 添加点赞记录
-            cursor.execute(
-                'INSERT INTO project_likes (user_id, like_date) VALUES (?, ?)',
-                (user_id, today)
-            )
-            conn.commit()
-            
-            # 获取总点赞数
-            cursor.execute('SELECT COUNT(*) as total FROM project_likes')
-            total_result = cursor.fetchone()
-            total_likes = total_result['total'] if total_result else 0
-            
+        # 检查上限和写入是同一条语句，并发点赞不会超过每日上限
+        result = add_like(user_id, conn=get_db())
+        if not result['added']:
             return jsonify({
-                'success': True,
-                'message': '点赞成功',
-                'total_count': total_likes,
-                'today_count': today_count + 1
-            })
-        finally:
-            conn.close()
+                'success': False,
+                'message': f'今日点赞次数已达上限（{DAILY_LIKE_LIMIT}次）'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'message': '点赞成功',
+            'total_count': result['total_count'],
+            'today_count': result['today_count']
+        })
     except Exception as e:
         return jsonify({
             'success': False,
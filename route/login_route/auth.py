@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, session
 from database import get_db_connection
+from components.user_cache import get_current_user, invalidate_user_profile
 from config.llm.base.history import create_history_file
 from pathlib import Path
 import sqlite3
@@ -95,6 +96,7 @@ def register_api():
                 VALUES (?, ?, ?, ?)
             ''', (username, password, email, 0))
             conn.commit()
+            invalidate_user_profile(cursor.lastrowid)
             
             # 创建用户的历史记录文件
             try:
@@ -132,26 +134,19 @@ def auth_status():
     if not user_id:
         return jsonify({'success': True, 'logged_in': False})
     
-    # 确保会话中有角色信息
-    role = session.get('role')
-    if role is None:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute('SELECT role FROM user_profile WHERE id = ?', (user_id,))
-            user = cursor.fetchone()
-            role = user['role'] if user else 0
-            session['role'] = role
-        finally:
-            conn.close()
+    # 资料和角色从用户资料缓存读取（角色修改后 session 中的值会过期）
+    user = get_current_user()
+    if user is None:
+        return jsonify({'success': True, 'logged_in': False})
+    session['role'] = user['role']
     return jsonify({
         'success': True,
         'logged_in': True,
         'user': {
             'id': user_id,
-            'username': session.get('username'),
-            'email': session.get('email'),
-            'role': role
+            'username': user['username'],
+            'email': user['email'],
+            'role': user['role']
         }
     })
 
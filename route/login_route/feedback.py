@@ -1,5 +1,5 @@
 from flask import Blueprint, render_template, request, jsonify, session
-from components.email.email_sender import send_email
+from components.email import enqueue_email
 from datetime import datetime
 import os
 from werkzeug.utils import secure_filename
@@ -192,8 +192,8 @@ def feedback_api():
         subject = f'用户反馈 - {username}'
         
         try:
-            # 如果有图片，将图片路径列表传递给邮件发送函数
-            send_email(recipient_email, subject, html_content, 'html', image_paths=image_paths if image_paths else None)
+            # 写入发件箱，由后台线程发送（图片在入队时编码进邮件）
+            enqueue_email(recipient_email, subject, html_content, 'html', image_paths=image_paths if image_paths else None)
             return jsonify({'success': True, 'message': '反馈提交成功'})
         except Exception as e:
             return jsonify({'success': False, 'message': f'发送邮件失败: {str(e)}'}), 500
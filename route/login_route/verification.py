@@ -1,16 +1,21 @@
 from flask import Blueprint, request, jsonify
-from components.email.email_sender import send_verification_code
+from components.email import enqueue_email, verification_code_content
+from components.kv_store import get_kv_store
+import os
 import random
 import string
-import time
-from threading import Lock
 
 verification_bp = Blueprint('verification', __name__)
 
-# 验证码存储（邮箱 -> {code, timestamp}）
-verification_codes = {}
-code_lock = Lock()
 CODE_EXPIRE_TIME = 600  # 验证码有效期10分钟（秒）
+SEND_INTERVAL = int(os.getenv('VERIFICATION_SEND_INTERVAL', '60'))  # 同一邮箱两次发送的最小间隔（秒）
+SEND_HOURLY_LIMIT = int(os.getenv('VERIFICATION_SEND_HOURLY_LIMIT', '10'))  # 同一邮箱每小时最多发送次数
+MAX_VERIFY_ATTEMPTS = 5  # 每个验证码允许的错误次数，超过后作废
+
+
+def _store():
+    # 验证码存储（code:邮箱 -> 验证码，throttle:/hourly: 发送限流，attempts: 错误次数），过期自动清理
+    return get_kv_store('verification')
 
 
 @verification_bp.route('/api/send-verification-code', methods=['POST'])
@@ -23,21 +28,28 @@ def send_verification_code_api():
         if not email:
             return jsonify({'success': False, 'message': 'Email is required'}), 400
         
+        store = _store()
+        
+        # 发送限流：间隔内只有一个请求能占到发送权
+        if not store.add(f'throttle:{email}', 1, SEND_INTERVAL):
+            return jsonify({'success': False, 'message': f'Please wait {SEND_INTERVAL} seconds before requesting another code'}), 429
+        if store.incr(f'hourly:{email}', 3600) > SEND_HOURLY_LIMIT:
+            return jsonify({'success': False, 'message': 'Too many verification codes requested, please try again later'}), 429
+        
         # 生成6位数字验证码
         code = ''.join(random.choices(string.digits, k=6))
         
-        # 存储验证码（带时间戳）
-        with code_lock:
-            verification_codes[email] = {
-                'code': code,
-                'timestamp': time.time()
-            }
+        # 存储验证码（新验证码替换旧的，错误次数重新计算）
+        store.set(f'code:{email}', code, CODE_EXPIRE_TIME)
+        store.delete(f'attempts:{email}')
         
-        # 发送验证码邮件
+        # 验证码邮件写入发件箱，由后台线程发送
         try:
-            send_verification_code(email, code)
+            enqueue_email(email, *verification_code_content(code))
             return jsonify({'success': True, 'message': 'Verification code sent successfully'})
         except Exception as e:
+            # 入队失败不占用发送间隔，允许立即重试
+            store.delete(f'throttle:{email}')
             return jsonify({'success': False, 'message': f'Failed to send email: {str(e)}'}), 500
             
     except Exception as e:
@@ -55,27 +67,24 @@ def verify_code_api():
         if not email or not code:
             return jsonify({'success': False, 'message': 'Email and code are required'}), 400
         
-        with code_lock:
-            if email not in verification_codes:
+        store = _store()
+        stored_code = store.get(f'code:{email}')
+        if stored_code is None:
+            return jsonify({'success': False, 'message': 'Verification code not found or expired'}), 400
+        
+        # 验证验证码
+        if code == stored_code:
+            # 验证成功，删除验证码；并发提交同一验证码时只有删除成功的请求通过
+            if not store.delete(f'code:{email}'):
                 return jsonify({'success': False, 'message': 'Verification code not found or expired'}), 400
-            
-            stored_data = verification_codes[email]
-            stored_code = stored_data['code']
-            timestamp = stored_data['timestamp']
-            
-            # 检查验证码是否过期
-            if time.time() - timestamp > CODE_EXPIRE_TIME:
-                del verification_codes[email]
-                return jsonify({'success': False, 'message': 'Verification code has expired'}), 400
-            
-            # 验证验证码
-            if code == stored_code:
-                # 验证成功，删除验证码
-                del verification_codes[email]
-                return jsonify({'success': True, 'message': 'Verification successful'})
-            else:
-                return jsonify({'success': False, 'message': 'Invalid verification code'}), 400
+            store.delete(f'attempts:{email}')
+            return jsonify({'success': True, 'message': 'Verification successful'})
+        
+        # 错误次数过多时作废验证码，防止穷举
+        if store.incr(f'attempts:{email}', CODE_EXPIRE_TIME) >= MAX_VERIFY_ATTEMPTS:
+            store.delete(f'code:{email}')
+            return jsonify({'success': False, 'message': 'Too many failed attempts, please request a new code'}), 400
+        return jsonify({'success': False, 'message': 'Invalid verification code'}), 400
                 
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
-
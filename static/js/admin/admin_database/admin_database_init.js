@@ -8,6 +8,8 @@
         perPage: 20,
         columns: [],
         totalPages: 1,
+        pageQuery: '',
+        cursors: null,
         editingRow: null,
 
         // 初始化
@@ -33,6 +33,7 @@
 
         this.currentTable = tableName;
         this.currentPage = 1;
+        this.pageQuery = '';
         await this.loadTableSchema();
         await this.loadTableData();
     };
@@ -56,9 +57,12 @@
         }
     };
 
-    // 加载表数据
-    dbManager.loadTableData = async function () {
+    // 加载表数据（pageQuery 为分页参数：after / before 游标、last=1 或 page）
+    dbManager.loadTableData = async function (pageQuery) {
         if (!this.currentTable) return;
+        if (pageQuery !== undefined) {
+            this.pageQuery = pageQuery;
+        }
 
         const container = document.getElementById('tableContainer');
         if (container) {
@@ -67,14 +71,22 @@
 
         try {
             const response = await fetch(
-                `/admin/api/database/table/${this.currentTable}/data?page=${this.currentPage}&per_page=${this.perPage}`
+                `/admin/api/database/table/${this.currentTable}/data?page=${this.currentPage}&per_page=${this.perPage}` +
+                (this.pageQuery ? `&${this.pageQuery}` : '')
             );
             const data = await response.json();
 
             if (data.success) {
+                this.currentPage = data.page;
                 this.totalPages = data.total_pages;
+                this.cursors = {
+                    next: data.next_cursor,
+                    prev: data.prev_cursor,
+                    hasNext: data.has_next,
+                    hasPrev: data.has_prev
+                };
                 this.renderTable(data.data, data.columns);
-                this.renderPagination(data.total, data.page, data.total_pages);
+                this.renderPagination(data.total, data.page, data.total_pages, data.total_approximate);
             } else {
                 if (container) {
                     container.innerHTML = `<div class="empty-state"><p>加载失败: ${data.message}</p></div>`;
@@ -130,26 +142,43 @@
     };
 
     // 渲染分页
-    dbManager.renderPagination = function (total, page, totalPages) {
+    dbManager.renderPagination = function (total, page, totalPages, approximate) {
         const container = document.getElementById('paginationContainer');
         if (!container) return;
 
+        const hasPrev = this.cursors ? this.cursors.hasPrev : page > 1;
+        const hasNext = this.cursors ? this.cursors.hasNext : page < totalPages;
+        const exportUrl = `/admin/api/database/table/${this.currentTable}/export`;
+
         container.innerHTML = `
             <div class="pagination">
-                <button onclick="dbManager.goToPage(1)" ${page === 1 ? 'disabled' : ''}>首页</button>
-                <button onclick="dbManager.goToPage(${page - 1})" ${page === 1 ? 'disabled' : ''}>上一页</button>
-                <span class="page-info">第 ${page} / ${totalPages} 页，共 ${total} 条</span>
-                <button onclick="dbManager.goToPage(${page + 1})" ${page === totalPages ? 'disabled' : ''}>下一页</button>
-                <button onclick="dbManager.goToPage(${totalPages})" ${page === totalPages ? 'disabled' : ''}>末页</button>
+                <button onclick="dbManager.goToPage(1)" ${!hasPrev ? 'disabled' : ''}>首页</button>
+                <button onclick="dbManager.goToPage(${page - 1})" ${!hasPrev ? 'disabled' : ''}>上一页</button>
+                <span class="page-info">第 ${page} / ${totalPages} 页，共 ${approximate ? '约 ' : ''}${total} 条</span>
+                <button onclick="dbManager.goToPage(${page + 1})" ${!hasNext ? 'disabled' : ''}>下一页</button>
+                <button onclick="dbManager.goToPage(${totalPages})" ${!hasNext ? 'disabled' : ''}>末页</button>
+                <a class="btn btn-secondary" href="${exportUrl}?format=csv">导出 CSV</a>
+                <a class="btn btn-secondary" href="${exportUrl}?format=ndjson">导出 NDJSON</a>
             </div>
         `;
     };
 
-    // 跳转页面
+    // 跳转页面：相邻页用 rowid 游标，首页/末页直接定位，其余页按页码
     dbManager.goToPage = function (page) {
         if (page < 1 || page > this.totalPages) return;
+        const cursors = this.cursors || {};
+        let pageQuery = '';
+        if (page === 1) {
+            pageQuery = '';
+        } else if (page === this.currentPage + 1 && cursors.next !== null && cursors.next !== undefined) {
+            pageQuery = `after=${cursors.next}`;
+        } else if (page === this.currentPage - 1 && cursors.prev !== null && cursors.prev !== undefined) {
+            pageQuery = `before=${cursors.prev}`;
+        } else if (page === this.totalPages) {
+            pageQuery = 'last=1';
+        }
         this.currentPage = page;
-        this.loadTableData();
+        this.loadTableData(pageQuery);
     };
 
     // 删除行
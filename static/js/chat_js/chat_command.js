@@ -110,13 +110,14 @@ async function executeGeneration(type, prompt) {
 
     // 创建加载消息
     const loadingMessageId = addGenerationLoadingMessage(type);
+    let progressInterval = null;
 
     try {
         const endpoint = type === 'image' ? '/api/generate-image' : '/api/generate-video';
 
         // 开始进度更新（估算时间）
         const estimatedTime = type === 'image' ? 30 : 70; // 图片约30秒，视频约70秒
-        const progressInterval = startProgressUpdate(loadingMessageId, estimatedTime);
+        progressInterval = startProgressUpdate(loadingMessageId, estimatedTime);
 
         // 发送生成请求
         const mode = typeof currentMode !== 'undefined' ? currentMode : 'normal';
@@ -134,11 +135,6 @@ async function executeGeneration(type, prompt) {
             })
         });
 
-        // 清除进度更新
-        if (progressInterval) {
-            clearInterval(progressInterval);
-        }
-
         if (!response.ok) {
             if (response.status === 401) {
                 promptLoginRequired();
@@ -154,7 +150,20 @@ async function executeGeneration(type, prompt) {
             throw new Error(errorData.error || '生成失败');
         }
 
-        const data = await response.json();
+        let data = await response.json();
+
+        // 图片和视频都在后台生成：等待任务完成
+        if (data.success && data.job_id) {
+            data = await waitForGenerationJob(data, loadingMessageId);
+            if (data.status === 'failed') {
+                throw new Error(data.error || '生成失败');
+            }
+        }
+
+        // 清除进度更新
+        if (progressInterval) {
+            clearInterval(progressInterval);
+        }
 
         // 移除加载消息
         removeGenerationLoadingMessage(loadingMessageId);
@@ -197,10 +206,77 @@ async function executeGeneration(type, prompt) {
         }
     } catch (error) {
         console.error('生成错误:', error);
+        if (progressInterval) {
+            clearInterval(progressInterval);
+        }
         updateGenerationLoadingMessage(loadingMessageId, `生成失败：${error.message}`, true);
     }
 }
 
+// 等待后台生成任务完成（优先使用 SSE 推送进度，连接中断时改为轮询状态接口）
+function waitForGenerationJob(job, messageId) {
+    return new Promise((resolve, reject) => {
+        let finished = false;
+
+        const handleStatus = (status) => {
+            if (finished) return;
+            if (status.progress) {
+                const position = status.queue_position ? `（前面还有 ${status.queue_position} 个任务）` : '';
+                updateGenerationLoadingMessage(messageId, status.progress + position);
+            }
+            if (status.done) {
+                finished = true;
+                resolve(status);
+            }
+        };
+
+        const poll = async () => {
+            while (!finished) {
+                try {
+                    const response = await fetch(job.status_url);
+                    const status = await response.json();
+                    if (!response.ok) {
+                        finished = true;
+                        reject(new Error(status.error || '查询生成进度失败'));
+                        return;
+                    }
+                    handleStatus(status);
+                } catch (error) {
+                    console.error('查询生成进度失败:', error);
+                }
+                if (!finished) {
+                    await new Promise(r => setTimeout(r, 3000));
+                }
+            }
+        };
+
+        if (typeof EventSource === 'undefined' || !job.stream_url) {
+            poll();
+            return;
+        }
+
+        const source = new EventSource(job.stream_url);
+        source.onmessage = (event) => {
+            try {
+                const status = JSON.parse(event.data);
+                handleStatus(status);
+                if (status.done) {
+                    source.close();
+                }
+            } catch (error) {
+                console.error('解析生成进度失败:', error);
+            }
+        };
+        source.onerror = () => {
+            // 连接中断（或服务器在任务结束后关闭流）
+            source.close();
+            if (!finished) {
+                poll();
+            }
+        };
+    });
+}
+
 // 创建生成加载消息
 function addGenerationLoadingMessage(type) {
     const chatMessages = document.getElementById('chatMessages');
@@ -1391,13 +1391,14 @@ async function playTTS(text, button, messageId = null) {
 
         // 模态框已经在上面显示了，这里不需要再次显示
 
-        // 调用后端 API 生成语音（传递 message_id 用于缓存）
+        // 调用后端流式 API 生成语音（传递 message_id 用于缓存）
+        // 已缓存时返回 audio_url；否则返回 stream_url，边合成边播放，合成结果同时保存到 audio_url
         const requestBody = { text: text };
         if (messageId) {
             requestBody.message_id = messageId;
         }
 
-        const response = await fetch('/api/tts', {
+        const response = await fetch('/api/tts/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -1414,7 +1415,7 @@ async function playTTS(text, button, messageId = null) {
             throw new Error(data.error || '语音生成失败');
         }
 
-        // 将音频URL存储到按钮和缓存中
+        // 将音频URL存储到按钮和缓存中（流式播放时，合成完成后该地址即可直接访问）
         button.dataset.audioUrl = data.audio_url;
         if (messageId) {
             ttsAudioCache.set(messageId, data.audio_url);
@@ -1425,7 +1426,7 @@ async function playTTS(text, button, messageId = null) {
         button.classList.add('playing');
 
         // 创建音频元素并播放
-        const audio = new Audio(data.audio_url);
+        const audio = new Audio(data.cached ? data.audio_url : data.stream_url);
         currentAudio = audio;
 
         audio.onended = () => {
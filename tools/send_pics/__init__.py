@@ -5,7 +5,8 @@
 from tools.send_pics.emoji_manager import (
     load_emoji_database,
     find_matching_emojis,
-    get_emoji_info
+    get_emoji_info,
+    get_emoji_catalog
 )
 from tools.send_pics.send_pics import send_emoji
 
@@ -13,6 +14,7 @@ __all__ = [
     'load_emoji_database',
     'find_matching_emojis',
     'get_emoji_info',
+    'get_emoji_catalog',
     'send_emoji'
 ]
 
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+表情包与收藏图片目录
+把 emojis.json、表情包图片目录和收藏图片目录整理成只读快照：
+ID 索引、URL、已存在的表情包文件、收藏图片列表和匹配器。
+源文件或目录的修改时间变化时在后台重建快照并整体替换，
+读取方拿到的始终是一份完整的快照，不会看到构建到一半的索引。
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import quote
+
+from tools.send_pics.emoji_matcher import EmojiMatcher
+
+# 检查源文件变化的最小间隔（秒）
+RELOAD_CHECK_INTERVAL = 2.0
+
+# 收藏图片支持的格式
+FAVORITE_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'}
+
+# 表情包图片文件名后缀（{id}id.jpg）
+EMOJI_FILE_SUFFIX = 'id.jpg'
+
+
+def _signature(path: Path) -> Optional[Tuple[int, int]]:
+    """文件/目录的变化签名（修改时间, 大小），不存在时返回None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class EmojiSnapshot:
+    """
+    表情包目录的一份只读快照
+
+    Attributes:
+        database: 表情包信息列表（emojis.json 原始内容）
+        by_id: 表情包ID -> 表情包信息
+        urls: 表情包ID -> URL
+        emoji_files: 实际存在图片文件的表情包ID集合
+        matcher: 表情包匹配器
+        favorite_images: 收藏图片文件名列表
+        favorite_urls: 收藏图片文件名 -> URL
+    """
+
+    def __init__(self, database, emoji_files, favorite_images, signatures, matcher=None):
+        self.database: List[Dict[str, Any]] = database
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        for emoji in database:
+            # 与原线性查找一致：ID重复时以第一个为准
+            self.by_id.setdefault(emoji.get('id'), emoji)
+        self.urls: Dict[str, str] = {emoji_id: build_emoji_url(emoji_id) for emoji_id in self.by_id}
+        self.emoji_files: frozenset = frozenset(emoji_files)
+        self.matcher: EmojiMatcher = matcher if matcher is not None else EmojiMatcher(database)
+        self.favorite_images: Tuple[str, ...] = tuple(favorite_images)
+        self.favorite_urls: Dict[str, str] = {name: build_favorite_image_url(name) for name in self.favorite_images}
+        self.signatures = signatures
+
+
+def build_emoji_url(emoji_id: str) -> str:
+    """表情包的URL路径"""
+    return f"/static/imgs/表情包/src/all/{emoji_id}{EMOJI_FILE_SUFFIX}"
+
+
+def build_favorite_image_url(filename: str) -> str:
+    """收藏图片的URL路径（对文件名进行URL编码，处理中文和特殊字符）"""
+    return f"/static/imgs/fav_album/{quote(filename, safe='')}"
+
+
+class EmojiCatalog:
+    """
+    表情包目录（线程安全）
+
+    Args:
+        emoji_base_path: 表情包根目录（包含 json_description/ 和 src/all/）
+        favorite_path: 收藏图片目录
+        check_interval: 检查源文件变化的最小间隔（秒）
+    """
+
+    def __init__(self, emoji_base_path: Path, favorite_path: Path, check_interval: float = RELOAD_CHECK_INTERVAL):
+        self.json_path = emoji_base_path / 'json_description' / 'emojis.json'
+        self.emoji_dir = emoji_base_path / 'src' / 'all'
+        self.favorite_path = favorite_path
+        self.check_interval = check_interval
+        self._snapshot: Optional[EmojiSnapshot] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _current_signatures(self) -> Dict[str, Any]:
+        return {
+            'json': _signature(self.json_path),
+            'emoji_dir': _signature(self.emoji_dir),
+            'favorite_dir': _signature(self.favorite_path),
+        }
+
+    def snapshot(self) -> EmojiSnapshot:
+        """
+        获取当前快照（必要时重新加载）
+
+        Returns:
+            EmojiSnapshot: 当前快照
+        """
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._last_check < self.check_interval:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - self._last_check < self.check_interval:
+                return snapshot
+            signatures = self._current_signatures()
+            if snapshot is None or signatures != snapshot.signatures:
+                snapshot = self._build(snapshot, signatures)
+                # 引用赋值是原子的，读取方要么拿到旧快照，要么拿到完整的新快照
+                self._snapshot = snapshot
+            self._last_check = time.monotonic()
+            return snapshot
+
+    def reload(self) -> EmojiSnapshot:
+        """强制下次访问时重新检查源文件"""
+        self._last_check = 0.0
+        return self.snapshot()
+
+    def _build(self, previous: Optional[EmojiSnapshot], signatures: Dict[str, Any]) -> EmojiSnapshot:
+        """构建新快照，未变化的部分直接复用旧快照"""
+        old_signatures = previous.signatures if previous else {}
+
+        matcher = None
+        if previous is not None and signatures['json'] == old_signatures.get('json'):
+            database = previous.database
+            matcher = previous.matcher
+        else:
+            database = self._load_database(previous)
+            if previous is not None and database is previous.database:
+                matcher = previous.matcher
+
+        if previous is not None and signatures['emoji_dir'] == old_signatures.get('emoji_dir'):
+            emoji_files = previous.emoji_files
+        else:
+            emoji_files = self._list_emoji_files()
+
+        if previous is not None and signatures['favorite_dir'] == old_signatures.get('favorite_dir'):
+            favorite_images = previous.favorite_images
+        else:
+            favorite_images = self._list_favorite_images()
+
+        return EmojiSnapshot(database, emoji_files, favorite_images, signatures, matcher=matcher)
+
+    def _load_database(self, previous: Optional[EmojiSnapshot]) -> List[Dict[str, Any]]:
+        """读取 emojis.json，读取失败时保留上一份数据"""
+        fallback = previous.database if previous is not None else []
+
+        if not self.json_path.exists():
+            print(f"⚠️  [表情包数据库] 警告: JSON文件不存在: {self.json_path}")
+            return fallback
+
+        try:
+            with open(self.json_path, 'r', encoding='utf-8') as f:
+                database = json.load(f)
+            if not isinstance(database, list):
+                raise ValueError('JSON 顶层应为列表')
+        except Exception as e:
+            print(f"❌ [表情包数据库] 加载失败: {e}")
+            return fallback
+
+        action = '重新加载' if previous is not None else '成功加载'
+        print(f"📦 [表情包数据库] {action} {len(database)} 个表情包")
+        return database
+
+    def _list_emoji_files(self) -> set:
+        """列出已存在图片文件的表情包ID"""
+        if not self.emoji_dir.exists():
+            return set()
+        emoji_ids = set()
+        with os.scandir(self.emoji_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(EMOJI_FILE_SUFFIX) and entry.is_file():
+                    emoji_ids.add(entry.name[:-len(EMOJI_FILE_SUFFIX)])
+        return emoji_ids
+
+    def _list_favorite_images(self) -> List[str]:
+        """列出收藏图片目录中的图片文件名"""
+        if not self.favorite_path.exists():
+            return []
+        image_files = []
+        with os.scandir(self.favorite_path) as entries:
+            for entry in entries:
+                if os.path.splitext(entry.name)[1].lower() in FAVORITE_IMAGE_EXTENSIONS and entry.is_file():
+                    image_files.append(entry.name)
+        return image_files
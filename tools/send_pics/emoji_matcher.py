@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+表情包匹配索引
+在加载表情包数据库时预先计算小写字段、关键词索引和字符 n-gram 倒排索引，
+匹配时只对候选表情包做子串校验，评分规则与原线性扫描完全一致
+"""
+import re
+from typing import List, Dict, Any, Tuple
+
+# 分词规则（与原实现一致）
+_WORD_RE = re.compile(r'\w+')
+_CHINESE_RE = re.compile(r'[\u4e00-\u9fff]+')
+_CHINESE_CHAR_RE = re.compile(r'[\u4e00-\u9fff]')
+
+# 关键词完全匹配权重
+KEYWORD_WEIGHT = 0.6
+
+# 子串匹配字段及权重，顺序即原实现的累加顺序
+SUBSTRING_FIELDS: Tuple[Tuple[str, float], ...] = (
+    ('text_content', 0.5),
+    ('description', 0.4),
+    ('usage', 0.4),
+    ('category', 0.3),
+    ('visual_description', 0.2),
+)
+_TEXT_CONTENT_BIT = 1 << 0
+_DESCRIPTION_BIT = 1 << 1
+
+# 短语加分：描述 / 文本内容中包含长度≥2的词
+DESCRIPTION_PHRASE_BONUS = 0.3
+TEXT_CONTENT_PHRASE_BONUS = 0.4
+
+# 短消息加分
+SHORT_MESSAGE_LENGTH = 10
+SHORT_MESSAGE_BONUS = 0.2
+
+
+def tokenize(message_lower: str) -> List[str]:
+    """
+    对（已小写的）消息分词，保留重复词和原有顺序
+
+    Returns:
+        list: 参与评分的词（已按最小长度过滤）
+    """
+    all_words = _WORD_RE.findall(message_lower) + _CHINESE_RE.findall(message_lower)
+    tokens = []
+    for word in all_words:
+        # 单个中文字符也可以匹配，其他词至少两个字符
+        min_length = 1 if _CHINESE_CHAR_RE.search(word) else 2
+        if len(word) >= min_length:
+            tokens.append(word)
+    return tokens
+
+
+class EmojiMatcher:
+    """
+    表情包匹配器（构建后只读，可在多线程间共享）
+
+    Args:
+        database: 表情包信息列表（emojis.json 的内容）
+    """
+
+    def __init__(self, database: List[Dict[str, Any]]):
+        self.database = database
+        # 每个表情包各字段的小写文本，按 SUBSTRING_FIELDS 顺序
+        self._fields: List[Tuple[str, ...]] = []
+        # 关键词 -> 表情包下标集合
+        self._keyword_index: Dict[str, set] = {}
+        # 字符 n-gram（单字与双字）-> {表情包下标: 字段位掩码}
+        self._gram_index: Dict[str, Dict[int, int]] = {}
+
+        for idx, emoji in enumerate(database):
+            fields = tuple((emoji.get(name) or '').lower() for name, _ in SUBSTRING_FIELDS)
+            self._fields.append(fields)
+
+            for keyword in emoji.get('keywords') or []:
+                self._keyword_index.setdefault(str(keyword).lower(), set()).add(idx)
+
+            for bit_pos, text in enumerate(fields):
+                bit = 1 << bit_pos
+                for gram in self._grams(text):
+                    postings = self._gram_index.setdefault(gram, {})
+                    postings[idx] = postings.get(idx, 0) | bit
+
+    @staticmethod
+    def _grams(text: str):
+        """字段文本中出现的所有单字和双字"""
+        grams = set(text)
+        grams.update(text[i:i + 2] for i in range(len(text) - 1))
+        return grams
+
+    def _candidates(self, word: str) -> Dict[int, int]:
+        """
+        根据 n-gram 倒排索引求出可能包含该词的表情包及字段
+
+        Returns:
+            dict: {表情包下标: 可能命中的字段位掩码}
+        """
+        if len(word) == 1:
+            return self._gram_index.get(word, {})
+
+        grams = {word[i:i + 2] for i in range(len(word) - 1)}
+        postings_list = []
+        for gram in grams:
+            postings = self._gram_index.get(gram)
+            if not postings:
+                return {}
+            postings_list.append(postings)
+        # 从最短的倒排表开始求交集
+        postings_list.sort(key=len)
+        candidates = dict(postings_list[0])
+        for postings in postings_list[1:]:
+            narrowed = {}
+            for idx, mask in candidates.items():
+                other = postings.get(idx)
+                if other is not None and mask & other:
+                    narrowed[idx] = mask & other
+            if not narrowed:
+                return {}
+            candidates = narrowed
+        return candidates
+
+    def _word_hits(self, word: str) -> Dict[int, Tuple[Tuple[float, ...], int]]:
+        """
+        计算单个词在各表情包上的命中情况
+
+        Returns:
+            dict: {表情包下标: (按原累加顺序排列的权重, 命中字段位掩码)}
+        """
+        hits: Dict[int, Tuple[List[float], int]] = {}
+
+        for idx in self._keyword_index.get(word, ()):
+            hits[idx] = ([KEYWORD_WEIGHT], 0)
+
+        for idx, mask in self._candidates(word).items():
+            fields = self._fields[idx]
+            weights, hit_mask = hits.get(idx, ([], 0))
+            for bit_pos, (_, weight) in enumerate(SUBSTRING_FIELDS):
+                bit = 1 << bit_pos
+                if mask & bit and word in fields[bit_pos]:
+                    weights.append(weight)
+                    hit_mask |= bit
+            if weights:
+                hits[idx] = (weights, hit_mask)
+
+        return {idx: (tuple(weights), hit_mask) for idx, (weights, hit_mask) in hits.items()}
+
+    def score(self, user_message: str) -> Tuple[Dict[int, float], float]:
+        """
+        计算消息对候选表情包的得分
+
+        Returns:
+            tuple: ({候选表情包下标: 分数}, 非候选表情包的统一得分)
+        """
+        message_lower = user_message.lower()
+        tokens = tokenize(message_lower)
+
+        # 每个不同的词只查一次索引
+        word_hits = {}
+        for word in tokens:
+            if word not in word_hits:
+                word_hits[word] = self._word_hits(word)
+
+        candidate_ids = set()
+        for hits in word_hits.values():
+            candidate_ids.update(hits)
+
+        short_message = len(message_lower) <= SHORT_MESSAGE_LENGTH
+        base_score = 0.0
+        if short_message:
+            base_score += SHORT_MESSAGE_BONUS
+
+        scores = {}
+        for idx in candidate_ids:
+            score = 0.0
+            description_phrase = False
+            text_phrase = False
+            # 按词出现顺序逐项累加，保证浮点结果与原实现一致
+            for word in tokens:
+                hit = word_hits[word].get(idx)
+                if hit is None:
+                    continue
+                weights, hit_mask = hit
+                for weight in weights:
+                    score += weight
+                if len(word) >= 2:
+                    if hit_mask & _DESCRIPTION_BIT:
+                        description_phrase = True
+                    if hit_mask & _TEXT_CONTENT_BIT:
+                        text_phrase = True
+
+            if description_phrase:
+                score += DESCRIPTION_PHRASE_BONUS
+            if text_phrase:
+                score += TEXT_CONTENT_PHRASE_BONUS
+            if short_message:
+                score += SHORT_MESSAGE_BONUS
+            scores[idx] = score
+        return scores, base_score
+
+    def match(self, user_message: str, threshold: float = 0.15) -> List[Dict[str, Any]]:
+        """
+        匹配表情包
+
+        Returns:
+            list: [{'emoji': 表情包信息, 'score': 分数}]，按分数降序（同分保持数据库顺序）
+        """
+        scores, base_score = self.score(user_message)
+
+        if base_score >= threshold:
+            # 短消息加分已超过阈值：所有表情包都参与排序
+            passed = [(idx, scores.get(idx, base_score)) for idx in range(len(self.database))]
+        else:
+            passed = sorted(scores.items())
+        passed = [(idx, score) for idx, score in passed if score >= threshold]
+        # 分数降序，同分按数据库顺序（与原实现的稳定排序一致）
+        passed.sort(key=lambda item: (-item[1], item[0]))
+        return [{'emoji': self.database[idx], 'score': score} for idx, score in passed]